@@ -0,0 +1,269 @@
+'''Benchmarks of mBus hot paths
+
+    python bench.py --output results.json
+    python bench.py --compare results.json --threshold 0.1
+'''
+import argparse
+import gc
+import json
+import platform
+import sys
+import threading
+import tracemalloc
+from itertools import count
+from statistics import median
+from time import perf_counter, time
+from typing import Callable
+
+from mbus import mbus
+
+railCounter = count()
+
+def uniqueRail(prefix : str) -> str:
+    railName = f'bench_{prefix}_{next(railCounter)}'
+    mbus.registerRail(railName)
+    return railName
+
+def createChain(railName : str, depth : int) -> str:
+    '''Creates groups g0.g1... under rail, returns address of the deepest one'''
+    address = railName
+    for level in range(depth):
+        address = f'{address}.g{level}'
+        mbus.createGroup(address)
+    return address
+
+def timeLoop(operation : Callable[[], object], iterations : int, repeat : int) -> float:
+    '''Median time of one operation in nanoseconds'''
+    samples = []
+    for _ in range(repeat):
+        startedAt = perf_counter()
+        for _ in range(iterations):
+            operation()
+        samples.append((perf_counter() - startedAt) / iterations * 1e9)
+    return median(samples)
+
+def timeThreads(operation : Callable[[int], object], threads : int, iterations : int, repeat : int) -> float:
+    '''Median wall time of one operation in nanoseconds when iterations are split between threads'''
+    perThread = max(1, iterations // threads)
+    samples = []
+    for _ in range(repeat):
+        barrier = threading.Barrier(threads + 1)
+
+        def worker(worker : int):
+            barrier.wait()
+            for _ in range(perThread):
+                operation(worker)
+
+        workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+        for thread in workers:
+            thread.start()
+        barrier.wait()
+        startedAt = perf_counter()
+        for thread in workers:
+            thread.join()
+        samples.append((perf_counter() - startedAt) / (perThread * threads) * 1e9)
+    return median(samples)
+
+def benchRegistration(size : int, depth : int, repeat : int) -> float:
+    samples = []
+    for _ in range(repeat):
+        address = createChain(uniqueRail('registration'), depth)
+        startedAt = perf_counter()
+        for i in range(size):
+            mbus.createEndpoint(address, f'f{i}', 'field', type=int, value=i)
+        samples.append((perf_counter() - startedAt) / size * 1e9)
+    return median(samples)
+
+def benchResolution(size : int, depth : int, iterations : int, repeat : int) -> float:
+    address = createChain(uniqueRail('resolution'), depth)
+    for i in range(size):
+        mbus.createEndpoint(address, f'f{i}', 'field', type=int, value=i)
+    target = f'{address}.f{size - 1}'
+    return timeLoop(lambda : mbus.resolve(target), iterations, repeat)
+
+def benchTrigger(depth : int, iterations : int, repeat : int) -> dict[str, float]:
+    address = createChain(uniqueRail('trigger'), depth)
+    mbus.createEndpoint(address, 'trigger', 'trigger', responder=lambda x : None, arguments={"x" : int})
+    handle = mbus.resolve(address + '.trigger')
+    return {
+        "address" : timeLoop(lambda : mbus.fireTrigger(address + '.trigger', x = 1), iterations, repeat),
+        "handle" : timeLoop(lambda : handle.fire(x = 1), iterations, repeat),
+    }
+
+def benchAction(depth : int, iterations : int, repeat : int) -> dict[str, float]:
+    address = createChain(uniqueRail('action'), depth)
+    mbus.createEndpoint(address, 'action', 'action', responder=lambda x : x, arguments={"x" : int}, rtype=int)
+    handle = mbus.resolve(address + '.action')
+    return {
+        "address" : timeLoop(lambda : mbus.callAction(address + '.action', x = 1), iterations, repeat),
+        "handle" : timeLoop(lambda : handle.call(x = 1), iterations, repeat),
+    }
+
+def benchRelative(depth : int, iterations : int, repeat : int) -> dict[str, float]:
+    '''Field read by absolute address, by relative address resolved from calling module and through rail view'''
+    railName = uniqueRail('relative')
+    view = mbus.bindModuleToRail(railName)
+    address = createChain(railName, depth)
+    mbus.createEndpoint(address, 'field', 'field', type=int, value=0)
+    relative = address.partition('.')[2] + '.field'
+    return {
+        "absolute" : timeLoop(lambda : mbus.getFieldValue(address + '.field'), iterations, repeat),
+        "module" : timeLoop(lambda : mbus.getFieldValue(relative), iterations, repeat),
+        "view" : timeLoop(lambda : view.getFieldValue(relative), iterations, repeat),
+    }
+
+def benchEventFanOut(width : int, iterations : int, repeat : int) -> float:
+    address = createChain(uniqueRail('event'), 1)
+    mbus.createEndpoint(address, 'event', 'event', responders=[lambda x : None for _ in range(width)])
+    return timeLoop(lambda : mbus.callEvent(address + '.event', x = 1), iterations, repeat)
+
+def benchFieldContention(threads : int, iterations : int, repeat : int, writeEvery : int = 10) -> float:
+    '''Threads read one shared field, every writeEvery-th operation is a write'''
+    address = createChain(uniqueRail('field'), 1)
+    mbus.createEndpoint(address, 'field', 'field', type=int, value=0)
+    handle = mbus.resolve(address + '.field')
+    ticks = [0] * threads
+
+    def operation(worker : int):
+        ticks[worker] += 1
+        if ticks[worker] % writeEvery == 0:
+            handle.set(ticks[worker])
+        else:
+            handle.get()
+
+    return timeThreads(operation, threads, iterations, repeat)
+
+def benchMemory(size : int, depth : int, groupSize : int = 50) -> float:
+    '''Bytes allocated per field endpoint, including groups holding them and address index entries'''
+    address = createChain(uniqueRail('memory'), max(0, depth - 1))
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        for group in range((size + groupSize - 1) // groupSize):
+            groupAddress = f'{address}.m{group}'
+            mbus.createGroup(groupAddress)
+            for i in range(min(groupSize, size - group * groupSize)):
+                mbus.createEndpoint(groupAddress, f'f{i}', 'field', type=int, value=i)
+        gc.collect()
+        return (tracemalloc.get_traced_memory()[0] - before) / size
+    finally:
+        tracemalloc.stop()
+
+def parseInts(text : str) -> list[int]:
+    return [int(value) for value in text.split(',') if value != '']
+
+def runBenchmarks(arguments : argparse.Namespace) -> list[dict]:
+    results = []
+    selected = set(arguments.only.split(',')) if arguments.only else None
+
+    def record(name : str, value : float, unit : str = 'ns/op', **params):
+        results.append({"name" : name, "params" : params, METRIC_KEYS[unit] : value})
+        described = ' '.join(f'{key}={value}' for key, value in params.items())
+        print(f'{name:<24} {described:<32} {value:>12.1f} {unit}', file=sys.stderr)
+
+    def enabled(name : str) -> bool:
+        return selected is None or name in selected
+
+    for size in arguments.sizes:
+        for depth in arguments.depths:
+            if enabled('registration'):
+                record('registration', benchRegistration(size, depth, arguments.repeat), size=size, depth=depth)
+            if enabled('resolution'):
+                record('resolution', benchResolution(size, depth, arguments.iterations, arguments.repeat), size=size, depth=depth)
+            if enabled('memory'):
+                record('memory', benchMemory(size, depth), 'B/endpoint', size=size, depth=depth)
+
+    for depth in arguments.depths:
+        if enabled('trigger'):
+            for variant, nsPerOp in benchTrigger(depth, arguments.iterations, arguments.repeat).items():
+                record(f'trigger.{variant}', nsPerOp, depth=depth)
+        if enabled('action'):
+            for variant, nsPerOp in benchAction(depth, arguments.iterations, arguments.repeat).items():
+                record(f'action.{variant}', nsPerOp, depth=depth)
+        if enabled('relative'):
+            for variant, nsPerOp in benchRelative(depth, arguments.iterations, arguments.repeat).items():
+                record(f'relative.{variant}', nsPerOp, depth=depth)
+
+    if enabled('event'):
+        for width in arguments.widths:
+            record('event.fanOut', benchEventFanOut(width, max(1, arguments.iterations // width), arguments.repeat), width=width)
+
+    if enabled('field'):
+        for threads in arguments.threads:
+            record('field.contention', benchFieldContention(threads, arguments.iterations, arguments.repeat), threads=threads)
+
+    return results
+
+METRIC_KEYS = {'ns/op' : "nsPerOp", 'B/endpoint' : "bytesPerEndpoint"}
+
+def metricOf(result : dict) -> float:
+    return next(result[key] for key in METRIC_KEYS.values() if key in result)
+
+def resultKey(result : dict) -> str:
+    params = ','.join(f'{key}={value}' for key, value in sorted(result["params"].items()))
+    return f'{result["name"]}[{params}]'
+
+def compareResults(results : list[dict], baseline : list[dict], threshold : float) -> list[str]:
+    '''Prints comparison against baseline and returns keys of regressed benchmarks'''
+    baselineByKey = {resultKey(result) : result for result in baseline}
+    regressions = []
+    for result in results:
+        key = resultKey(result)
+        if key not in baselineByKey:
+            print(f'{key:<56} {"new":>10}')
+            continue
+
+        ratio = metricOf(result) / metricOf(baselineByKey[key])
+        flag = ''
+        if ratio > 1 + threshold:
+            flag = 'REGRESSION'
+            regressions.append(key)
+        elif ratio < 1 - threshold:
+            flag = 'improved'
+        print(f'{key:<56} {ratio:>9.2f}x {flag}')
+    return regressions
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Benchmarks of mBus hot paths')
+    parser.add_argument('--sizes', type=parseInts, default=[100, 10000], help='Number of endpoints in namespace')
+    parser.add_argument('--depths', type=parseInts, default=[1, 4, 8], help='Number of groups in address')
+    parser.add_argument('--threads', type=parseInts, default=[1, 2, 4, 8], help='Number of threads in contention benchmarks')
+    parser.add_argument('--widths', type=parseInts, default=[1, 16, 256], help='Number of responders of event')
+    parser.add_argument('--iterations', type=int, default=20000, help='Operations per sample')
+    parser.add_argument('--repeat', type=int, default=5, help='Samples per benchmark, median is reported')
+    parser.add_argument('--only', default='', help='Comma separated benchmarks: registration,resolution,memory,trigger,action,relative,event,field')
+    parser.add_argument('--output', help='Writes JSON results to file')
+    parser.add_argument('--compare', help='Compares against JSON results of previous run')
+    parser.add_argument('--threshold', type=float, default=0.1, help='Relative slowdown reported as regression')
+    arguments = parser.parse_args()
+
+    results = runBenchmarks(arguments)
+    report = {
+        "meta" : {
+            "timestamp" : time(),
+            "python" : platform.python_version(),
+            "implementation" : platform.python_implementation(),
+            "machine" : platform.machine(),
+            "arguments" : {key : value for key, value in vars(arguments).items() if key not in ('output', 'compare')},
+        },
+        "results" : results,
+    }
+
+    if arguments.output:
+        with open(arguments.output, 'w') as output:
+            json.dump(report, output, indent=2)
+
+    if arguments.compare:
+        with open(arguments.compare) as baselineFile:
+            baseline = json.load(baselineFile)["results"]
+        regressions = compareResults(results, baseline, arguments.threshold)
+        if len(regressions) > 0:
+            print(f'{len(regressions)} regression(s) above {arguments.threshold:.0%}', file=sys.stderr)
+            return 1
+    elif not arguments.output:
+        json.dump(report, sys.stdout, indent=2)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,8 +1,38 @@
 import re
+import asyncio
 import inspect
-from dataclasses import dataclass
+import json
+import mmap
+import os
+import pickle
+import socket
+import stat
+import struct
+import sys
+from array import array, typecodes
+from concurrent.futures import ALL_COMPLETED, FIRST_COMPLETED, CancelledError, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures import wait as waitForFutures
+from contextlib import ExitStack, contextmanager, nullcontext
+from functools import partial, wraps
+from itertools import count
+from importlib import import_module
+from multiprocessing import parent_process, resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from os import PathLike
+from dataclasses import KW_ONLY, dataclass, field
 from typing import Any, Callable, Union
-from threading import Lock
+from collections import OrderedDict, deque
+from sys import intern
+from types import MappingProxyType
+from weakref import WeakKeyDictionary
+from threading import Condition, Event, Lock, Thread, Timer, local
+from zlib import crc32
+from time import monotonic, perf_counter, sleep
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 class BusException(Exception):
     def __init__(self, message) -> None:
@@ -98,43 +128,690 @@ class InvalidField(BusException):
 class GettingFieldFailed(BusException):
     '''Getting a field failed'''
 
-RAIL_NAME_REGEX = '^([A-Z]|[a-z])([A-Z]|[a-z]|[0-9]|_)*$'
+class InvalidVector(BusException):
+    '''Exception thrown when address does not point to vector'''
+
+class InvalidLockingStrategy(BusException):
+    '''Provided locking strategy is not one of LOCKING_STRATEGIES'''
+
+class InvalidValidationMode(BusException):
+    '''Provided validation mode is not one of VALIDATION_MODES'''
+
+class EventQueueFull(BusException):
+    '''Event queue is full and its overflow policy is raise'''
+
+class EventDispatcherNotRunning(BusException):
+    '''Event is published while event dispatcher is not running'''
+
+class EventDispatcherRunning(BusException):
+    '''Event dispatcher is started while it is already running'''
+
+class InvalidOverflowPolicy(BusException):
+    '''Provided overflow policy is not one of OVERFLOW_POLICIES'''
+
+class InvalidDispatcherSize(BusException):
+    '''Event dispatcher is started with less than one thread or queue slot'''
+
+class InvalidPattern(BusException):
+    '''Subscription pattern is not valid'''
+
+class BridgeRunning(BusException):
+    '''Bridge is started while it is already running'''
+
+class BridgeNotRunning(BusException):
+    '''Bridge is stopped while it is not running'''
+
+class BridgePathInUse(BusException):
+    '''Bridge path is taken by file other than socket or by listening server'''
+
+class BridgeClosed(BusException):
+    '''Connection to bridge was closed before response arrived'''
+
+class InvalidFsyncPolicy(BusException):
+    '''Provided fsync policy is not one of FSYNC_POLICIES'''
+
+class JournalEnabled(BusException):
+    '''Journal is enabled while it is already enabled'''
+
+class JournalNotEnabled(BusException):
+    '''Journal is used while it is not enabled'''
+
+class SchemaError(BusException):
+    '''Schema passed to loadSchema is invalid, every problem found is listed in errors'''
+    def __init__(self, errors : list[str]) -> None:
+        super().__init__(f'Schema has {len(errors)} error(s):\n' + '\n'.join(errors))
+        self.errors = errors
+
+LOCKING_STRATEGIES = ('global', 'rail', 'endpoint', 'none')
+EVENT_DISPATCH_MODES = ('sequential', 'parallel')
+EVENT_WAIT_MODES = ('all', 'first', 'none')
+ACTION_EXECUTORS = ('inline', 'process')
+VALIDATION_MODES = ('strict', 'sampled', 'off')
+OVERFLOW_POLICIES = ('block', 'drop-oldest', 'drop-newest', 'raise')
+FSYNC_POLICIES = ('always', 'batch', 'interval')
+VECTOR_BACKENDS = ('array', 'numpy')
+NO_LOCK = nullcontext()
+# Groups start with this shared mapping and get own dict on first insert
+EMPTY_MAPPING = MappingProxyType({})
+ENDPOINT_MUTEX_GUARD = Lock()
+
+RAIL_NAME_REGEX = re.compile('^([A-Z]|[a-z])([A-Z]|[a-z]|[0-9]|_)*$')
 def isRailNameInvalid(railName : str) -> bool:
-    return re.fullmatch(RAIL_NAME_REGEX, railName) is None
+    return RAIL_NAME_REGEX.fullmatch(railName) is None
 
-GROUP_NAME_REGEX = '^([A-Z]|[a-z])([A-Z]|[a-z]|[0-9])*$'
+GROUP_NAME_REGEX = re.compile('^([A-Z]|[a-z])([A-Z]|[a-z]|[0-9])*$')
 def isGroupNameInvalid(railName : str) -> bool:
-    return re.fullmatch(GROUP_NAME_REGEX, railName) is None
+    return GROUP_NAME_REGEX.fullmatch(railName) is None
+
+def callerModuleName() -> Union[str, None]:
+    '''Name of the first module outside of mbus on the call stack'''
+    frame = sys._getframe(1)
+    while frame is not None and frame.f_globals.get('__name__') == __name__:
+        frame = frame.f_back
+    return None if frame is None else frame.f_globals.get('__name__')
+
+SCHEMA_TYPES = {
+    'int' : int, 'float' : float, 'complex' : complex, 'str' : str, 'bool' : bool, 'bytes' : bytes,
+    'list' : list, 'tuple' : tuple, 'dict' : dict, 'set' : set, 'object' : object, 'None' : type(None)
+}
+
+def importFromPath(path : str) -> Any:
+    '''Imports object from "module:attribute" path, attribute may be dotted'''
+    moduleName, separator, attributePath = path.partition(':')
+    if separator == '' or moduleName == '' or attributePath == '':
+        raise ValueError(f'Import path {path} is not in module:attribute form')
+
+    target = import_module(moduleName)
+    for attribute in attributePath.split('.'):
+        target = getattr(target, attribute)
+    return target
+
+def resolveSchemaType(value : Any) -> Any:
+    if not isinstance(value, str):
+        return value
 
-@dataclass
+    if value in SCHEMA_TYPES:
+        return SCHEMA_TYPES[value]
+
+    if ':' in value:
+        return importFromPath(value)
+
+    raise ValueError(f'Type {value} is not one of {tuple(SCHEMA_TYPES)} nor module:attribute path')
+
+def resolveSchemaResponder(value : Any) -> Callable:
+    responder = importFromPath(value) if isinstance(value, str) else value
+    if not callable(responder):
+        raise ValueError(f'Responder {value} is not callable')
+    return responder
+
+def resolveSchemaEndpoint(endpointSchema : Any) -> tuple[str, dict]:
+    '''Splits endpoint schema into kind and parameters accepted by createEndpoint'''
+    if not isinstance(endpointSchema, dict):
+        raise ValueError('Endpoint has to be a mapping')
+
+    parameters = dict(endpointSchema)
+    if not 'kind' in parameters:
+        raise ValueError('Endpoint kind is missing')
+    kind = parameters.pop('kind')
+
+    if 'responder' in parameters:
+        parameters['responder'] = resolveSchemaResponder(parameters['responder'])
+
+    if 'responders' in parameters:
+        responders = parameters['responders']
+        if isinstance(responders, (list, tuple)):
+            parameters['responders'] = [resolveSchemaResponder(responder) for responder in responders]
+        else:
+            parameters['responders'] = resolveSchemaResponder(responders)
+
+    if 'arguments' in parameters:
+        arguments = parameters['arguments']
+        if not isinstance(arguments, dict):
+            raise ValueError('Arguments have to be a mapping of names to types')
+        parameters['arguments'] = {name : resolveSchemaType(argumentType) for name, argumentType in arguments.items()}
+
+    for key in ('type', 'rtype'):
+        if key in parameters:
+            parameters[key] = resolveSchemaType(parameters[key])
+
+    return kind, parameters
+
+def checkArguments(requiredArguments : dict, arguments : dict):
+    argumentsSet = set(arguments.keys())
+    requiredArgumentsSet = set(requiredArguments.keys())
+
+    difference = argumentsSet - requiredArgumentsSet
+    if len(difference) > 0:
+        raise UnknownArgument(f"Unknown endpoint argument {difference.pop()}")
+
+    difference = requiredArgumentsSet - argumentsSet
+    if len(difference) > 0:
+        raise MissingArgumentException(f"Missing endpoint argument {difference.pop()}")
+
+    for (name, value) in arguments.items():
+        requiredType = requiredArguments.get(name)
+        if requiredType == None: continue
+        if not isinstance(value, requiredType):
+            raise InvalidArgument(f"Argument {name} is not of type {requiredType}")
+
+def compileArgumentsValidator(requiredArguments : dict) -> Callable[[dict], None]:
+    '''Generates validator with fixed arity for given arguments. Valid calls pass with no allocations,
+    anything else falls back to checkArguments so exactly the same exception is raised'''
+    slowPath = partial(checkArguments, dict(requiredArguments))
+    namespace = {"_len" : len, "_isinstance" : isinstance, "_slowPath" : slowPath, "_KeyError" : KeyError}
+
+    lines = [f"    if _len(kwargs) != {len(requiredArguments)}:", "        return _slowPath(kwargs)"]
+    if len(requiredArguments) > 0:
+        lines.append("    try:")
+        for index, name in enumerate(requiredArguments):
+            lines.append(f"        value{index} = kwargs[{name!r}]")
+        lines += ["    except _KeyError:", "        return _slowPath(kwargs)"]
+
+    checks = []
+    for index, (name, requiredType) in enumerate(requiredArguments.items()):
+        if requiredType is None: continue
+        namespace[f"type{index}"] = requiredType
+        checks.append(f"not _isinstance(value{index}, type{index})")
+
+    if len(checks) > 0:
+        lines += [f"    if {' or '.join(checks)}:", "        return _slowPath(kwargs)"]
+
+    source = "def validator(kwargs):\n" + "\n".join(lines) + "\n"
+    exec(compile(source, "<mbus validator>", "exec"), namespace)
+    return namespace["validator"]
+
+@dataclass(slots=True)
 class busEndpoint:
     endpointName : str
-
-@dataclass
+    _ : KW_ONLY
+    address : str = field(default='', compare=False)
+    rail : Union['busRail', None] = field(default=None, repr=False, compare=False)
+    mutex : Union[Lock, None] = field(default=None, repr=False, compare=False)
+    patternSubscriptions : tuple['busSubscription', ...] = field(default=(), repr=False, compare=False)
+    patternGeneration : int = field(default=-1, repr=False, compare=False)
+    interceptorChains : Union[dict[str, Any], None] = field(default=None, repr=False, compare=False)
+    interceptorGeneration : int = field(default=-1, repr=False, compare=False)
+
+    def getMutex(self) -> Lock:
+        '''Lock of endpoint, created on first use so unlocked endpoints do not carry one'''
+        mutex = self.mutex
+        if mutex is None:
+            with ENDPOINT_MUTEX_GUARD:
+                if self.mutex is None:
+                    self.mutex = Lock()
+                mutex = self.mutex
+        return mutex
+
+@dataclass(slots=True)
 class busTrigger(busEndpoint):
     endpointDelegate : Callable
     arguments : dict[str, type]
+    validator : Callable[[dict], None] = field(init=False, repr=False, compare=False)
 
-@dataclass
+    def __post_init__(self):
+        self.validator = compileArgumentsValidator(self.arguments)
+
+@dataclass(slots=True)
 class busEvent(busEndpoint):
     endpointDelegates : list[Callable]
+    _ : KW_ONLY
+    dispatch : str = 'sequential'
+    wait : str = 'all'
 
 @dataclass
+class busEventResult:
+    '''Outcome of parallel event dispatch, one future per listener'''
+    futures : list[Future]
+
+    @property
+    def done(self) -> bool:
+        return all(future.done() for future in self.futures)
+
+    @property
+    def results(self) -> list[Any]:
+        return [future.result() for future in self.futures if future.done() and future.exception() is None]
+
+    @property
+    def exceptions(self) -> list[BaseException]:
+        return [future.exception() for future in self.futures if future.done() and future.exception() is not None]
+
+SHARED_FIELD_FORMATS = {int : 'q', float : 'd', bool : '?'}
+SHARED_FIELD_HEADER = struct.Struct('Q')
+# Names of blocks created by this process, still registered with its resource tracker
+CREATED_SHARED_BLOCKS : set[str] = set()
+
+class busSharedValue:
+    '''Fixed size value in named shared memory block preceded by sequence counter.
+    Readers retry while sequence is odd or changed, so only one process may write the value.'''
+    def __init__(self, name : str, format : str, attach : bool) -> None:
+        self.layout = struct.Struct(format)
+        empty = self.layout.unpack(bytes(self.layout.size))
+        self.scalar = len(empty) == 1
+        # struct pads and truncates ``s`` items silently, so their length is checked before packing
+        self.byteSizes = tuple(len(item) if isinstance(item, bytes) and len(item) > 1 else None for item in empty)
+        size = SHARED_FIELD_HEADER.size + self.layout.size
+
+        if attach:
+            self.memory = SharedMemory(name)
+            # Block belongs to creating process, attached one must not unlink it on exit. Tracker of this process
+            # is the creator's own when block was created here, and multiprocessing children share parent's one.
+            if not self.memory._name in CREATED_SHARED_BLOCKS and parent_process() is None:
+                resource_tracker.unregister(self.memory._name, 'shared_memory')
+        else:
+            self.memory = SharedMemory(name, create=True, size=size)
+            CREATED_SHARED_BLOCKS.add(self.memory._name)
+
+        if self.memory.size < size:
+            self.memory.close()
+            raise ValueError(f'Shared memory {name} has {self.memory.size} bytes, format {format} needs {size}')
+
+        self.name = name
+        self.owner = not attach
+        self.buffer = self.memory.buf
+
+    def read(self) -> tuple[Any, int]:
+        while True:
+            sequence = SHARED_FIELD_HEADER.unpack_from(self.buffer, 0)[0]
+            if sequence & 1 == 0:
+                values = self.layout.unpack_from(self.buffer, SHARED_FIELD_HEADER.size)
+                if SHARED_FIELD_HEADER.unpack_from(self.buffer, 0)[0] == sequence:
+                    return (values[0] if self.scalar else values), sequence >> 1
+            sleep(0)
+
+    def pack(self, value : Any) -> bytes:
+        values = (value,) if self.scalar else tuple(value)
+        for item, size in zip(values, self.byteSizes):
+            if size is not None and isinstance(item, (bytes, bytearray)) and len(item) != size:
+                raise struct.error(f'{len(item)} bytes do not fit {size}s item')
+        return self.layout.pack(*values)
+
+    def write(self, packed : bytes) -> None:
+        sequence = SHARED_FIELD_HEADER.unpack_from(self.buffer, 0)[0]
+        SHARED_FIELD_HEADER.pack_into(self.buffer, 0, sequence + 1)
+        self.buffer[SHARED_FIELD_HEADER.size:SHARED_FIELD_HEADER.size + len(packed)] = packed
+        SHARED_FIELD_HEADER.pack_into(self.buffer, 0, sequence + 2)
+
+    def close(self) -> None:
+        self.buffer = None
+        self.memory.close()
+        if self.owner:
+            self.memory.unlink()
+            CREATED_SHARED_BLOCKS.discard(self.memory._name)
+
+@dataclass(slots=True)
 class busField(busEndpoint):
     type : type
     value : Any
+    _ : KW_ONLY
+    version : int = field(default=0, compare=False)
+    watchers : tuple['busFieldWatcher', ...] = field(default=(), repr=False, compare=False)
+    shared : Union[busSharedValue, None] = field(default=None, repr=False, compare=False)
+
+class busFieldWatcher:
+    '''Delivers field changes to callback(oldValue, newValue) outside of bus lock.
+    latestOnly coalesces changes made while callback runs, minInterval coalesces changes
+    arriving sooner than interval after last delivery, onlyChanges skips writes of equal value.'''
+    def __init__(self, endpoint : busField, callback : Callable[[Any, Any], Any],
+                 latestOnly : bool = False, minInterval : float = 0.0, onlyChanges : bool = False) -> None:
+        self.endpoint = endpoint
+        self.callback = callback
+        self.latestOnly = latestOnly
+        self.minInterval = minInterval
+        self.onlyChanges = onlyChanges
+        self.active = True
+        self.failed = 0
+        self.__mutex = Lock()
+        self.__pending : Union[tuple[Any, Any], None] = None
+        self.__delivering = False
+        self.__timer : Union[Timer, None] = None
+        self.__lastDelivery = 0.0
 
-@dataclass
+    def notify(self, oldValue : Any, newValue : Any) -> None:
+        if not self.active:
+            return
+
+        if not self.latestOnly and self.minInterval <= 0:
+            self.__deliver(oldValue, newValue)
+            return
+
+        with self.__mutex:
+            if self.__pending is None:
+                self.__pending = (oldValue, newValue)
+            else:
+                self.__pending = (self.__pending[0], newValue)
+
+            if self.__delivering or self.__timer is not None:
+                return
+
+            if self.__scheduleLocked():
+                return
+
+            self.__delivering = True
+
+        self.__drain()
+
+    def cancel(self) -> None:
+        with self.__mutex:
+            self.active = False
+            self.__pending = None
+            if self.__timer is not None:
+                self.__timer.cancel()
+                self.__timer = None
+
+    def __scheduleLocked(self) -> bool:
+        delay = self.__lastDelivery + self.minInterval - monotonic()
+        if self.minInterval <= 0 or delay <= 0:
+            return False
+
+        self.__timer = Timer(delay, self.__timerFired)
+        self.__timer.daemon = True
+        self.__timer.start()
+        return True
+
+    def __timerFired(self) -> None:
+        with self.__mutex:
+            self.__timer = None
+            if self.__delivering:
+                return
+            self.__delivering = True
+
+        self.__drain()
+
+    def __drain(self) -> None:
+        while True:
+            with self.__mutex:
+                pending = self.__pending
+                self.__pending = None
+                if pending is None or not self.active:
+                    self.__delivering = False
+                    return
+                self.__lastDelivery = monotonic()
+
+            self.__deliver(*pending)
+
+            with self.__mutex:
+                if self.__pending is not None and self.__scheduleLocked():
+                    self.__delivering = False
+                    return
+
+    def __deliver(self, oldValue : Any, newValue : Any) -> None:
+        if self.onlyChanges and oldValue == newValue:
+            return
+
+        try:
+            self.callback(oldValue, newValue)
+        except Exception:
+            # The value is already published, a failing watcher must not fail the writer
+            self.failed += 1
+
+def argumentsKey(kwargs : dict) -> Any:
+    '''Hashable key of call arguments, None when some argument is not hashable'''
+    try:
+        key = frozenset(kwargs.items())
+        hash(key)
+    except TypeError:
+        return None
+    return key
+
+class busActionCache:
+    '''LRU cache of action results with optional time to live, guarded by its own lock'''
+    def __init__(self, maxEntries : int = 128, ttl : Union[float, None] = None, key : Union[Callable[..., Any], None] = None) -> None:
+        self.maxEntries = maxEntries
+        self.ttl = ttl
+        self.key = key
+        self.hits = 0
+        self.misses = 0
+        self.uncacheable = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.__entries : OrderedDict[Any, tuple[Any, float]] = OrderedDict()
+        self.__generation = 0
+        self.__mutex = Lock()
+
+    def __keyOf(self, kwargs : dict) -> Any:
+        if self.key is None:
+            return argumentsKey(kwargs)
+
+        key = self.key(**kwargs)
+        try:
+            hash(key)
+        except TypeError:
+            return None
+        return key
+
+    def lookup(self, kwargs : dict) -> tuple[Any, bool, Any]:
+        '''Returns ticket for store, whether value was found and the value. Ticket is None when arguments can not be cached.'''
+        key = self.__keyOf(kwargs)
+        if key is None:
+            self.uncacheable += 1
+            return None, False, None
+
+        with self.__mutex:
+            entry = self.__entries.get(key)
+            if entry is not None:
+                value, expiresAt = entry
+                if expiresAt >= monotonic():
+                    self.__entries.move_to_end(key)
+                    self.hits += 1
+                    return (key, self.__generation), True, value
+
+                del self.__entries[key]
+                self.expirations += 1
+
+            self.misses += 1
+            return (key, self.__generation), False, None
+
+    def store(self, ticket : Any, value : Any) -> None:
+        '''Stores result of call looked up with ticket, unless cache was cleared while the call ran'''
+        if ticket is None:
+            return
+
+        key, generation = ticket
+        expiresAt = float('inf') if self.ttl is None else monotonic() + self.ttl
+        with self.__mutex:
+            if generation != self.__generation:
+                return
+            self.__entries[key] = (value, expiresAt)
+            self.__entries.move_to_end(key)
+            while len(self.__entries) > self.maxEntries:
+                self.__entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self.__mutex:
+            self.__entries.clear()
+            self.__generation += 1
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "size" : len(self.__entries),
+            "hits" : self.hits,
+            "misses" : self.misses,
+            "uncacheable" : self.uncacheable,
+            "evictions" : self.evictions,
+            "expirations" : self.expirations,
+        }
+
+ACTION_CACHE_OPTIONS = ('maxEntries', 'ttl', 'key')
+
+class LeaderCancelled(BusException):
+    '''Leader of single flight call was cancelled, its followers start the call again'''
+
+class busSingleFlight:
+    '''Shares one in-flight call between concurrent callers with equal arguments'''
+    def __init__(self) -> None:
+        self.coalesced = 0
+        self.__inFlight : dict[Any, Future] = {}
+        self.__mutex = Lock()
+
+    def __join(self, key : Any) -> tuple[Future, bool]:
+        with self.__mutex:
+            future = self.__inFlight.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return future, False
+
+            future = Future()
+            # Running future can not be cancelled, so no single caller can cancel it for the others
+            future.set_running_or_notify_cancel()
+            self.__inFlight[key] = future
+            return future, True
+
+    def __finish(self, key : Any, future : Future, rvalue : Any = None, exception : Union[BaseException, None] = None) -> None:
+        # Callers arriving from now on start a new call instead of getting this result
+        with self.__mutex:
+            if self.__inFlight.get(key) is future:
+                del self.__inFlight[key]
+
+        if future.done():
+            return
+        if exception is None:
+            future.set_result(rvalue)
+        elif isinstance(exception, Exception) and not isinstance(exception, CancelledError):
+            future.set_exception(exception)
+        else:
+            # Cancellation or interrupt of leader is its own, followers take over the call
+            future.set_exception(LeaderCancelled(f'Leader of call stopped with {type(exception).__name__}'))
+
+    def run(self, kwargs : dict, call : Callable[[], Any]) -> Any:
+        key = argumentsKey(kwargs)
+        if key is None:
+            return call()
+
+        while True:
+            future, leader = self.__join(key)
+            if leader:
+                break
+            try:
+                return future.result()
+            except LeaderCancelled:
+                continue
+
+        try:
+            rvalue = call()
+        except BaseException as exception:
+            self.__finish(key, future, exception=exception)
+            raise
+
+        self.__finish(key, future, rvalue)
+        return rvalue
+
+    async def runAsync(self, kwargs : dict, call : Callable[[], Any]) -> Any:
+        key = argumentsKey(kwargs)
+        if key is None:
+            return await call()
+
+        while True:
+            future, leader = self.__join(key)
+            if leader:
+                break
+            try:
+                # Cancelled or timed out follower stops waiting without touching shared call
+                return await asyncio.shield(asyncio.wrap_future(future))
+            except LeaderCancelled:
+                continue
+
+        try:
+            rvalue = await call()
+        except BaseException as exception:
+            self.__finish(key, future, exception=exception)
+            raise
+
+        self.__finish(key, future, rvalue)
+        return rvalue
+
+    def runFuture(self, kwargs : dict, submit : Callable[[], Future]) -> Future:
+        key = argumentsKey(kwargs)
+        if key is None:
+            return submit()
+
+        # Every caller gets own future, cancelling it does not affect the others
+        result = Future()
+        self.__runInto(key, submit, result)
+        return result
+
+    def __runInto(self, key : Any, submit : Callable[[], Future], result : Future) -> None:
+        future, leader = self.__join(key)
+
+        def onShared(shared : Future):
+            exception = shared.exception()
+            if isinstance(exception, LeaderCancelled):
+                self.__runInto(key, submit, result)
+            elif result.set_running_or_notify_cancel():
+                if exception is None:
+                    result.set_result(shared.result())
+                else:
+                    result.set_exception(exception)
+
+        future.add_done_callback(onShared)
+        if not leader:
+            return
+
+        def onDone(done : Future):
+            if done.cancelled():
+                self.__finish(key, future, exception=CancelledError())
+                return
+            exception = done.exception()
+            self.__finish(key, future, None if exception is not None else done.result(), exception)
+
+        try:
+            submit().add_done_callback(onDone)
+        except BaseException as exception:
+            self.__finish(key, future, exception=exception)
+            raise
+
+@dataclass(slots=True)
 class busAction(busEndpoint):
     endpointDelegate : Callable
     arguments : dict[str, type]
     rtype : type
-
-@dataclass
+    _ : KW_ONLY
+    executor : str = 'inline'
+    cache : Union[busActionCache, None] = field(default=None, repr=False, compare=False)
+    singleFlight : Union[busSingleFlight, None] = field(default=None, repr=False, compare=False)
+    validator : Callable[[dict], None] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        self.validator = compileArgumentsValidator(self.arguments)
+
+@dataclass(slots=True)
+class busVector(busEndpoint):
+    '''Fixed length vector of one array typecode, stored in array.array or numpy.ndarray'''
+    typecode : str
+    data : Any
+    _ : KW_ONLY
+    version : int = field(default=0, compare=False)
+
+    def convert(self, values : Any) -> Any:
+        '''Converts values to buffer of vector type, raises InvalidFieldValueType when they do not fit'''
+        try:
+            if isinstance(self.data, array):
+                if isinstance(values, array) and values.typecode == self.typecode:
+                    return values
+                return array(self.typecode, values)
+
+            if not isinstance(values, numpy.ndarray):
+                # Python values are range checked by array the same way as on array backend
+                values = array(self.typecode, values)
+            converted = numpy.asarray(values)
+            if not numpy.can_cast(converted.dtype, self.data.dtype, casting='safe'):
+                raise TypeError(f'can not cast {converted.dtype} to {self.data.dtype}')
+            return converted.astype(self.data.dtype, copy=False).ravel()
+        except (TypeError, ValueError, OverflowError) as exception:
+            raise InvalidFieldValueType(f'Values do not fit vector {self.address} of type {self.typecode}: {exception}')
+
+    def copy(self, start : Union[int, None], stop : Union[int, None]) -> Any:
+        chunk = self.data[start:stop]
+        return chunk if isinstance(chunk, array) else chunk.copy()
+
+@dataclass(slots=True)
 class busGroup:
     groupName : str
     groups : dict[str, 'busGroup']
     endpoints : dict[str, busEndpoint]
+    address : str = ''
+    index : dict[str, Any] = field(default_factory=dict, repr=False, compare=False)
+    rail : Union['busRail', None] = field(default=None, repr=False, compare=False)
 
     def __hash__(self) -> int:
         return hash(self.groupName)
@@ -158,8 +835,20 @@ class busGroup:
         if isGroupNameInvalid(groupName):
             raise InvalidGroupName(f'Group name {groupName} is not vaild name for group')
 
-        newGroup = busGroup(groupName, {}, {})
+        groupName = intern(groupName)
+        newGroup = busGroup(groupName, EMPTY_MAPPING, EMPTY_MAPPING, f'{self.address}.{groupName}', self.index, self.rail)
+        if self.groups is EMPTY_MAPPING:
+            self.groups = {}
         self.groups[groupName] = newGroup
+        self.index[newGroup.address] = newGroup
+
+    def __registerEndpoint(self, endpoint : busEndpoint):
+        endpoint.endpointName = intern(endpoint.endpointName)
+        endpoint.address = f'{self.address}.{endpoint.endpointName}'
+        if self.endpoints is EMPTY_MAPPING:
+            self.endpoints = {}
+        self.endpoints[endpoint.endpointName] = endpoint
+        self.index[endpoint.address] = endpoint
 
     def __checkParameters(self, endpointParameters : dict, requiredParameters : set, allParameters : set):
         endpointParametersKeys = set(endpointParameters.keys())
@@ -180,26 +869,27 @@ class busGroup:
 
     def __checkParametersForEvent(self, endpointParameters : dict):
         requiredParameters = set(["responders"])
-        allParameters = set(["responders"])
+        allParameters = set(["responders", "dispatch", "wait"])
 
         return self.__checkParameters(endpointParameters, requiredParameters, allParameters)
 
     def __checkParametersForField(self, endpointParameters : dict):
-        requiredParameters = set(["type", "value"])
-        allParameters = set(["type", "value"])
+        # Field attached to existing shared memory takes its value from there
+        requiredParameters = set(["type"]) if endpointParameters.get("attach", False) else set(["type", "value"])
+        allParameters = set(["type", "value", "shared", "format", "attach"])
 
         return self.__checkParameters(endpointParameters, requiredParameters, allParameters)
 
     def __checkParametersForAction(self, endpointParameters : dict):
         requiredParameters = set(["responder", "arguments", "rtype"])
-        allParameters = set(["responder", "arguments", "rtype"])
+        allParameters = set(["responder", "arguments", "rtype", "executor", "cache", "singleFlight"])
 
         return self.__checkParameters(endpointParameters, requiredParameters, allParameters)
 
     def __createTriggerEndpoint(self, endpointName, endpointParameters):
         self.__checkParametersForTrigger(endpointParameters)
-        trigger = busTrigger(endpointName, endpointParameters["responder"], endpointParameters["arguments"])
-        self.endpoints[endpointName] = trigger
+        trigger = busTrigger(endpointName, endpointParameters["responder"], endpointParameters["arguments"], rail=self.rail)
+        self.__registerEndpoint(trigger)
 
     def __createEventEndpoint(self, endpointName, endpointParameters):
         self.__checkParametersForEvent(endpointParameters)
@@ -208,30 +898,165 @@ class busGroup:
         if isinstance(responders, Callable):
             responders = [responders]
 
-        event = busEvent(endpointName, responders)
-        self.endpoints[endpointName] = event
+        dispatch = endpointParameters.get("dispatch", 'sequential')
+        if not dispatch in EVENT_DISPATCH_MODES:
+            raise InvalidEnpointParameter(f'Dispatch {dispatch} is not one of {EVENT_DISPATCH_MODES}')
+
+        waitMode = endpointParameters.get("wait", 'all')
+        if not waitMode in EVENT_WAIT_MODES:
+            raise InvalidEnpointParameter(f'Wait {waitMode} is not one of {EVENT_WAIT_MODES}')
+
+        event = busEvent(endpointName, responders, rail=self.rail, dispatch=dispatch, wait=waitMode)
+        self.__registerEndpoint(event)
 
     def __createFieldEndpoint(self, endpointName, endpointParameters):
         self.__checkParametersForField(endpointParameters)
 
         fieldType = endpointParameters["type"]
+        if "shared" in endpointParameters:
+            self.__registerEndpoint(self.__createSharedField(endpointName, fieldType, endpointParameters))
+            return
+
+        if "format" in endpointParameters or "attach" in endpointParameters:
+            raise InvalidEnpointParameter(f'Format and attach are valid only for shared field {endpointName}')
+
         fieldValue = endpointParameters["value"]
         if not isinstance(fieldValue, fieldType):
             raise InvalidFieldValueType(f'Value of type {type(fieldValue)} is not compatibile with type {fieldType}')
 
-        field = busField(endpointName, fieldType, fieldValue)
-        self.endpoints[endpointName] = field
+        field = busField(endpointName, fieldType, fieldValue, rail=self.rail)
+        self.__registerEndpoint(field)
+
+    def __createSharedField(self, endpointName : str, fieldType : type, endpointParameters : dict) -> busField:
+        name = endpointParameters["shared"]
+        if not isinstance(name, str) or name == '':
+            raise InvalidEnpointParameter(f'Shared memory name of {endpointName} has to be non empty string')
+
+        format = endpointParameters.get("format", SHARED_FIELD_FORMATS.get(fieldType))
+        if format is None:
+            raise InvalidEnpointParameter(f'Format is required for shared field {endpointName} of type {fieldType}')
+
+        attach = endpointParameters.get("attach", False)
+        if not isinstance(attach, bool):
+            raise InvalidEnpointParameter(f'Attach of {endpointName} has to be True or False')
+
+        fieldValue = endpointParameters.get("value")
+        if not attach and not isinstance(fieldValue, fieldType):
+            raise InvalidFieldValueType(f'Value of type {type(fieldValue)} is not compatibile with type {fieldType}')
+
+        try:
+            shared = busSharedValue(name, format, attach)
+        except struct.error as exception:
+            raise InvalidEnpointParameter(f'Format {format} of {endpointName} is invalid: {exception}')
+        except (OSError, ValueError) as exception:
+            raise InvalidEnpointParameter(f'Shared memory {name} of {endpointName} can not be used: {exception}')
+
+        try:
+            if attach:
+                fieldValue = shared.read()[0]
+            else:
+                shared.write(shared.pack(fieldValue))
+        except struct.error as exception:
+            shared.close()
+            raise InvalidFieldValueType(f'Value {fieldValue} does not fit format {format}: {exception}')
+
+        return busField(endpointName, fieldType, fieldValue, rail=self.rail, shared=shared)
 
     def __createActionEndpoint(self, endpointName, endpointParameters):
         self.__checkParametersForAction(endpointParameters)
 
+        executor = endpointParameters.get("executor", 'inline')
+        if not executor in ACTION_EXECUTORS:
+            raise InvalidEnpointParameter(f'Executor {executor} is not one of {ACTION_EXECUTORS}')
+
+        if executor == 'process':
+            try:
+                pickle.dumps(endpointParameters["responder"])
+            except Exception:
+                raise InvalidEnpointParameter(f'Responder of {endpointName} can not be pickled for process executor')
+
+        singleFlight = endpointParameters.get("singleFlight", False)
+        if not isinstance(singleFlight, bool):
+            raise InvalidEnpointParameter(f'SingleFlight of {endpointName} has to be True or False')
+
         action = busAction(
             endpointName,
             endpointParameters["responder"],
             endpointParameters["arguments"],
-            endpointParameters["rtype"]
+            endpointParameters["rtype"],
+            rail=self.rail,
+            executor=executor,
+            cache=self.__createActionCache(endpointName, endpointParameters.get("cache")),
+            singleFlight=busSingleFlight() if singleFlight else None
         )
-        self.endpoints[endpointName] = action
+        self.__registerEndpoint(action)
+
+    def __checkParametersForVector(self, endpointParameters : dict):
+        requiredParameters = set(["typecode"])
+        allParameters = set(["typecode", "value", "length", "backend"])
+
+        return self.__checkParameters(endpointParameters, requiredParameters, allParameters)
+
+    def __createVectorEndpoint(self, endpointName, endpointParameters):
+        self.__checkParametersForVector(endpointParameters)
+
+        typecode = endpointParameters["typecode"]
+        if not isinstance(typecode, str) or not typecode in typecodes or typecode == 'u':
+            raise InvalidEnpointParameter(f'Typecode {typecode} of {endpointName} is not numeric array typecode')
+
+        backend = endpointParameters.get("backend", 'array')
+        if not backend in VECTOR_BACKENDS:
+            raise InvalidEnpointParameter(f'Backend {backend} is not one of {VECTOR_BACKENDS}')
+        if backend == 'numpy' and numpy is None:
+            raise InvalidEnpointParameter(f'Backend numpy of {endpointName} requires numpy to be installed')
+
+        if ("value" in endpointParameters) == ("length" in endpointParameters):
+            raise InvalidEnpointParameter(f'Exactly one of value and length is required for vector {endpointName}')
+
+        if "length" in endpointParameters:
+            length = endpointParameters["length"]
+            if not isinstance(length, int) or length < 0:
+                raise InvalidEnpointParameter(f'Length of {endpointName} has to be non negative integer')
+            values = bytes(length * array(typecode).itemsize)
+            data = array(typecode, values) if backend == 'array' else numpy.zeros(length, dtype=typecode)
+        else:
+            try:
+                data = array(typecode, endpointParameters["value"])
+            except (TypeError, ValueError, OverflowError) as exception:
+                raise InvalidFieldValueType(f'Value of {endpointName} does not fit type {typecode}: {exception}')
+            if backend == 'numpy':
+                data = numpy.array(data, dtype=typecode)
+
+        vector = busVector(endpointName, typecode, data, rail=self.rail)
+        self.__registerEndpoint(vector)
+
+    def __createActionCache(self, endpointName : str, options : Union[bool, dict, None]) -> Union[busActionCache, None]:
+        if options is None or options is False:
+            return None
+
+        if options is True:
+            options = {}
+
+        if not isinstance(options, dict):
+            raise InvalidEnpointParameter(f'Cache of {endpointName} has to be True or mapping of {ACTION_CACHE_OPTIONS}')
+
+        unknown = set(options.keys()) - set(ACTION_CACHE_OPTIONS)
+        if len(unknown) != 0:
+            raise InvalidEnpointParameter(f'Cache option {unknown.pop()} is not one of {ACTION_CACHE_OPTIONS}')
+
+        maxEntries = options.get("maxEntries", 128)
+        if not isinstance(maxEntries, int) or maxEntries < 1:
+            raise InvalidEnpointParameter(f'Cache maxEntries of {endpointName} has to be positive integer')
+
+        ttl = options.get("ttl")
+        if ttl is not None and (not isinstance(ttl, (int, float)) or ttl <= 0):
+            raise InvalidEnpointParameter(f'Cache ttl of {endpointName} has to be positive number of seconds')
+
+        key = options.get("key")
+        if key is not None and not callable(key):
+            raise InvalidEnpointParameter(f'Cache key of {endpointName} has to be callable')
+
+        return busActionCache(maxEntries, ttl, key)
 
     def createEndpoint(self, endpointName : str, endpointType : str, endpointParameters):
         if endpointName in self.endpoints:
@@ -249,14 +1074,22 @@ class busGroup:
                 self.__createFieldEndpoint(endpointName, endpointParameters)
             case 'action':
                 self.__createActionEndpoint(endpointName, endpointParameters)
+            case 'vector':
+                self.__createVectorEndpoint(endpointName, endpointParameters)
             case _:
                 raise InvalidEndpointType(f'Invalid enpoint type {endpointType}')
 
-@dataclass
+@dataclass(slots=True)
 class busRail:
     railName : str
     groups : dict[str, busGroup]
     boundModule : Union[str, None]
+    index : dict[str, Any] = field(default_factory=dict, repr=False, compare=False)
+    mutex : Lock = field(default_factory=Lock, repr=False, compare=False)
+    validation : str = 'strict'
+    sampleEvery : int = 100
+    validationTick : int = field(default=0, repr=False, compare=False)
+    validationViolations : int = field(default=0, compare=False)
 
     def __hash__(self) -> int:
         return hash(self.railName)
@@ -274,14 +1107,978 @@ class busRail:
         if isGroupNameInvalid(groupName):
             raise InvalidGroupName(f'Group name {groupName} is not vaild name for group')
 
-        newGroup = busGroup(groupName, {}, {})
+        groupName = intern(groupName)
+        newGroup = busGroup(groupName, EMPTY_MAPPING, EMPTY_MAPPING, f'{self.railName}.{groupName}', self.index, self)
         self.groups[groupName] = newGroup
+        self.index[newGroup.address] = newGroup
+
+@dataclass
+class busNotification:
+    '''Delivered to pattern subscribers, arguments are set for events, values for fields'''
+    address : str
+    kind : str
+    arguments : Union[dict, None] = None
+    oldValue : Any = None
+    newValue : Any = None
+
+class busSubscription:
+    def __init__(self, pattern : str, callback : Callable[[busNotification], Any]) -> None:
+        self.pattern = pattern
+        self.segments = tuple(pattern.split('.'))
+        self.callback = callback
+        self.failed = 0
+
+    def deliver(self, notification : busNotification) -> None:
+        try:
+            self.callback(notification)
+        except Exception:
+            self.failed += 1
+
+class busPatternTrie:
+    '''Trie of subscription patterns keyed by address segments. ``*`` matches one segment,
+    ``**`` matches any number of segments. Matching costs depend on address depth only.'''
+    def __init__(self) -> None:
+        self.children : dict[str, 'busPatternTrie'] = {}
+        self.subscriptions : tuple[busSubscription, ...] = ()
+
+    def insert(self, subscription : busSubscription) -> None:
+        node = self
+        for segment in subscription.segments:
+            child = node.children.get(segment)
+            if child is None:
+                child = busPatternTrie()
+                node.children[segment] = child
+            node = child
+
+        node.subscriptions = node.subscriptions + (subscription,)
+
+    def remove(self, subscription : busSubscription) -> None:
+        node = self
+        for segment in subscription.segments:
+            node = node.children.get(segment)
+            if node is None:
+                return
+
+        node.subscriptions = tuple(other for other in node.subscriptions if other is not subscription)
+
+    def match(self, segments : list[str]) -> tuple[busSubscription, ...]:
+        matched : dict[int, busSubscription] = {}
+        self.__match(segments, 0, matched)
+        return tuple(matched.values())
+
+    def __match(self, segments : list[str], position : int, matched : dict[int, busSubscription]) -> None:
+        anySegments = self.children.get('**')
+        if anySegments is not None:
+            for nextPosition in range(position, len(segments) + 1):
+                anySegments.__match(segments, nextPosition, matched)
+
+        if position == len(segments):
+            for subscription in self.subscriptions:
+                matched[id(subscription)] = subscription
+            return
+
+        for key in (segments[position], '*'):
+            child = self.children.get(key)
+            if child is not None:
+                child.__match(segments, position + 1, matched)
+
+class busEventQueue:
+    '''Bounded queue of published events drained by dispatcher threads'''
+    def __init__(self, maxSize : int, overflow : str) -> None:
+        self.maxSize = maxSize
+        self.overflow = overflow
+        self.published = 0
+        self.dispatched = 0
+        self.dropped = 0
+        self.failed = 0
+        self.__items : deque = deque()
+        self.__closed = False
+        self.__mutex = Lock()
+        self.__notEmpty = Condition(self.__mutex)
+        self.__notFull = Condition(self.__mutex)
+
+    @property
+    def depth(self) -> int:
+        return len(self.__items)
+
+    def put(self, item : Any) -> bool:
+        with self.__mutex:
+            if self.__closed:
+                raise EventDispatcherNotRunning('Event dispatcher is not running')
+
+            if len(self.__items) >= self.maxSize:
+                match self.overflow:
+                    case 'block':
+                        while len(self.__items) >= self.maxSize and not self.__closed:
+                            self.__notFull.wait()
+                        if self.__closed:
+                            raise EventDispatcherNotRunning('Event dispatcher stopped while waiting for queue')
+                    case 'drop-oldest':
+                        self.__items.popleft()
+                        self.dropped += 1
+                    case 'drop-newest':
+                        self.dropped += 1
+                        return False
+                    case 'raise':
+                        raise EventQueueFull(f'Event queue is full, {self.maxSize} events are waiting')
+
+            self.__items.append(item)
+            self.published += 1
+            self.__notEmpty.notify()
+            return True
+
+    def get(self) -> Any:
+        '''Waits for next event, None means queue is closed and drained'''
+        with self.__mutex:
+            while len(self.__items) == 0:
+                if self.__closed:
+                    return None
+                self.__notEmpty.wait()
+
+            item = self.__items.popleft()
+            self.__notFull.notify()
+            return item
+
+    def taskDone(self, failed : bool) -> None:
+        with self.__mutex:
+            self.dispatched += 1
+            if failed:
+                self.failed += 1
+
+    def close(self, drain : bool) -> None:
+        with self.__mutex:
+            self.__closed = True
+            if not drain:
+                self.dropped += len(self.__items)
+                self.__items.clear()
+            self.__notEmpty.notify_all()
+            self.__notFull.notify_all()
+
+    def stats(self) -> dict[str, int]:
+        with self.__mutex:
+            return {
+                "depth" : len(self.__items),
+                "maxSize" : self.maxSize,
+                "published" : self.published,
+                "dispatched" : self.dispatched,
+                "dropped" : self.dropped,
+                "failed" : self.failed,
+            }
+
+@dataclass
+class busCall:
+    '''Dispatch seen by interceptors, args are passed to dispatch after endpoint:
+    (kwargs,) for triggers, events and actions, (value,) for setting field and () for getting it,
+    (kwargs, wait, timeout) for callEventParallel'''
+    address : str
+    operation : str
+    endpoint : busEndpoint
+    args : tuple
+
+@dataclass(frozen=True, slots=True)
+class busAdmitted:
+    '''Returned by proceed for entry of batch, entry runs with args once every entry of batch is admitted'''
+    args : tuple
+
+def admitBatchEntry(bus : Any, endpoint : busEndpoint, *args) -> busAdmitted:
+    return busAdmitted(args)
+
+def composeInterceptors(interceptors : list[Callable], terminal : Callable[[busCall], Any]) -> Callable[[busCall], Any]:
+    def link(interceptor : Callable, proceed : Callable[[busCall], Any]) -> Callable[[busCall], Any]:
+        return lambda call : interceptor(call, proceed)
+
+    handler = terminal
+    for interceptor in reversed(interceptors):
+        handler = link(interceptor, handler)
+    return handler
+
+LATENCY_BUCKETS = 32
+
+@dataclass
+class busEndpointStats:
+    '''Counters of one endpoint recorded by one thread'''
+    calls : int = 0
+    errors : dict[str, int] = field(default_factory=dict)
+    latencyTotal : float = 0.0
+    latencyBuckets : list[int] = field(default_factory=lambda : [0] * LATENCY_BUCKETS)
+    lockAcquisitions : int = 0
+    lockWait : float = 0.0
+    lockHold : float = 0.0
+
+class busMetrics:
+    '''Per endpoint metrics. Every thread records into its own shard, so counters need no lock,
+    shards are merged only when snapshot is taken.'''
+    def __init__(self) -> None:
+        self.__local = local()
+        self.__shards : list[dict[str, busEndpointStats]] = []
+        self.__shardsMutex = Lock()
+
+    def __statsOf(self, address : str) -> busEndpointStats:
+        shard = getattr(self.__local, 'shard', None)
+        if shard is None:
+            shard = {}
+            self.__local.shard = shard
+            with self.__shardsMutex:
+                self.__shards.append(shard)
+
+        stats = shard.get(address)
+        if stats is None:
+            stats = busEndpointStats()
+            shard[address] = stats
+        return stats
+
+    def recordCall(self, address : str, exception : Union[BaseException, None]) -> None:
+        stats = self.__statsOf(address)
+        stats.calls += 1
+        if exception is not None:
+            name = type(exception).__name__
+            stats.errors[name] = stats.errors.get(name, 0) + 1
+
+    def recordError(self, address : str, exception : BaseException) -> None:
+        '''Counts exception of call that was already counted, e.g. one raised by its future'''
+        errors = self.__statsOf(address).errors
+        name = type(exception).__name__
+        errors[name] = errors.get(name, 0) + 1
+
+    def recordLatency(self, address : str, duration : float) -> None:
+        stats = self.__statsOf(address)
+        stats.latencyTotal += duration
+        stats.latencyBuckets[min(int(duration * 1_000_000).bit_length(), LATENCY_BUCKETS - 1)] += 1
+
+    def recordFuture(self, address : str, future : Future) -> None:
+        def onDone(future : Future) -> None:
+            if not future.cancelled() and future.exception() is not None:
+                self.recordError(address, future.exception())
+
+        future.add_done_callback(onDone)
+
+    def recordLockWait(self, address : str, duration : float) -> None:
+        stats = self.__statsOf(address)
+        stats.lockAcquisitions += 1
+        stats.lockWait += duration
+
+    def recordLockHold(self, address : str, duration : float) -> None:
+        self.__statsOf(address).lockHold += duration
+
+    def snapshot(self) -> dict[str, dict[str, Any]]:
+        with self.__shardsMutex:
+            shards = list(self.__shards)
+
+        merged : dict[str, dict[str, Any]] = {}
+        for shard in shards:
+            for address, stats in list(shard.items()):
+                total = merged.get(address)
+                if total is None:
+                    total = {
+                        "calls" : 0, "errors" : {}, "latencyTotal" : 0.0, "latencyBuckets" : {},
+                        "lockAcquisitions" : 0, "lockWait" : 0.0, "lockHold" : 0.0,
+                    }
+                    merged[address] = total
+
+                total["calls"] += stats.calls
+                total["latencyTotal"] += stats.latencyTotal
+                total["lockAcquisitions"] += stats.lockAcquisitions
+                total["lockWait"] += stats.lockWait
+                total["lockHold"] += stats.lockHold
+                for name, count in list(stats.errors.items()):
+                    total["errors"][name] = total["errors"].get(name, 0) + count
+                for bucket, count in enumerate(stats.latencyBuckets):
+                    if count == 0: continue
+                    # Upper bound of bucket in seconds
+                    upperBound = (1 << bucket) / 1_000_000
+                    total["latencyBuckets"][upperBound] = total["latencyBuckets"].get(upperBound, 0) + count
+
+        return merged
+
+class busMeteredLock:
+    '''Wraps dispatch lock to record time spent waiting for it and holding it'''
+    def __init__(self, lock, metrics : busMetrics, address : str) -> None:
+        self.lock = lock
+        self.__metrics = metrics
+        self.__address = address
+        self.__acquiredAt = 0.0
+
+    def acquire(self, blocking : bool = True) -> bool:
+        startedAt = perf_counter()
+        acquired = self.lock.acquire(blocking)
+        if acquired:
+            self.__acquiredAt = perf_counter()
+            self.__metrics.recordLockWait(self.__address, self.__acquiredAt - startedAt)
+        return acquired
+
+    def release(self) -> None:
+        self.__metrics.recordLockHold(self.__address, perf_counter() - self.__acquiredAt)
+        self.lock.release()
+
+    def __enter__(self) -> bool:
+        return self.acquire()
+
+    def __exit__(self, *exception) -> None:
+        self.release()
+
+# Record is payload length and its crc32 followed by pickled (address, value), zero length marks end of log
+JOURNAL_RECORD_HEADER = struct.Struct('!II')
+JOURNAL_GROWTH = 1 << 20
+JOURNAL_LOG = 'journal.log'
+JOURNAL_SEALED = 'journal.sealed'
+JOURNAL_SNAPSHOT = 'snapshot.pickle'
+
+class busJournal:
+    '''Append-only memory-mapped log of field writes in directory, compacted into snapshot of latest values.
+    Compaction seals the log and starts a fresh one, snapshot is written by background thread.'''
+    def __init__(self, directory : Union[str, PathLike], fsync : str, batchSize : int, interval : float, compactAt : int) -> None:
+        self.directory = os.fspath(directory)
+        self.fsync = fsync
+        self.batchSize = batchSize
+        self.interval = interval
+        self.compactAt = compactAt
+        self.records = 0
+        self.skipped = 0
+        self.compactions = 0
+        self.closed = False
+        self.__pending = 0
+        self.__mutex = Lock()
+        self.__latest : dict[str, Any] = {}
+        self.__compactor : Union[Thread, None] = None
+
+        os.makedirs(self.directory, exist_ok=True)
+        snapshotPath = os.path.join(self.directory, JOURNAL_SNAPSHOT)
+        if os.path.exists(snapshotPath):
+            with open(snapshotPath, 'rb') as snapshot:
+                self.__latest = pickle.load(snapshot)
+
+        # Sealed log is left by compaction that did not finish, its records are older than the ones in log
+        self.__sealed = os.path.exists(os.path.join(self.directory, JOURNAL_SEALED))
+        if self.__sealed:
+            with open(os.path.join(self.directory, JOURNAL_SEALED), 'r+b') as sealed:
+                if os.fstat(sealed.fileno()).st_size > 0:
+                    with mmap.mmap(sealed.fileno(), 0) as sealedMap:
+                        self.__scan(sealedMap)
+
+        self.__openLog()
+        self.__offset = self.__scan(self.__map)
+
+        self.__stopped = Event()
+        self.__flusher = None
+        if fsync == 'interval':
+            self.__flusher = Thread(target=self.__flushPeriodically, name='mbus-journal', daemon=True)
+            self.__flusher.start()
+
+        if self.__sealed:
+            with self.__mutex:
+                self.__startCompaction()
+
+    def __openLog(self) -> None:
+        self.__file = open(os.path.join(self.directory, JOURNAL_LOG), 'a+b')
+        if os.fstat(self.__file.fileno()).st_size == 0:
+            self.__file.truncate(JOURNAL_GROWTH)
+        self.__map = mmap.mmap(self.__file.fileno(), 0)
+
+    def __scan(self, log : mmap.mmap) -> int:
+        '''Reads records into latest values and returns offset after the last valid one'''
+        offset = 0
+        size = len(log)
+        while offset + JOURNAL_RECORD_HEADER.size <= size:
+            length, checksum = JOURNAL_RECORD_HEADER.unpack_from(log, offset)
+            if length == 0:
+                return offset
+
+            start = offset + JOURNAL_RECORD_HEADER.size
+            payload = log[start:start + length]
+            if len(payload) != length or crc32(payload) != checksum:
+                break
+
+            address, value = pickle.loads(payload)
+            self.__latest[address] = value
+            offset = start + length
+
+        # Torn tail of interrupted write must not be mistaken for records appended later
+        log[offset:] = bytes(size - offset)
+        return offset
+
+    def latestValues(self) -> dict[str, Any]:
+        with self.__mutex:
+            return dict(self.__latest)
+
+    def record(self, address : str, value : Any) -> None:
+        try:
+            payload = pickle.dumps((address, value), protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            self.skipped += 1
+            return
+
+        with self.__mutex:
+            if self.closed:
+                return
+
+            end = self.__offset + JOURNAL_RECORD_HEADER.size + len(payload)
+            if end > len(self.__map):
+                self.__map.resize(max(end, len(self.__map) + JOURNAL_GROWTH))
+
+            # Header goes last, so the record is complete by the time it can be read
+            self.__map[self.__offset + JOURNAL_RECORD_HEADER.size:end] = payload
+            JOURNAL_RECORD_HEADER.pack_into(self.__map, self.__offset, len(payload), crc32(payload))
+            self.__offset = end
+            self.__latest[address] = value
+            self.records += 1
+            self.__pending += 1
+
+            if self.fsync == 'always' or (self.fsync == 'batch' and self.__pending >= self.batchSize):
+                self.__flush()
+
+            # Log keeps growing while previous snapshot is still being written
+            if self.__offset >= self.compactAt and (self.__compactor is None or not self.__compactor.is_alive()):
+                self.__startCompaction()
+
+    def __flush(self) -> None:
+        if self.__pending > 0:
+            self.__map.flush()
+            self.__pending = 0
+
+    def __flushPeriodically(self) -> None:
+        while not self.__stopped.wait(self.interval):
+            with self.__mutex:
+                if not self.closed:
+                    self.__flush()
+
+    def __startCompaction(self) -> Thread:
+        '''Seals the log and starts writing snapshot of latest values, called with mutex held'''
+        if not self.__sealed:
+            # Sealed log is removed only after snapshot holding its values is durable.
+            # Its unflushed records are covered by that snapshot, so it is not flushed here.
+            self.__map.close()
+            self.__file.close()
+            os.replace(os.path.join(self.directory, JOURNAL_LOG), os.path.join(self.directory, JOURNAL_SEALED))
+            self.__sealed = True
+            self.__openLog()
+            self.__offset = 0
+            self.__pending = 0
+
+        # Copy holds every sealed record, later writes go to the fresh log
+        self.__compactor = Thread(target=self.__writeSnapshot, args=(dict(self.__latest),), name='mbus-journal-compact', daemon=True)
+        self.__compactor.start()
+        return self.__compactor
+
+    def __writeSnapshot(self, latest : dict[str, Any]) -> None:
+        temporaryPath = os.path.join(self.directory, JOURNAL_SNAPSHOT + '.tmp')
+        with open(temporaryPath, 'wb') as snapshot:
+            pickle.dump(latest, snapshot, protocol=pickle.HIGHEST_PROTOCOL)
+            snapshot.flush()
+            os.fsync(snapshot.fileno())
+        os.replace(temporaryPath, os.path.join(self.directory, JOURNAL_SNAPSHOT))
+
+        with self.__mutex:
+            os.remove(os.path.join(self.directory, JOURNAL_SEALED))
+            self.__sealed = False
+            self.compactions += 1
+
+    def compact(self) -> None:
+        '''Seals the log and waits until its snapshot is written'''
+        while True:
+            with self.__mutex:
+                if self.closed:
+                    return
+                compactor = self.__compactor
+                if compactor is None or not compactor.is_alive():
+                    compactor = self.__startCompaction()
+                    break
+            compactor.join()
+        compactor.join()
+
+    def stats(self) -> dict[str, int]:
+        with self.__mutex:
+            return {
+                "records" : self.records,
+                "skipped" : self.skipped,
+                "compactions" : self.compactions,
+                "logBytes" : self.__offset,
+                "values" : len(self.__latest),
+            }
+
+    def close(self) -> None:
+        self.__stopped.set()
+        if self.__flusher is not None:
+            self.__flusher.join()
+
+        with self.__mutex:
+            compactor = self.__compactor
+            if self.closed:
+                return
+            self.closed = True
+            self.__map.flush()
+            self.__map.close()
+            self.__file.close()
+
+        if compactor is not None:
+            compactor.join()
+
+# Frame is payload length, request id and status followed by pickled payload
+BRIDGE_FRAME_HEADER = struct.Struct('!IIB')
+BRIDGE_REQUEST = 0
+BRIDGE_RESULT = 1
+BRIDGE_ERROR = 2
+BRIDGE_OPERATIONS = ('fireTrigger', 'callEvent', 'getFieldValue', 'setFieldValue', 'callAction')
+
+def receiveExactly(connection : socket.socket, size : int) -> Union[bytes, None]:
+    '''Reads size bytes from connection, None when it is closed first'''
+    chunks = []
+    while size > 0:
+        chunk = connection.recv(min(size, 1 << 20))
+        if chunk == b'':
+            return None
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b''.join(chunks)
+
+def receiveFrame(connection : socket.socket) -> Union[tuple[int, int, bytes], None]:
+    header = receiveExactly(connection, BRIDGE_FRAME_HEADER.size)
+    if header is None:
+        return None
+
+    length, requestId, status = BRIDGE_FRAME_HEADER.unpack(header)
+    payload = receiveExactly(connection, length)
+    if payload is None:
+        return None
+    return requestId, status, payload
+
+def packFrame(requestId : int, status : int, payload : bytes) -> bytes:
+    return BRIDGE_FRAME_HEADER.pack(len(payload), requestId, status) + payload
+
+class busBridgeServer:
+    '''Serves bus operations on Unix domain socket. Requests of one connection run concurrently on worker pool
+    and responses are sent as soon as they are ready, matched by request id.'''
+    def __init__(self, bus : Any, path : str, workers : int) -> None:
+        self.__removeStaleSocket(path)
+
+        self.path = path
+        self.__bus = bus
+        self.__connections : set[socket.socket] = set()
+        self.__mutex = Lock()
+
+        self.__socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        # Socket is only reachable by its owner, payloads are pickles
+        oldMask = os.umask(0o177)
+        try:
+            self.__socket.bind(path)
+        except OSError as exception:
+            self.__socket.close()
+            raise BridgePathInUse(f'Bridge can not bind {path}: {exception}')
+        finally:
+            os.umask(oldMask)
+        os.chmod(path, 0o600)
+        status = os.lstat(path)
+        self.__identity = (status.st_dev, status.st_ino)
+        self.__socket.listen()
+
+        self.__workers = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='mbus-bridge')
+        self.__acceptor = Thread(target=self.__accept, name='mbus-bridge-acceptor', daemon=True)
+        self.__acceptor.start()
+
+    @staticmethod
+    def __removeStaleSocket(path : str) -> None:
+        '''Removes socket left by server that is gone, anything else at path is kept'''
+        try:
+            status = os.lstat(path)
+        except FileNotFoundError:
+            return
+
+        if not stat.S_ISSOCK(status.st_mode):
+            raise BridgePathInUse(f'Path {path} exists and is not a socket')
+
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(path)
+        except ConnectionRefusedError:
+            os.unlink(path)
+            return
+        finally:
+            probe.close()
+
+        raise BridgePathInUse(f'Other server is listening on {path}')
+
+
+    def __accept(self) -> None:
+        while True:
+            try:
+                connection, _ = self.__socket.accept()
+            except OSError:
+                return
+
+            with self.__mutex:
+                self.__connections.add(connection)
+            Thread(target=self.__serve, args=(connection,), name='mbus-bridge-connection', daemon=True).start()
+
+    def __serve(self, connection : socket.socket) -> None:
+        sendMutex = Lock()
+        try:
+            while True:
+                frame = receiveFrame(connection)
+                if frame is None:
+                    return
+
+                requestId, _, payload = frame
+                self.__workers.submit(self.__respond, connection, sendMutex, requestId, payload)
+        except (OSError, RuntimeError):
+            return
+        finally:
+            with self.__mutex:
+                self.__connections.discard(connection)
+            connection.close()
+
+    def __dispatch(self, payload : bytes) -> Any:
+        operation, address, argument = pickle.loads(payload)
+        if not operation in BRIDGE_OPERATIONS:
+            raise BusException(f'Operation {operation} is not one of {BRIDGE_OPERATIONS}')
+
+        match operation:
+            case 'getFieldValue':
+                return self.__bus.getFieldValue(address)
+            case 'setFieldValue':
+                return self.__bus.setFieldValue(address, argument)
+            case 'callEvent':
+                rvalue = self.__bus.callEvent(address, **argument)
+                # Futures can not leave the process, finished listeners are reported instead
+                return rvalue.results if isinstance(rvalue, busEventResult) else rvalue
+            case _:
+                return getattr(self.__bus, operation)(address, **argument)
+
+    def __respond(self, connection : socket.socket, sendMutex : Lock, requestId : int, payload : bytes) -> None:
+        try:
+            status, response = BRIDGE_RESULT, pickle.dumps(self.__dispatch(payload))
+        except Exception as exception:
+            try:
+                status, response = BRIDGE_ERROR, pickle.dumps(exception)
+            except Exception:
+                status, response = BRIDGE_ERROR, pickle.dumps(BusException(f'{type(exception).__name__}: {exception}'))
+
+        try:
+            with sendMutex:
+                connection.sendall(packFrame(requestId, status, response))
+        except OSError:
+            pass
+
+    def close(self) -> None:
+        try:
+            self.__socket.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.__socket.close()
+        self.__acceptor.join()
+
+        with self.__mutex:
+            connections = list(self.__connections)
+        for connection in connections:
+            try:
+                connection.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+        self.__workers.shutdown(wait=True)
+        try:
+            status = os.lstat(self.path)
+        except FileNotFoundError:
+            return
+        # Path may have been taken over since, only own socket is removed
+        if (status.st_dev, status.st_ino) == self.__identity:
+            os.unlink(self.path)
+
+class busBridgeConnection:
+    '''One socket to bridge, many requests can be in flight on it at once'''
+    def __init__(self, path : str) -> None:
+        self.__socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            self.__socket.connect(path)
+        except OSError as exception:
+            self.__socket.close()
+            raise BridgeClosed(f'Can not connect to bridge at {path}: {exception}')
+        self.__pending : dict[int, Future] = {}
+        self.__requestIds = count(1)
+        self.__sendMutex = Lock()
+        self.closed = False
+        self.__reader = Thread(target=self.__read, name='mbus-bridge-client', daemon=True)
+        self.__reader.start()
+
+    def submit(self, operation : str, address : str, argument : Any) -> Future:
+        '''Sends request, cancelling returned future before response arrives drops the request'''
+        payload = pickle.dumps((operation, address, argument))
+        future = Future()
+        with self.__sendMutex:
+            if self.closed:
+                raise BridgeClosed('Connection to bridge is closed')
+
+            requestId = next(self.__requestIds) & 0xFFFFFFFF
+            self.__pending[requestId] = future
+            future.add_done_callback(lambda future : self.__forget(requestId, future))
+            try:
+                self.__socket.sendall(packFrame(requestId, BRIDGE_REQUEST, payload))
+            except OSError as exception:
+                del self.__pending[requestId]
+                raise BridgeClosed(f'Connection to bridge is closed: {exception}')
+        return future
+
+    def __forget(self, requestId : int, future : Future) -> None:
+        # Response to cancelled request is skipped by reader once it is not pending
+        if future.cancelled() and self.__pending.get(requestId) is future:
+            del self.__pending[requestId]
+
+    def __read(self) -> None:
+        try:
+            while True:
+                frame = receiveFrame(self.__socket)
+                if frame is None:
+                    return
+
+                requestId, status, payload = frame
+                future = self.__pending.pop(requestId, None)
+                # Running future can no longer be cancelled by caller that timed out
+                if future is None or not future.set_running_or_notify_cancel():
+                    continue
+
+                try:
+                    response = pickle.loads(payload)
+                except Exception as exception:
+                    future.set_exception(BusException(f'Can not unpickle response to request {requestId}: {exception!r}'))
+                    continue
+                if status == BRIDGE_ERROR:
+                    future.set_exception(response)
+                else:
+                    future.set_result(response)
+        except OSError:
+            return
+        finally:
+            with self.__sendMutex:
+                self.closed = True
+                pending = list(self.__pending.values())
+                self.__pending.clear()
+            for future in pending:
+                if future.set_running_or_notify_cancel():
+                    future.set_exception(BridgeClosed('Connection to bridge was closed before response arrived'))
+
+    def close(self) -> None:
+        try:
+            self.__socket.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.__reader.join()
+        self.__socket.close()
+
+class busBridgeClient:
+    '''Calls bus served by bridge on Unix domain socket with the same methods as the bus.
+    Requests are spread over pool of connections, each carrying many requests at once.'''
+    def __init__(self, path : str, connections : int = 4, timeout : Union[float, None] = None) -> None:
+        self.path = path
+        self.timeout = timeout
+        self.__pool : list[Union[busBridgeConnection, None]] = [None] * connections
+        self.__next = count()
+        self.__mutex = Lock()
+
+    def __connection(self) -> busBridgeConnection:
+        slot = next(self.__next) % len(self.__pool)
+        with self.__mutex:
+            connection = self.__pool[slot]
+            if connection is None or connection.closed:
+                connection = busBridgeConnection(self.path)
+                self.__pool[slot] = connection
+            return connection
+
+    def submit(self, operation : str, address : str, argument : Any = None) -> Future:
+        return self.__connection().submit(operation, address, argument)
+
+    def __call(self, operation : str, address : str, argument : Any = None) -> Any:
+        future = self.submit(operation, address, argument)
+        try:
+            return future.result(self.timeout)
+        except TimeoutError:
+            future.cancel()
+            raise
+
+    def fireTrigger(self, address : str, **kwargs) -> None:
+        return self.__call('fireTrigger', address, kwargs)
+
+    def callEvent(self, address : str, **kwargs) -> Any:
+        return self.__call('callEvent', address, kwargs)
+
+    def getFieldValue(self, address : str) -> Any:
+        return self.__call('getFieldValue', address)
+
+    def setFieldValue(self, address : str, value : Any) -> None:
+        return self.__call('setFieldValue', address, value)
+
+    def callAction(self, address : str, **kwargs) -> Any:
+        return self.__call('callAction', address, kwargs)
+
+    def close(self) -> None:
+        with self.__mutex:
+            connections = [connection for connection in self.__pool if connection is not None]
+            self.__pool = [None] * len(self.__pool)
+        for connection in connections:
+            connection.close()
+
+    def __enter__(self) -> 'busBridgeClient':
+        return self
+
+    def __exit__(self, *exception) -> None:
+        self.close()
+
+# Public bus methods taking address of rail element as first argument get it prefixed by busRailView
+RAIL_VIEW_ADDRESS_PARAMETERS = ('address', 'groupAddress')
+RELATIVE_ADDRESS_CACHE_SIZE = 4096
+
+class busRailView:
+    '''Bus bound to one rail, addresses given to it are made absolute once per call without looking at the caller'''
+    def __init__(self, bus : Any, railName : str, railAddressOf : Callable[[str, str], str], exists : Callable[[str], bool]) -> None:
+        self.bus = bus
+        self.railName = railName
+        self.__railAddressOf = railAddressOf
+        self.__exists = exists
+        self.__addresses : dict[str, str] = {}
+
+    def __absoluteOf(self, address : str) -> str:
+        absolute = self.__addresses.get(address)
+        if absolute is not None:
+            return absolute
+
+        absolute = self.__railAddressOf(self.railName, address)
+        # Only addresses that exist are cached, so misses can not grow the cache
+        if self.__exists(absolute):
+            if len(self.__addresses) >= RELATIVE_ADDRESS_CACHE_SIZE:
+                self.__addresses.clear()
+            self.__addresses[address] = absolute
+        return absolute
+
+    def __getattr__(self, name : str) -> Any:
+        method = getattr(self.bus, name)
+        if name.startswith('_') or not callable(method):
+            return method
+
+        parameters = list(inspect.signature(method).parameters)
+        if len(parameters) == 0 or not parameters[0] in RAIL_VIEW_ADDRESS_PARAMETERS:
+            return method
+
+        absoluteOf = self.__absoluteOf
+        if inspect.iscoroutinefunction(method):
+            @wraps(method)
+            async def scoped(address : str, *args, **kwargs):
+                return await method(absoluteOf(address), *args, **kwargs)
+        else:
+            @wraps(method)
+            def scoped(address : str, *args, **kwargs):
+                return method(absoluteOf(address), *args, **kwargs)
+
+        # Later lookups find the wrapper on instance and skip __getattr__
+        setattr(self, name, scoped)
+        return scoped
+
+@dataclass(frozen=True)
+class busHandle:
+    address : str
+    endpoint : busEndpoint
+
+@dataclass(frozen=True)
+class TriggerHandle(busHandle):
+    _fire : Callable = field(repr=False)
+    _fireAsync : Callable = field(repr=False)
+
+    def fire(self, **kwargs) -> bool:
+        return self._fire(self.endpoint, kwargs)
+
+    async def fireAsync(self, **kwargs) -> bool:
+        return await self._fireAsync(self.endpoint, kwargs)
+
+@dataclass(frozen=True)
+class EventHandle(busHandle):
+    _call : Callable = field(repr=False)
+    _callAsync : Callable = field(repr=False)
+
+    def call(self, **kwargs) -> Union[busEventResult, None]:
+        return self._call(self.endpoint, kwargs)
+
+    async def callAsync(self, **kwargs) -> Union[busEventResult, None]:
+        return await self._callAsync(self.endpoint, kwargs)
+
+@dataclass(frozen=True)
+class FieldHandle(busHandle):
+    _get : Callable = field(repr=False)
+    _set : Callable = field(repr=False)
+    _snapshot : Callable = field(repr=False)
+    _getAsync : Callable = field(repr=False)
+    _setAsync : Callable = field(repr=False)
+
+    def get(self) -> Any:
+        return self._get(self.endpoint)
+
+    def set(self, value : Any) -> None:
+        self._set(self.endpoint, value)
+
+    def snapshot(self) -> tuple[Any, int]:
+        return self._snapshot(self.endpoint)
+
+    async def getAsync(self) -> Any:
+        return await self._getAsync(self.endpoint)
+
+    async def setAsync(self, value : Any) -> None:
+        await self._setAsync(self.endpoint, value)
+
+@dataclass(frozen=True)
+class ActionHandle(busHandle):
+    _call : Callable = field(repr=False)
+    _callAsync : Callable = field(repr=False)
+    _submit : Callable = field(repr=False)
+
+    def call(self, **kwargs) -> Any:
+        return self._call(self.endpoint, kwargs)
+
+    async def callAsync(self, **kwargs) -> Any:
+        return await self._callAsync(self.endpoint, kwargs)
+
+    def callFuture(self, **kwargs) -> Future:
+        return self._submit(self.endpoint, kwargs)
+
+@dataclass(frozen=True)
+class VectorHandle(busHandle):
+    _get : Callable = field(repr=False)
+    _set : Callable = field(repr=False)
+    _replace : Callable = field(repr=False)
+
+    def get(self, start : Union[int, None] = None, stop : Union[int, None] = None) -> Any:
+        return self._get(self.endpoint, start, stop)
+
+    def set(self, values : Any, start : int = 0) -> None:
+        self._set(self.endpoint, values, start)
+
+    def replace(self, frame : Any) -> None:
+        self._replace(self.endpoint, frame)
+
+    def view(self) -> memoryview:
+        return memoryview(self.endpoint.data).toreadonly()
 
 class __mBusSingleton:
     def __init__(self) -> None:
         self.__mutex = Lock()
+        self.__lockingStrategy = 'global'
+        self.__configMutex = Lock()
+        self.__threadPool : Union[ThreadPoolExecutor, None] = None
+        self.__threadPoolSize : Union[int, None] = None
+        self.__lockWaiters : Union[ThreadPoolExecutor, None] = None
+        self.__lockGates : WeakKeyDictionary = WeakKeyDictionary()
+        self.__processPool : Union[ProcessPoolExecutor, None] = None
+        self.__processPoolSize : Union[int, None] = None
+        self.__eventQueue : Union[busEventQueue, None] = None
+        self.__eventDispatchers : list[Thread] = []
+        self.__bridge : Union[busBridgeServer, None] = None
+        self.__journal : Union[busJournal, None] = None
+        self.__patterns = busPatternTrie()
+        self.__patternGeneration = 0
+        self.__selectedLockOf : Callable[[busEndpoint], Any] = self.__globalLockOf
+        self.__lockOf : Callable[[busEndpoint], Any] = self.__globalLockOf
+        self.__metrics : Union[busMetrics, None] = None
+        self.__interceptors : dict[str, tuple[Callable, ...]] = {}
+        self.__interceptorGeneration = 0
+        self.__hooked = False
         self.__rails : dict[str, busRail] = {}
+        self.__index : dict[str, busRail | busGroup | busEndpoint] = {}
         self.__railsBindsToModules : dict[str, busRail] = {}
+        self.__relativeAddresses : dict[tuple[Union[str, None], str], str] = {}
 
     def __railExists(self, railName : str):
         return railName in self.__rails.keys()
@@ -291,35 +2088,67 @@ class __mBusSingleton:
             raise RailNotFound(f'Rail {railName} is not found on bus')
         return self.__rails[railName]
 
-    def __bindModuleToRail(self, railName : str):
+    def __bindModuleToRail(self, railName : str) -> busRailView:
         rail = self.__getRail(railName)
 
         if not self.__rails[railName].boundModule is None:
             raise RailAlreadyBound(f'Rail {railName} is already bound to module {rail.boundModule}')
 
-        moduleName = inspect.stack()[2][0].f_locals['self'].__class__.__name__
+        moduleName = callerModuleName()
 
         rail.boundModule = moduleName
         self.__railsBindsToModules[moduleName] = rail
+        self.__relativeAddresses = {}
+
+        return busRailView(self, railName, self.__railAddressOf, self.__index.__contains__)
+
+    def __railAddressOf(self, railName : str, address : str) -> str:
+        return address if address.partition('.')[0] in self.__rails else f'{railName}.{address}'
+
+    def __absoluteAddressOf(self, address : str) -> str:
+        '''Prefixes address with rail bound to calling module, absolute addresses are returned unchanged
 
-    def registerRail(self, railName : str, bindToModule : bool = False) -> None:
+        Calling module is found by walking frames on every call, busRailView returned by binding skips it'''
+        if len(self.__railsBindsToModules) == 0:
+            return address
+
+        moduleName = callerModuleName()
+        absolute = self.__relativeAddresses.get((moduleName, address))
+        if absolute is not None:
+            return absolute
+
+        rail = self.__railsBindsToModules.get(moduleName)
+        if rail is None:
+            return address
+
+        absolute = self.__railAddressOf(rail.railName, address)
+        # Only addresses that exist are cached, so misses can not grow the cache
+        if absolute in self.__index:
+            if len(self.__relativeAddresses) >= RELATIVE_ADDRESS_CACHE_SIZE:
+                self.__relativeAddresses.clear()
+            self.__relativeAddresses[(moduleName, address)] = absolute
+        return absolute
+
+    def registerRail(self, railName : str, bindToModule : bool = False) -> Union[busRailView, None]:
         if isRailNameInvalid(railName):
             raise InvalidRailName(f'Rail name {railName} is not vaild name for rail')
 
         if self.__railExists(railName):
             raise RailAlready(f'Rail name {railName} is already registered')
 
-        newRail = busRail(railName, {}, None)
+        newRail = busRail(railName, {}, None, self.__index)
         self.__rails.update({railName : newRail})
+        self.__index[railName] = newRail
 
         if bindToModule:
-            self.__bindModuleToRail(railName)
+            return self.__bindModuleToRail(railName)
+        return None
 
     def getRails(self) -> set[str]:
         return set(rail.railName for rail in self.__rails.values())
 
-    def bindModuleToRail(self, railName : str) -> None:
-        self.__bindModuleToRail(railName)
+    def bindModuleToRail(self, railName : str) -> busRailView:
+        return self.__bindModuleToRail(railName)
 
     def __getGroupFromAddresses(self, addresses : list[str]) -> busRail | busGroup:
         railName, *groupNames = addresses
@@ -331,6 +2160,14 @@ class __mBusSingleton:
         return finalElement
 
     def __getGroupFromAddress(self, address : str) -> busRail | busGroup:
+        group = self.__index.get(address)
+        if isinstance(group, (busRail, busGroup)):
+            return group
+
+        group = self.__index.get(self.__absoluteAddressOf(address))
+        if isinstance(group, (busRail, busGroup)):
+            return group
+
         return self.__getGroupFromAddresses(address.split('.'))
 
     def __getElementFromAddresses(self, addresses : list[str]) -> busRail | busGroup | busEndpoint:
@@ -366,18 +2203,39 @@ class __mBusSingleton:
         return finalElement.getEndpoint(endpointName) #type: ignore
 
     def __getEnpointFromAddress(self, address : str) -> busEndpoint:
+        endpoint = self.__index.get(address)
+        if isinstance(endpoint, busEndpoint):
+            return endpoint
+
+        endpoint = self.__index.get(self.__absoluteAddressOf(address))
+        if isinstance(endpoint, busEndpoint):
+            return endpoint
+
+        # Slow walk is kept only to raise the exact error for the missing part
         return self.__getEnpointFromAddresses(address.split('.'))
 
     def __getElementFromAddress(self, address : str) -> busRail | busGroup | busEndpoint:
+        element = self.__index.get(address)
+        if element is not None:
+            return element
+
+        element = self.__index.get(self.__absoluteAddressOf(address))
+        if element is not None:
+            return element
+
         return self.__getElementFromAddresses(address.split('.'))
 
     def createGroup(self, address : str) -> None:
+        if address.count('.') == 0:
+            # Only group name can be given by module bound to rail
+            address = self.__absoluteAddressOf(address)
+
         if address.count('.') == 0:
             raise InvalidGroupName('No group name is provided on address')
 
-        *addresses, newGroupName = address.split('.')
+        parentAddress, _, newGroupName = address.rpartition('.')
 
-        finalGroup = self.__getGroupFromAddresses(addresses)
+        finalGroup = self.__getGroupFromAddress(parentAddress)
 
         finalGroup.createGroup(newGroupName)
 
@@ -388,117 +2246,1301 @@ class __mBusSingleton:
 
         targetGroup.createEndpoint(endpointName, endpointType, endpointParameters)
 
+    def loadSchema(self, schema : Union[dict, str, PathLike]) -> None:
+        '''Creates rails, groups and endpoints described by schema or JSON file with it.
+        Whole schema is validated first, nothing is created when any part of it is invalid.'''
+        if not isinstance(schema, dict):
+            with open(schema) as schemaFile:
+                schema = json.load(schemaFile)
+
+        railsSchema = schema.get('rails') if isinstance(schema, dict) else None
+        if not isinstance(railsSchema, dict):
+            raise SchemaError(['rails: Mapping of rail names to rails is required'])
+
+        # Staged elements are indexed here and become visible only after every check passed
+        staging : dict[str, Any] = {}
+        grafts : list[tuple[Union[busRail, busGroup], str, str, Any]] = []
+        newRails : list[busRail] = []
+        errors : list[str] = []
+
+        for railName, railSchema in railsSchema.items():
+            path = f'rails.{railName}'
+            if not self.__isSchemaNodeValid(railSchema, ('groups',), path, errors):
+                continue
+
+            if not isinstance(railName, str) or isRailNameInvalid(railName):
+                errors.append(f'{path}: Rail name {railName} is not vaild name for rail')
+                continue
+
+            rail = self.__rails.get(railName)
+            if rail is None:
+                rail = busRail(intern(railName), {}, None, staging)
+                staging[railName] = rail
+                newRails.append(rail)
+
+            self.__stageSchemaGroups(rail, railName, railSchema.get('groups', {}), path, staging, grafts, errors)
+
+        if len(errors) > 0:
+            raise SchemaError(errors)
+
+        for element in staging.values():
+            if isinstance(element, (busRail, busGroup)):
+                element.index = self.__index
+
+        for rail in newRails:
+            self.__rails[rail.railName] = rail
+
+        for parent, attribute, name, element in grafts:
+            children = getattr(parent, attribute)
+            if children is EMPTY_MAPPING:
+                children = {}
+                setattr(parent, attribute, children)
+            children[name] = element
+
+        self.__index.update(staging)
+
+    def __isSchemaNodeValid(self, node : Any, keys : tuple[str, ...], path : str, errors : list[str]) -> bool:
+        if not isinstance(node, dict):
+            errors.append(f'{path}: Has to be a mapping')
+            return False
+
+        unknown = set(node.keys()) - set(keys)
+        if len(unknown) != 0:
+            errors.append(f'{path}: Unknown keys {sorted(unknown)}, allowed keys are {list(keys)}')
+        return True
+
+    def __stageSchemaGroups(self, parent : Union[busRail, busGroup], parentAddress : str, groupsSchema : Any, path : str,
+                            staging : dict[str, Any], grafts : list, errors : list[str]) -> None:
+        if not isinstance(groupsSchema, dict):
+            errors.append(f'{path}.groups: Mapping of group names to groups is required')
+            return
+
+        for groupName, groupSchema in groupsSchema.items():
+            groupPath = f'{path}.groups.{groupName}'
+            if not self.__isSchemaNodeValid(groupSchema, ('groups', 'endpoints'), groupPath, errors):
+                continue
+
+            if not isinstance(groupName, str) or isGroupNameInvalid(groupName):
+                errors.append(f'{groupPath}: Group name {groupName} is not vaild name for group')
+                continue
+
+            if groupName in getattr(parent, 'endpoints', EMPTY_MAPPING):
+                errors.append(f'{groupPath}: Group collides with endpoint {groupName}')
+                continue
+
+            group = parent.groups.get(groupName)
+            if group is None:
+                address = f'{parentAddress}.{groupName}'
+                rail = parent if isinstance(parent, busRail) else parent.rail
+                group = busGroup(intern(groupName), EMPTY_MAPPING, EMPTY_MAPPING, address, staging, rail)
+                staging[address] = group
+                if parent.index is staging:
+                    if parent.groups is EMPTY_MAPPING:
+                        parent.groups = {}
+                    parent.groups[group.groupName] = group
+                else:
+                    grafts.append((parent, 'groups', group.groupName, group))
+
+            subgroupsSchema = groupSchema.get('groups', {})
+            self.__stageSchemaEndpoints(group, groupSchema.get('endpoints', {}), subgroupsSchema, groupPath, staging, grafts, errors)
+            self.__stageSchemaGroups(group, group.address, subgroupsSchema, groupPath, staging, grafts, errors)
+
+    def __stageSchemaEndpoints(self, group : busGroup, endpointsSchema : Any, subgroupsSchema : Any, path : str,
+                               staging : dict[str, Any], grafts : list, errors : list[str]) -> None:
+        if not isinstance(endpointsSchema, dict):
+            errors.append(f'{path}.endpoints: Mapping of endpoint names to endpoints is required')
+            return
+
+        # Existing group must stay untouched, its new endpoints are built in a detached copy
+        staged = group.index is staging
+        target = group if staged else busGroup(group.groupName, EMPTY_MAPPING, EMPTY_MAPPING, group.address, staging, group.rail)
+
+        for endpointName, endpointSchema in endpointsSchema.items():
+            endpointPath = f'{path}.endpoints.{endpointName}'
+            if not isinstance(endpointName, str) or endpointName == '' or '.' in endpointName:
+                errors.append(f'{endpointPath}: Endpoint name {endpointName} is not vaild name for endpoint')
+                continue
+
+            if endpointName in group.endpoints:
+                errors.append(f'{endpointPath}: Endpoint already exists in group {group.groupName}')
+                continue
+
+            if endpointName in group.groups or (isinstance(subgroupsSchema, dict) and endpointName in subgroupsSchema):
+                errors.append(f'{endpointPath}: Endpoint collides with group {endpointName} in group {group.groupName}')
+                continue
+
+            try:
+                kind, parameters = resolveSchemaEndpoint(endpointSchema)
+                target.createEndpoint(endpointName, kind, parameters)
+            except Exception as exception:
+                errors.append(f'{endpointPath}: {exception}')
+
+        if not staged:
+            for endpoint in target.endpoints.values():
+                grafts.append((group, 'endpoints', endpoint.endpointName, endpoint))
+
     def addressExists(self, address : str) -> bool:
-        addressList = address.split('.')
-        match len(addressList):
-            case 0:
-                return False
-            case 1:
-                return addressList[0] in self.getRails()
-            case 2 if not addressList[0] in self.getRails():
-                return False
-            case 2 if addressList[0] in self.getRails():
-                return addressList[1] in self.__getRail(addressList[0]).groups.keys()
-
-        railName, *groupAddress = addressList 
-        lastElement = self.__getRail(railName)
-
-        for elementName in groupAddress[:-1]:
-            if not elementName in lastElement.groups.keys():
-                return False
-            lastElement = lastElement.getGroup(elementName)
-
-        lastElementName = groupAddress[-1]
-
-        return lastElementName in lastElement.groups.keys() or lastElementName in lastElement.endpoints.keys() # type: ignore
-
-    def __checkArguments(self, endpointRequiredArguments : dict, endpointArguments : dict):
-        endpointArgumentsSet = set(endpointArguments.keys())
-        endpointRequiredArgumentsSet = set(endpointRequiredArguments.keys())
-
-        difference = endpointArgumentsSet - endpointRequiredArgumentsSet
-        if len(difference) > 0:
-            raise UnknownArgument(f"Unknown endpoint argument {difference.pop()}")
-
-        difference = endpointRequiredArgumentsSet - endpointArgumentsSet
-        if len(difference) > 0:
-            raise MissingArgumentException(f"Missing endpoint argument {difference.pop()}")
-
-        for (name, value) in endpointArguments.items():
-            requiredType = endpointRequiredArguments.get(name)
-            if requiredType == None: continue
-            if not isinstance(value, requiredType):
-                raise InvalidArgument(f"Argument {name} is not of type {requiredType}")
+        return address in self.__index
 
-    def __fireTriggerWithMutex(self, endpoint : busTrigger, **kwargs) -> bool:
+    def setValidationMode(self, railName : str, mode : str, sampleEvery : int = 100) -> None:
+        '''Selects how endpoints on rail validate arguments, field values and returned values.
+        Sampled mode validates one of ``sampleEvery`` calls and counts violations instead of raising.'''
+        rail = self.__getRail(railName)
+
+        if not mode in VALIDATION_MODES:
+            raise InvalidValidationMode(f'Invalid validation mode {mode}, expected one of {VALIDATION_MODES}')
+
+        if sampleEvery < 1:
+            raise InvalidValidationMode(f'Sample rate must be positive, got {sampleEvery}')
+
+        rail.sampleEvery = sampleEvery
+        rail.validation = mode
+
+    def getValidationMode(self, railName : str) -> str:
+        return self.__getRail(railName).validation
+
+    def getValidationViolations(self, railName : str) -> int:
+        return self.__getRail(railName).validationViolations
+
+    def __validationOf(self, endpoint : busEndpoint) -> str:
+        '''Decides once per call how it is validated: strict raises, sampled counts violations, off skips'''
+        rail = endpoint.rail
+        if rail is None or rail.validation == 'strict':
+            return 'strict'
+
+        if rail.validation == 'off':
+            return 'off'
+
+        rail.validationTick += 1
+        return 'sampled' if rail.validationTick % rail.sampleEvery == 0 else 'off'
+
+    def __validate(self, endpoint : busEndpoint, validation : str, check : Callable, value : Any):
+        if validation == 'strict':
+            check(endpoint, value)
+        elif validation == 'sampled':
+            try:
+                check(endpoint, value)
+            except BusException:
+                endpoint.rail.validationViolations += 1
+
+    def __checkEndpointArguments(self, endpoint : busTrigger | busAction, kwargs : dict):
+        endpoint.validator(kwargs)
+
+    def __checkFieldType(self, endpoint : busField, value : Any):
+        if not isinstance(value, endpoint.type):
+            raise InvalidFieldValueType(f"Value {value} is not of type {endpoint.type}")
 
+    def __globalLockOf(self, endpoint : busEndpoint):
+        return self.__mutex
+
+    def __railLockOf(self, endpoint : busEndpoint):
+        if endpoint.rail is None:
+            return self.__mutex
+        return endpoint.rail.mutex
+
+    def __endpointLockOf(self, endpoint : busEndpoint):
+        return endpoint.getMutex()
+
+    def __noLockOf(self, endpoint : busEndpoint):
+        return NO_LOCK
+
+    def setLockingStrategy(self, strategy : str) -> None:
+        '''Selects which lock guards dispatch. Should be changed while the bus is idle,
+        calls already holding the previous lock are not waited for.'''
+        match strategy:
+            case 'global':
+                self.__selectedLockOf = self.__globalLockOf
+            case 'rail':
+                self.__selectedLockOf = self.__railLockOf
+            case 'endpoint':
+                self.__selectedLockOf = self.__endpointLockOf
+            case 'none':
+                self.__selectedLockOf = self.__noLockOf
+            case _:
+                raise InvalidLockingStrategy(f'Invalid locking strategy {strategy}, expected one of {LOCKING_STRATEGIES}')
+
+        self.__lockingStrategy = strategy
+        self.__updateLockOf()
+
+    def __updateLockOf(self) -> None:
+        self.__lockOf = self.__selectedLockOf if self.__metrics is None else self.__meteredLockOf
+
+    def __meteredLockOf(self, endpoint : busEndpoint):
+        lock = self.__selectedLockOf(endpoint)
+        metrics = self.__metrics
+        if lock is NO_LOCK or metrics is None:
+            return lock
+        return busMeteredLock(lock, metrics, endpoint.address)
+
+    def enableMetrics(self, enabled : bool = True) -> None:
+        '''Starts or stops collecting per endpoint metrics, stopping drops collected metrics'''
+        self.__metrics = busMetrics() if enabled else None
+        self.__updateLockOf()
+        self.__updateHooked()
+
+    def stats(self) -> dict[str, dict[str, Any]]:
+        '''Snapshot of metrics per endpoint address, empty when metrics are disabled'''
+        metrics = self.__metrics
+        if metrics is None:
+            return {}
+        return metrics.snapshot()
+
+    def addInterceptor(self, interceptor : Callable[[busCall, Callable], Any], scope : str = '') -> None:
+        '''Wraps dispatch of every endpoint under scope address, empty scope means whole bus.
+        Interceptor is called as interceptor(call, proceed) and should return proceed(call) or its own value.'''
+        with self.__configMutex:
+            self.__interceptors[scope] = self.__interceptors.get(scope, ()) + (interceptor,)
+            self.__interceptorGeneration += 1
+            self.__updateHooked()
+
+    def removeInterceptor(self, interceptor : Callable[[busCall, Callable], Any], scope : str = '') -> None:
+        with self.__configMutex:
+            remaining = tuple(other for other in self.__interceptors.get(scope, ()) if other is not interceptor)
+            if len(remaining) > 0:
+                self.__interceptors[scope] = remaining
+            else:
+                self.__interceptors.pop(scope, None)
+            self.__interceptorGeneration += 1
+            self.__updateHooked()
+
+    def __updateHooked(self) -> None:
+        self.__hooked = self.__metrics is not None or len(self.__interceptors) > 0
+
+    def __interceptorChainOf(self, endpoint : busEndpoint, operation : str, dispatch : Callable) -> Union[Callable, None]:
+        generation = self.__interceptorGeneration
+        if endpoint.interceptorGeneration != generation or endpoint.interceptorChains is None:
+            endpoint.interceptorChains = {}
+            endpoint.interceptorGeneration = generation
+
+        chains = endpoint.interceptorChains
+        if operation in chains:
+            return chains[operation]
+
+        # Outer scopes wrap inner ones, bus wide interceptors run first
+        interceptors = []
+        for scope in sorted(self.__interceptors, key=lambda scope : scope.count('.') + (scope != '')):
+            if scope == '' or endpoint.address.startswith(scope + '.'):
+                interceptors += self.__interceptors[scope]
+
+        chain = None
+        if len(interceptors) > 0:
+            chain = composeInterceptors(interceptors, lambda call : dispatch(self, call.endpoint, *call.args))
+
+        chains[operation] = chain
+        return chain
+
+    def __hookable(operation : str) -> Callable:
+        '''Routes dispatch through interceptors and metrics, bus with neither runs dispatch directly'''
+        def decorate(dispatch : Callable) -> Callable:
+            @wraps(dispatch)
+            def hookedDispatch(self, endpoint : busEndpoint, *args):
+                if not self.__hooked:
+                    return dispatch(self, endpoint, *args)
+
+                chain = self.__interceptorChainOf(endpoint, operation, dispatch)
+                metrics = self.__metrics
+                if metrics is None:
+                    if chain is None:
+                        return dispatch(self, endpoint, *args)
+                    return chain(busCall(endpoint.address, operation, endpoint, args))
+
+                try:
+                    if chain is None:
+                        rvalue = dispatch(self, endpoint, *args)
+                    else:
+                        rvalue = chain(busCall(endpoint.address, operation, endpoint, args))
+                except BaseException as exception:
+                    metrics.recordCall(endpoint.address, exception)
+                    raise
+                metrics.recordCall(endpoint.address, None)
+
+                # Responders of futures and parallel events fail after dispatch returned
+                if isinstance(rvalue, Future):
+                    metrics.recordFuture(endpoint.address, rvalue)
+                elif isinstance(rvalue, busEventResult):
+                    for future in rvalue.futures:
+                        metrics.recordFuture(endpoint.address, future)
+                return rvalue
+
+            return hookedDispatch
+
+        return decorate
+
+    def __hookableAsync(operation : str) -> Callable:
+        def decorate(dispatch : Callable) -> Callable:
+            @wraps(dispatch)
+            async def hookedDispatch(self, endpoint : busEndpoint, *args):
+                if not self.__hooked:
+                    return await dispatch(self, endpoint, *args)
+
+                chain = self.__interceptorChainOf(endpoint, operation, dispatch)
+                metrics = self.__metrics
+                try:
+                    if chain is None:
+                        rvalue = await dispatch(self, endpoint, *args)
+                    else:
+                        rvalue = await chain(busCall(endpoint.address, operation, endpoint, args))
+                except BaseException as exception:
+                    if metrics is not None:
+                        metrics.recordCall(endpoint.address, exception)
+                    raise
+                if metrics is not None:
+                    metrics.recordCall(endpoint.address, None)
+                    if isinstance(rvalue, busEventResult):
+                        for future in rvalue.futures:
+                            metrics.recordFuture(endpoint.address, future)
+                return rvalue
+
+            return hookedDispatch
+
+        return decorate
+
+    def getLockingStrategy(self) -> str:
+        return self.__lockingStrategy
+
+    def __timedResponder(self, endpoint : busEndpoint, delegate : Callable, kwargs : dict) -> Any:
+        '''Runs responder and records its latency, callers check that metrics are enabled'''
+        startedAt = perf_counter()
+        try:
+            return delegate(**kwargs)
+        finally:
+            metrics = self.__metrics
+            if metrics is not None:
+                metrics.recordLatency(endpoint.address, perf_counter() - startedAt)
+
+    def __fireTriggerWithMutex(self, endpoint : busTrigger, **kwargs) -> bool:
+        if self.__metrics is not None:
+            return self.__timedResponder(endpoint, endpoint.endpointDelegate, kwargs)
         return endpoint.endpointDelegate(**kwargs)
 
-    def fireTrigger(self, address : str, **kwargs) -> bool:
+    @__hookable('fireTrigger')
+    def __fireTriggerEndpoint(self, endpoint : busTrigger, kwargs : dict) -> bool:
+        self.__validate(endpoint, self.__validationOf(endpoint), self.__checkEndpointArguments, kwargs)
+
+        with self.__lockOf(endpoint):
+            return self.__fireTriggerWithMutex(endpoint, **kwargs)
+
+    def __getTrigger(self, address : str) -> busTrigger:
         endpoint = self.__getEnpointFromAddress(address)
         if not isinstance(endpoint, busTrigger):
             raise InvalidTrigger(f'Invalid trigger {address}')
 
-        self.__checkArguments(endpoint.arguments, kwargs)
+        return endpoint
 
-        with self.__mutex:
-            return self.__fireTriggerWithMutex(endpoint, **kwargs)
+    def fireTrigger(self, address : str, **kwargs) -> bool:
+        return self.__fireTriggerEndpoint(self.__getTrigger(address), kwargs)
 
-    def __callEventWithMutex(self, delegates : list[Callable], **kwargs):
+    def __callEventWithMutex(self, endpoint : busEvent, delegates : list[Callable], **kwargs):
+        if self.__metrics is not None:
+            for delegate in delegates:
+                self.__timedResponder(endpoint, delegate, kwargs)
+            return
 
         for delegate in delegates:
             delegate(**kwargs)
 
-    def callEvent(self, address : str, **kwargs):
-        endpoint = self.__getEnpointFromAddress(address)
-
-        if not isinstance(endpoint, busEvent):
-            raise InvalidEvent(f'Invalid event {address}')
+    def setThreadPoolSize(self, maxWorkers : Union[int, None]) -> None:
+        '''Sets number of threads running parallel event listeners and action futures, None picks executor default'''
+        with self.__configMutex:
+            oldPool = self.__threadPool
+            self.__threadPool = None
+            self.__threadPoolSize = maxWorkers
+
+        if oldPool is not None:
+            oldPool.shutdown(wait=False)
+
+    def __getThreadPool(self) -> ThreadPoolExecutor:
+        with self.__configMutex:
+            if self.__threadPool is None:
+                self.__threadPool = ThreadPoolExecutor(self.__threadPoolSize, thread_name_prefix='mbus')
+            return self.__threadPool
+
+    def setProcessPoolSize(self, maxWorkers : Union[int, None]) -> None:
+        '''Sets number of worker processes running process executed actions, None picks executor default'''
+        with self.__configMutex:
+            oldPool = self.__processPool
+            self.__processPool = None
+            self.__processPoolSize = maxWorkers
+
+        if oldPool is not None:
+            oldPool.shutdown(wait=False)
+
+    def __getProcessPool(self) -> ProcessPoolExecutor:
+        with self.__configMutex:
+            if self.__processPool is None:
+                self.__processPool = ProcessPoolExecutor(self.__processPoolSize)
+            return self.__processPool
+
+    def __fanOutEvent(self, endpoint : busEvent, kwargs : dict, waitMode : str, timeout : Union[float, None]) -> busEventResult:
+        if not waitMode in EVENT_WAIT_MODES:
+            raise InvalidEnpointParameter(f'Wait {waitMode} is not one of {EVENT_WAIT_MODES}')
+
+        pool = self.__getThreadPool()
+        if self.__metrics is not None:
+            futures = [pool.submit(self.__timedResponder, endpoint, delegate, kwargs) for delegate in endpoint.endpointDelegates]
+        else:
+            futures = [pool.submit(delegate, **kwargs) for delegate in endpoint.endpointDelegates]
+
+        match waitMode:
+            case 'all':
+                waitForFutures(futures, timeout, ALL_COMPLETED)
+            case 'first':
+                waitForFutures(futures, timeout, FIRST_COMPLETED)
+
+        self.__eventCalled(endpoint, kwargs)
+        return busEventResult(futures)
+
+    @__hookable('callEvent')
+    def __callEventEndpoint(self, endpoint : busEvent, kwargs : dict) -> Union[busEventResult, None]:
+        if endpoint.dispatch == 'parallel':
+            return self.__fanOutEvent(endpoint, kwargs, endpoint.wait, None)
 
         delegates = endpoint.endpointDelegates
 
-        with self.__mutex:
-            self.__callEventWithMutex(delegates, **kwargs)
+        with self.__lockOf(endpoint):
+            self.__callEventWithMutex(endpoint, delegates, **kwargs)
 
-    def setFieldValue(self, address : str, value : Any):
+        self.__eventCalled(endpoint, kwargs)
+
+    def __getEvent(self, address : str) -> busEvent:
         endpoint = self.__getEnpointFromAddress(address)
+        if not isinstance(endpoint, busEvent):
+            raise InvalidEvent(f'Invalid event {address}')
+
+        return endpoint
+
+    def callEvent(self, address : str, **kwargs) -> Union[busEventResult, None]:
+        return self.__callEventEndpoint(self.__getEvent(address), kwargs)
+
+    @__hookable('callEventParallel')
+    def __callEventParallelEndpoint(self, endpoint : busEvent, kwargs : dict, waitMode : str, timeout : Union[float, None]) -> busEventResult:
+        return self.__fanOutEvent(endpoint, kwargs, waitMode, timeout)
+
+    def callEventParallel(self, address : str, arguments : Union[dict, None] = None,
+                          wait : Union[str, None] = None, timeout : Union[float, None] = None) -> busEventResult:
+        endpoint = self.__getEvent(address)
+        return self.__callEventParallelEndpoint(endpoint, arguments or {}, wait or endpoint.wait, timeout)
+
+    def startEventDispatcher(self, threads : int = 1, maxSize : int = 1024, overflow : str = 'block') -> None:
+        '''Starts dispatcher threads draining events queued with publishEvent'''
+        if not overflow in OVERFLOW_POLICIES:
+            raise InvalidOverflowPolicy(f'Invalid overflow policy {overflow}, expected one of {OVERFLOW_POLICIES}')
+        if threads < 1 or maxSize < 1:
+            raise InvalidDispatcherSize(f'Event dispatcher needs at least one thread and queue slot, got {threads} and {maxSize}')
+
+        with self.__configMutex:
+            if self.__eventQueue is not None:
+                raise EventDispatcherRunning('Event dispatcher is already running')
+
+            queue = busEventQueue(maxSize, overflow)
+            self.__eventQueue = queue
+            self.__eventDispatchers = [
+                Thread(target=self.__dispatchEvents, args=(queue,), name=f'mbus-dispatcher-{number}', daemon=True)
+                for number in range(threads)
+            ]
+
+        for dispatcher in self.__eventDispatchers:
+            dispatcher.start()
+
+    def stopEventDispatcher(self, drain : bool = True) -> None:
+        '''Stops dispatcher threads, with drain queued events are delivered first, otherwise they are dropped'''
+        with self.__configMutex:
+            queue = self.__eventQueue
+            dispatchers = self.__eventDispatchers
+            self.__eventQueue = None
+            self.__eventDispatchers = []
+
+        if queue is None:
+            raise EventDispatcherNotRunning('Event dispatcher is not running')
+
+        queue.close(drain)
+        for dispatcher in dispatchers:
+            dispatcher.join()
+
+    def __dispatchEvents(self, queue : busEventQueue) -> None:
+        while True:
+            item = queue.get()
+            if item is None:
+                return
+
+            endpoint, kwargs = item
+            try:
+                self.__callEventEndpoint(endpoint, kwargs)
+            except Exception:
+                queue.taskDone(failed=True)
+            else:
+                queue.taskDone(failed=False)
+
+    def publishEvent(self, address : str, **kwargs) -> bool:
+        '''Queues event for dispatcher threads, returns False when event was dropped by overflow policy'''
+        queue = self.__eventQueue
+        if queue is None:
+            raise EventDispatcherNotRunning('Event dispatcher is not running')
+
+        return queue.put((self.__getEvent(address), kwargs))
+
+    def getEventQueueStats(self) -> dict[str, int]:
+        queue = self.__eventQueue
+        if queue is None:
+            raise EventDispatcherNotRunning('Event dispatcher is not running')
+
+        return queue.stats()
+
+    def startBridge(self, path : str, workers : int = 8) -> busBridgeServer:
+        '''Serves this bus on Unix domain socket at path for busBridgeClient in other processes'''
+        with self.__configMutex:
+            if self.__bridge is not None:
+                raise BridgeRunning(f'Bridge is already running on {self.__bridge.path}')
+
+            self.__bridge = busBridgeServer(self, path, workers)
+            return self.__bridge
+
+    def stopBridge(self) -> None:
+        with self.__configMutex:
+            bridge = self.__bridge
+            self.__bridge = None
+
+        if bridge is None:
+            raise BridgeNotRunning('Bridge is not running')
+
+        bridge.close()
+
+    def enableJournal(self, path : Union[str, PathLike], fsync : str = 'batch', batchSize : int = 64,
+                      interval : float = 1.0, compactAt : int = 64 << 20) -> dict[str, int]:
+        '''Replays journal in directory path into existing fields, then records every field write there.
+        Returns numbers of replayed values, values of missing fields and values not valid for their field.'''
+        if not fsync in FSYNC_POLICIES:
+            raise InvalidFsyncPolicy(f'Invalid fsync policy {fsync}, expected one of {FSYNC_POLICIES}')
+
+        with self.__configMutex:
+            if self.__journal is not None:
+                raise JournalEnabled(f'Journal is already enabled in {self.__journal.directory}')
+
+            journal = busJournal(path, fsync, batchSize, interval, compactAt)
+            replay = {"replayed" : 0, "missing" : 0, "invalid" : 0}
+            for address, value in journal.latestValues().items():
+                endpoint = self.__index.get(address)
+                if not isinstance(endpoint, busField):
+                    replay["missing"] += 1
+                    continue
+
+                if not isinstance(value, endpoint.type):
+                    replay["invalid"] += 1
+                    continue
+
+                try:
+                    with self.__fieldWriteLockOf(endpoint):
+                        self.__publishFieldValue(endpoint, value)
+                except BusException:
+                    replay["invalid"] += 1
+                    continue
+                replay["replayed"] += 1
+
+            self.__journal = journal
+            return replay
+
+    def disableJournal(self) -> None:
+        with self.__configMutex:
+            journal = self.__journal
+            self.__journal = None
+
+        if journal is None:
+            raise JournalNotEnabled('Journal is not enabled')
+
+        journal.close()
+
+    def compactJournal(self) -> None:
+        journal = self.__journal
+        if journal is None:
+            raise JournalNotEnabled('Journal is not enabled')
+
+        journal.compact()
+
+    def getJournalStats(self) -> dict[str, int]:
+        journal = self.__journal
+        if journal is None:
+            raise JournalNotEnabled('Journal is not enabled')
+
+        return journal.stats()
+
+    def subscribe(self, pattern : str, callback : Callable[[busNotification], Any]) -> busSubscription:
+        '''Subscribes callback to every event call and field write on addresses matching pattern,
+        including endpoints created later'''
+        segments = pattern.split('.')
+        for segment in segments:
+            if segment in ('*', '**'): continue
+            if len(segment) == 0 or '*' in segment:
+                raise InvalidPattern(f'Invalid segment {segment!r} in pattern {pattern}')
+
+        subscription = busSubscription(pattern, callback)
+        with self.__configMutex:
+            self.__patterns.insert(subscription)
+            self.__patternGeneration += 1
+
+        return subscription
+
+    def unsubscribe(self, subscription : busSubscription) -> None:
+        with self.__configMutex:
+            self.__patterns.remove(subscription)
+            self.__patternGeneration += 1
+
+    def __subscriptionsOf(self, endpoint : busEndpoint) -> tuple[busSubscription, ...]:
+        generation = self.__patternGeneration
+        if endpoint.patternGeneration != generation:
+            endpoint.patternSubscriptions = self.__patterns.match(endpoint.address.split('.'))
+            endpoint.patternGeneration = generation
+
+        return endpoint.patternSubscriptions
+
+    def __eventCalled(self, endpoint : busEvent, kwargs : dict):
+        '''Runs after event lock is released'''
+        subscriptions = self.__subscriptionsOf(endpoint)
+        if len(subscriptions) == 0:
+            return
+
+        notification = busNotification(endpoint.address, 'event', arguments=kwargs)
+        for subscription in subscriptions:
+            subscription.deliver(notification)
+
+    def __fieldWriteLockOf(self, endpoint : busField):
+        lock = self.__lockOf(endpoint)
+        if lock is NO_LOCK:
+            # Readers rely on writers of one field never interleaving
+            return endpoint.getMutex()
+        return lock
+
+    def __publishFieldValue(self, endpoint : busField, value : Any) -> Any:
+        if endpoint.shared is not None:
+            oldValue = self.__publishSharedFieldValue(endpoint, value)
+        else:
+            oldValue = endpoint.value
+            endpoint.version += 1
+            endpoint.value = value
+            endpoint.version += 1
+
+        # Recorded under the write lock, so log order matches order of writes to the field
+        journal = self.__journal
+        if journal is not None:
+            journal.record(endpoint.address, value)
+        return oldValue
+
+    def __packSharedFieldValue(self, endpoint : busField, value : Any) -> bytes:
+        if not endpoint.shared.owner:
+            # Sequence counter allows only one writer, which is the process that created the block
+            raise SettingFieldFailed(f'Field {endpoint.address} is attached to shared memory {endpoint.shared.name} and is read only')
+        try:
+            return endpoint.shared.pack(value)
+        except struct.error as exception:
+            raise InvalidFieldValueType(f'Value {value} does not fit shared field {endpoint.address}: {exception}')
+
+    def __publishSharedFieldValue(self, endpoint : busField, value : Any) -> Any:
+        packed = self.__packSharedFieldValue(endpoint, value)
+        oldValue = endpoint.shared.read()[0]
+        endpoint.shared.write(packed)
+        endpoint.value = value
+        return oldValue
+
+    def releaseSharedField(self, address : str) -> None:
+        '''Detaches field from shared memory, unlinking the block when this process created it.
+        Field keeps its last value and works as regular field afterwards.'''
+        endpoint = self.__getField(address)
+        with self.__fieldWriteLockOf(endpoint):
+            shared = endpoint.shared
+            if shared is None:
+                return
+
+            endpoint.value = shared.read()[0]
+            endpoint.shared = None
+            shared.close()
+
+    def __fieldWritten(self, endpoint : busField, oldValue : Any, newValue : Any):
+        '''Runs after field lock is released'''
+        for watcher in endpoint.watchers:
+            watcher.notify(oldValue, newValue)
+
+        subscriptions = self.__subscriptionsOf(endpoint)
+        if len(subscriptions) == 0:
+            return
+
+        notification = busNotification(endpoint.address, 'field', oldValue=oldValue, newValue=newValue)
+        for subscription in subscriptions:
+            subscription.deliver(notification)
+
+    def watchField(self, address : str, callback : Callable[[Any, Any], Any], latestOnly : bool = False,
+                   minInterval : float = 0.0, onlyChanges : bool = False) -> busFieldWatcher:
+        endpoint = self.__getField(address)
+        watcher = busFieldWatcher(endpoint, callback, latestOnly, minInterval, onlyChanges)
+
+        with endpoint.getMutex():
+            endpoint.watchers = endpoint.watchers + (watcher,)
+
+        return watcher
+
+    def unwatchField(self, watcher : busFieldWatcher) -> None:
+        watcher.cancel()
+        endpoint = watcher.endpoint
+
+        with endpoint.getMutex():
+            endpoint.watchers = tuple(other for other in endpoint.watchers if other is not watcher)
+
+    @__hookable('setFieldValue')
+    def __setFieldEndpoint(self, endpoint : busField, value : Any):
+        self.__validate(endpoint, self.__validationOf(endpoint), self.__checkFieldType, value)
+
+        with self.__fieldWriteLockOf(endpoint):
+            oldValue = self.__publishFieldValue(endpoint, value)
+
+        self.__fieldWritten(endpoint, oldValue, value)
+
+    @__hookable('getFieldValue')
+    def __getFieldEndpoint(self, endpoint : busField) -> Any:
+        if endpoint.shared is not None:
+            return endpoint.shared.read()[0]
+
+        # Values are only ever replaced as a whole, so a plain read never sees a torn value
+        return endpoint.value
+
+    @__hookable('getFieldSnapshot')
+    def __snapshotFieldEndpoint(self, endpoint : busField) -> tuple[Any, int]:
+        if endpoint.shared is not None:
+            return endpoint.shared.read()
+
+        while True:
+            version = endpoint.version
+            value = endpoint.value
+            if version & 1 == 0 and endpoint.version == version:
+                return value, version >> 1
+            sleep(0)
 
+    def __getField(self, address : str) -> busField:
+        endpoint = self.__getEnpointFromAddress(address)
         if not isinstance(endpoint, busField):
             raise InvalidField(f'Invalid field {address}')
 
-        if not isinstance(value, endpoint.type):
-            raise InvalidFieldValueType(f"Value {value} is not of type {endpoint.type}")
+        return endpoint
 
-        with self.__mutex:
-            endpoint.value = value
+    def setFieldValue(self, address : str, value : Any):
+        self.__setFieldEndpoint(self.__getField(address), value)
 
     def getFieldValue(self, address : str) -> Any:
+        return self.__getFieldEndpoint(self.__getField(address))
+
+    def getFieldSnapshot(self, address : str) -> tuple[Any, int]:
+        return self.__snapshotFieldEndpoint(self.__getField(address))
+
+    def __getVector(self, address : str) -> busVector:
         endpoint = self.__getEnpointFromAddress(address)
+        if not isinstance(endpoint, busVector):
+            raise InvalidVector(f'Invalid vector {address}')
+
+        return endpoint
+
+    def __writeVector(self, endpoint : busVector, values : Any, start : int) -> None:
+        stop = start + len(values)
+        if start < 0 or stop > len(endpoint.data):
+            raise InvalidFieldValueType(f'{len(values)} values at {start} do not fit vector {endpoint.address} of length {len(endpoint.data)}')
+
+        with self.__fieldWriteLockOf(endpoint):
+            endpoint.version += 1
+            endpoint.data[start:stop] = values
+            endpoint.version += 1
+
+    @__hookable('getVector')
+    def __getVectorEndpoint(self, endpoint : busVector, start : Union[int, None], stop : Union[int, None]) -> Any:
+        while True:
+            version = endpoint.version
+            values = endpoint.copy(start, stop)
+            if version & 1 == 0 and endpoint.version == version:
+                return values
+            sleep(0)
+
+    @__hookable('setVector')
+    def __setVectorEndpoint(self, endpoint : busVector, values : Any, start : int) -> None:
+        self.__writeVector(endpoint, endpoint.convert(values), start)
+
+    @__hookable('replaceVector')
+    def __replaceVectorEndpoint(self, endpoint : busVector, frame : Any) -> None:
+        frame = endpoint.convert(frame)
+        if len(frame) != len(endpoint.data):
+            raise InvalidFieldValueType(f'Frame of length {len(frame)} does not match vector {endpoint.address} of length {len(endpoint.data)}')
+
+        self.__writeVector(endpoint, frame, 0)
+
+    def getVector(self, address : str, start : Union[int, None] = None, stop : Union[int, None] = None) -> Any:
+        '''Copy of vector or its slice, never mixes values of two writes'''
+        return self.__getVectorEndpoint(self.__getVector(address), start, stop)
+
+    def setVector(self, address : str, values : Any, start : int = 0) -> None:
+        '''Overwrites len(values) items from start, vector length never changes'''
+        self.__setVectorEndpoint(self.__getVector(address), values, start)
+
+    def replaceVector(self, address : str, frame : Any) -> None:
+        self.__replaceVectorEndpoint(self.__getVector(address), frame)
+
+    def viewVector(self, address : str) -> memoryview:
+        '''Read-only view of vector storage without copying, it shows writes as they happen'''
+        return memoryview(self.__getVector(address).data).toreadonly()
+
+    def __checkActionRType(self, endpoint : busAction, rvalue : Any):
+        if not isinstance(rvalue, endpoint.rtype):
+            raise ActionInvalidRType(f"Returned value is not of type {endpoint.rtype}")
 
-        if not isinstance(endpoint, busField):
-            raise InvalidField(f'Invalid field {address}')
+    def __checkedActionFuture(self, endpoint : busAction, validation : str, future : Future) -> Future:
+        checked = Future()
+
+        def onDone(future : Future):
+            try:
+                rvalue = future.result()
+                self.__validate(endpoint, validation, self.__checkActionRType, rvalue)
+                checked.set_result(rvalue)
+            except BaseException as exception:
+                checked.set_exception(exception)
+
+        future.add_done_callback(onDone)
+        return checked
+
+    def __submitActionEndpoint(self, endpoint : busAction, kwargs : dict) -> Future:
+        validation = self.__validationOf(endpoint)
+        self.__validate(endpoint, validation, self.__checkEndpointArguments, kwargs)
+
+        key = None
+        cache = endpoint.cache
+        if cache is not None:
+            key, found, cached = cache.lookup(kwargs)
+            if found:
+                future = Future()
+                future.set_result(cached)
+                return future
+
+        submit = partial(self.__startActionFuture, endpoint, validation, kwargs, key)
+        if endpoint.singleFlight is not None:
+            return endpoint.singleFlight.runFuture(kwargs, submit)
+        return submit()
+
+    def __startActionFuture(self, endpoint : busAction, validation : str, kwargs : dict, key : Any) -> Future:
+        if endpoint.executor == 'process':
+            # Worker processes do not share bus state, so no bus lock is held for them
+            future = self.__getProcessPool().submit(endpoint.endpointDelegate, **kwargs)
+            metrics = self.__metrics
+            if metrics is not None:
+                # Latency of process responders includes time spent queued for a worker
+                startedAt = perf_counter()
+                future.add_done_callback(lambda _ : metrics.recordLatency(endpoint.address, perf_counter() - startedAt))
+        else:
+            future = self.__getThreadPool().submit(self.__callActionWithLock, endpoint, kwargs)
+
+        checked = self.__checkedActionFuture(endpoint, validation, future)
+        cache = endpoint.cache
+        if cache is not None:
+            def storeResult(done : Future):
+                if done.exception() is None:
+                    cache.store(key, done.result())
+
+            checked.add_done_callback(storeResult)
+        return checked
+
+    def __callActionWithLock(self, endpoint : busAction, kwargs : dict) -> Any:
+        with self.__lockOf(endpoint):
+            if self.__metrics is not None:
+                return self.__timedResponder(endpoint, endpoint.endpointDelegate, kwargs)
+            return endpoint.endpointDelegate(**kwargs)
+
+    @__hookable('callAction')
+    def __callActionEndpoint(self, endpoint : busAction, kwargs : dict) -> Any:
+        if endpoint.executor == 'process':
+            return self.__submitActionEndpoint(endpoint, kwargs).result()
+
+        validation = self.__validationOf(endpoint)
+        self.__validate(endpoint, validation, self.__checkEndpointArguments, kwargs)
+
+        key = None
+        cache = endpoint.cache
+        if cache is not None:
+            key, found, cached = cache.lookup(kwargs)
+            if found:
+                return cached
+
+        if endpoint.singleFlight is not None:
+            return endpoint.singleFlight.run(kwargs, partial(self.__invokeAction, endpoint, validation, kwargs, key))
+        return self.__invokeAction(endpoint, validation, kwargs, key)
+
+    def __invokeAction(self, endpoint : busAction, validation : str, kwargs : dict, key : Any) -> Any:
+        delegate = endpoint.endpointDelegate
 
-        with self.__mutex:
-            value = endpoint.value
+        with self.__lockOf(endpoint):
+            if self.__metrics is not None:
+                rvalue = self.__timedResponder(endpoint, delegate, kwargs)
+            else:
+                rvalue = delegate(**kwargs)
 
-        return value
+        self.__validate(endpoint, validation, self.__checkActionRType, rvalue)
+        if endpoint.cache is not None:
+            endpoint.cache.store(key, rvalue)
+        return rvalue
 
-    def callAction(self, address : str, **kwargs) -> Any:
+    def __getAction(self, address : str) -> busAction:
         endpoint = self.__getEnpointFromAddress(address)
-
         if not isinstance(endpoint, busAction):
             raise InvalidAction(f'Invalid action {address}')
 
-        self.__checkArguments(endpoint.arguments, kwargs)
+        return endpoint
 
-        delegate = endpoint.endpointDelegate
+    def callAction(self, address : str, **kwargs) -> Any:
+        return self.__callActionEndpoint(self.__getAction(address), kwargs)
+
+    @__hookable('callActionFuture')
+    def __callActionFutureEndpoint(self, endpoint : busAction, kwargs : dict) -> Future:
+        return self.__submitActionEndpoint(endpoint, kwargs)
+
+    def callActionFuture(self, address : str, **kwargs) -> Future:
+        return self.__callActionFutureEndpoint(self.__getAction(address), kwargs)
+
+    def __cachedActionsUnder(self, element : Union[busRail, busGroup, busEndpoint]) -> list[busAction]:
+        if isinstance(element, busAction):
+            return [element] if element.cache is not None else []
+
+        if not isinstance(element, (busRail, busGroup)):
+            return []
+
+        actions = []
+        pending = [element]
+        while len(pending) > 0:
+            group = pending.pop()
+            pending.extend(group.groups.values())
+            for endpoint in getattr(group, 'endpoints', EMPTY_MAPPING).values():
+                if isinstance(endpoint, busAction) and endpoint.cache is not None:
+                    actions.append(endpoint)
+        return actions
+
+    def invalidateActionCache(self, address : str) -> int:
+        '''Clears cache of action, or of every cached action under rail or group address. Returns number of cleared caches.'''
+        actions = self.__cachedActionsUnder(self.__getElementFromAddress(address))
+        for action in actions:
+            action.cache.clear()
+        return len(actions)
+
+    def getActionCacheStats(self, address : str) -> dict[str, dict[str, int]]:
+        '''Cache statistics of action, or of every cached action under rail or group address'''
+        return {action.address : action.cache.stats() for action in self.__cachedActionsUnder(self.__getElementFromAddress(address))}
+
+    def __admitBatchEntry(self, endpoint : busEndpoint, operation : str, args : tuple) -> busAdmitted | Any:
+        '''Runs interceptors for one entry of batch, returns busAdmitted with args to run the entry with,
+        or value returned by interceptor that did not proceed'''
+        if not self.__hooked:
+            return busAdmitted(args)
+
+        chain = self.__interceptorChainOf(endpoint, operation, admitBatchEntry)
+        if chain is None:
+            return busAdmitted(args)
+        return chain(busCall(endpoint.address, operation, endpoint, args))
+
+    def __recordBatchEntry(self, endpoint : Union[busEndpoint, None], exception : Union[BaseException, None]) -> None:
+        metrics = self.__metrics
+        if metrics is not None and endpoint is not None:
+            metrics.recordCall(endpoint.address, exception)
+
+    @contextmanager
+    def __holdingAll(self, locks):
+        # Locks are always taken in the same order, so concurrent batches can not deadlock
+        uniqueLocks = {}
+        for lock in locks:
+            if lock is NO_LOCK: continue
+            uniqueLocks[id(lock.lock if isinstance(lock, busMeteredLock) else lock)] = lock
+
+        with ExitStack() as stack:
+            for key in sorted(uniqueLocks):
+                stack.enter_context(uniqueLocks[key])
+            yield
+
+    def setFieldValues(self, values : dict[str, Any], atomic : bool = True) -> dict[str, BusException]:
+        '''Sets many fields under one acquisition of their locks. Atomic batch raises before writing anything,
+        otherwise invalid entries are skipped and returned with their exceptions.'''
+        failures : dict[str, BusException] = {}
+        writes : list[tuple[busField, Any]] = []
+
+        for address, value in values.items():
+            endpoint = None
+            try:
+                endpoint = self.__getField(address)
+                admission = self.__admitBatchEntry(endpoint, 'setFieldValues', (value,))
+                if not isinstance(admission, busAdmitted):
+                    self.__recordBatchEntry(endpoint, None)
+                    continue
+                value, = admission.args
+                self.__validate(endpoint, self.__validationOf(endpoint), self.__checkFieldType, value)
+                if endpoint.shared is not None:
+                    # Value that does not fit the block must fail before anything in batch is written
+                    self.__packSharedFieldValue(endpoint, value)
+            except BusException as exception:
+                self.__recordBatchEntry(endpoint, exception)
+                if atomic:
+                    raise
+                failures[address] = exception
+                continue
+
+            writes.append((endpoint, value))
+
+        oldValues = []
+        with self.__holdingAll([self.__fieldWriteLockOf(endpoint) for endpoint, _ in writes]):
+            for endpoint, value in writes:
+                oldValues.append(self.__publishFieldValue(endpoint, value))
+
+        for (endpoint, value), oldValue in zip(writes, oldValues):
+            self.__recordBatchEntry(endpoint, None)
+            self.__fieldWritten(endpoint, oldValue, value)
+
+        return failures
+
+    def getFieldValues(self, addresses : list[str]) -> dict[str, Any]:
+        '''Gets many fields at once, no write to any of them can happen in between'''
+        endpoints : dict[str, busField] = {}
+        values : dict[str, Any] = {}
+        for address in addresses:
+            endpoint = self.__getField(address)
+            admission = self.__admitBatchEntry(endpoint, 'getFieldValues', ())
+            self.__recordBatchEntry(endpoint, None)
+            if isinstance(admission, busAdmitted):
+                endpoints[address] = endpoint
+            else:
+                values[address] = admission
+
+        with self.__holdingAll([self.__fieldWriteLockOf(endpoint) for endpoint in endpoints.values()]):
+            for address, endpoint in endpoints.items():
+                values[address] = endpoint.value if endpoint.shared is None else endpoint.shared.read()[0]
+
+        return {address : values[address] for address in addresses}
+
+    def __runActionDelegate(self, endpoint : busAction, kwargs : dict) -> Any:
+        if endpoint.executor == 'process':
+            delegate = partial(self.__waitForProcess, endpoint.endpointDelegate)
+        else:
+            delegate = endpoint.endpointDelegate
+
+        if self.__metrics is not None:
+            return self.__timedResponder(endpoint, delegate, kwargs)
+        return delegate(**kwargs)
+
+    def __waitForProcess(self, delegate : Callable, **kwargs) -> Any:
+        return self.__getProcessPool().submit(delegate, **kwargs).result()
+
+    def callActionMany(self, calls : list[tuple[str, dict]], atomic : bool = True) -> list[Any]:
+        '''Calls many actions in order under one acquisition of their locks. Atomic batch validates every call
+        before running any and stops on first failure, otherwise failed calls have their exception in place of value.'''
+        results : list[Any] = [None] * len(calls)
+        prepared : list[tuple[int, busAction, str, dict]] = []
+
+        for position, (address, kwargs) in enumerate(calls):
+            endpoint = None
+            try:
+                endpoint = self.__getAction(address)
+                admission = self.__admitBatchEntry(endpoint, 'callActionMany', (kwargs,))
+                if not isinstance(admission, busAdmitted):
+                    self.__recordBatchEntry(endpoint, None)
+                    results[position] = admission
+                    continue
+                kwargs, = admission.args
+                validation = self.__validationOf(endpoint)
+                self.__validate(endpoint, validation, self.__checkEndpointArguments, kwargs)
+            except BusException as exception:
+                self.__recordBatchEntry(endpoint, exception)
+                if atomic:
+                    raise
+                results[position] = exception
+                continue
+
+            prepared.append((position, endpoint, validation, kwargs))
+
+        locks = [self.__lockOf(endpoint) for _, endpoint, _, _ in prepared if endpoint.executor != 'process']
+        with self.__holdingAll(locks):
+            for position, endpoint, validation, kwargs in prepared:
+                try:
+                    rvalue = self.__runActionDelegate(endpoint, kwargs)
+                    self.__validate(endpoint, validation, self.__checkActionRType, rvalue)
+                except Exception as exception:
+                    self.__recordBatchEntry(endpoint, exception)
+                    if atomic:
+                        raise
+                    results[position] = exception
+                    continue
+
+                self.__recordBatchEntry(endpoint, None)
+                results[position] = rvalue
+
+        return results
+
+    def __getLockWaiters(self) -> ThreadPoolExecutor:
+        with self.__configMutex:
+            if self.__lockWaiters is None:
+                self.__lockWaiters = ThreadPoolExecutor(thread_name_prefix='mbus-lock')
+            return self.__lockWaiters
+
+    def __lockGateOf(self, loop : asyncio.AbstractEventLoop, lock) -> asyncio.Lock:
+        with self.__configMutex:
+            gates = self.__lockGates.get(loop)
+            if gates is None:
+                gates = self.__lockGates[loop] = {}
+            gate = gates.get(lock)
+            if gate is None:
+                gate = gates[lock] = asyncio.Lock()
+            return gate
+
+    async def __acquireAsync(self, lock) -> None:
+        '''Tasks of one loop queue for contended lock on asyncio gate, only the first of them waits for it in a thread'''
+        if lock is NO_LOCK or lock.acquire(blocking=False):
+            return
+
+        loop = asyncio.get_running_loop()
+        async with self.__lockGateOf(loop, getattr(lock, 'lock', lock)):
+            if lock.acquire(blocking=False):
+                return
+
+            # Waiting threads are not the ones running responders, so lock holder can always finish
+            acquiring = loop.run_in_executor(self.__getLockWaiters(), lock.acquire)
+            try:
+                await asyncio.shield(acquiring)
+            except asyncio.CancelledError:
+                acquiring.add_done_callback(lambda _ : lock.release())
+                raise
+
+    def __releaseAsync(self, lock) -> None:
+        if lock is not NO_LOCK:
+            lock.release()
+
+    async def __runDelegateAsync(self, endpoint : busEndpoint, delegate : Callable, kwargs : dict) -> Any:
+        metrics = self.__metrics
+        if inspect.iscoroutinefunction(delegate):
+            if metrics is None:
+                return await delegate(**kwargs)
+
+            startedAt = perf_counter()
+            try:
+                return await delegate(**kwargs)
+            finally:
+                metrics.recordLatency(endpoint.address, perf_counter() - startedAt)
+
+        if metrics is None:
+            rvalue = await asyncio.get_running_loop().run_in_executor(None, partial(delegate, **kwargs))
+        else:
+            rvalue = await asyncio.get_running_loop().run_in_executor(None, partial(self.__timedResponder, endpoint, delegate, kwargs))
+        if inspect.isawaitable(rvalue):
+            rvalue = await rvalue
+        return rvalue
 
-        with self.__mutex:
-            rvalue = delegate(**kwargs)
+    @__hookableAsync('fireTriggerAsync')
+    async def __fireTriggerEndpointAsync(self, endpoint : busTrigger, kwargs : dict) -> bool:
+        self.__validate(endpoint, self.__validationOf(endpoint), self.__checkEndpointArguments, kwargs)
 
-        if not isinstance(rvalue, endpoint.rtype):
-            raise ActionInvalidRType(f"Returned value is not of type {endpoint.rtype}")
+        lock = self.__lockOf(endpoint)
+        await self.__acquireAsync(lock)
+        try:
+            return await self.__runDelegateAsync(endpoint, endpoint.endpointDelegate, kwargs)
+        finally:
+            self.__releaseAsync(lock)
+
+    async def fireTriggerAsync(self, address : str, **kwargs) -> bool:
+        return await self.__fireTriggerEndpointAsync(self.__getTrigger(address), kwargs)
+
+    @__hookableAsync('callEventAsync')
+    async def __callEventEndpointAsync(self, endpoint : busEvent, kwargs : dict) -> Union[busEventResult, None]:
+        if endpoint.dispatch == 'parallel':
+            return await asyncio.get_running_loop().run_in_executor(
+                None, partial(self.__fanOutEvent, endpoint, kwargs, endpoint.wait, None))
 
+        delegates = endpoint.endpointDelegates
+
+        lock = self.__lockOf(endpoint)
+        await self.__acquireAsync(lock)
+        try:
+            for delegate in delegates:
+                await self.__runDelegateAsync(endpoint, delegate, kwargs)
+        finally:
+            self.__releaseAsync(lock)
+
+        self.__eventCalled(endpoint, kwargs)
+
+    async def callEventAsync(self, address : str, **kwargs) -> Union[busEventResult, None]:
+        return await self.__callEventEndpointAsync(self.__getEvent(address), kwargs)
+
+    @__hookableAsync('setFieldValueAsync')
+    async def __setFieldEndpointAsync(self, endpoint : busField, value : Any):
+        self.__validate(endpoint, self.__validationOf(endpoint), self.__checkFieldType, value)
+
+        lock = self.__fieldWriteLockOf(endpoint)
+        await self.__acquireAsync(lock)
+        try:
+            oldValue = self.__publishFieldValue(endpoint, value)
+        finally:
+            self.__releaseAsync(lock)
+
+        self.__fieldWritten(endpoint, oldValue, value)
+
+    async def setFieldValueAsync(self, address : str, value : Any):
+        await self.__setFieldEndpointAsync(self.__getField(address), value)
+
+    @__hookableAsync('getFieldValueAsync')
+    async def __getFieldEndpointAsync(self, endpoint : busField) -> Any:
+        if endpoint.shared is not None:
+            return endpoint.shared.read()[0]
+
+        return endpoint.value
+
+    async def getFieldValueAsync(self, address : str) -> Any:
+        return await self.__getFieldEndpointAsync(self.__getField(address))
+
+    @__hookableAsync('callActionAsync')
+    async def __callActionEndpointAsync(self, endpoint : busAction, kwargs : dict) -> Any:
+        if endpoint.executor == 'process':
+            return await asyncio.wrap_future(self.__submitActionEndpoint(endpoint, kwargs))
+
+        validation = self.__validationOf(endpoint)
+        self.__validate(endpoint, validation, self.__checkEndpointArguments, kwargs)
+
+        key = None
+        cache = endpoint.cache
+        if cache is not None:
+            key, found, cached = cache.lookup(kwargs)
+            if found:
+                return cached
+
+        if endpoint.singleFlight is not None:
+            return await endpoint.singleFlight.runAsync(kwargs, partial(self.__invokeActionAsync, endpoint, validation, kwargs, key))
+        return await self.__invokeActionAsync(endpoint, validation, kwargs, key)
+
+    async def __invokeActionAsync(self, endpoint : busAction, validation : str, kwargs : dict, key : Any) -> Any:
+        lock = self.__lockOf(endpoint)
+        await self.__acquireAsync(lock)
+        try:
+            rvalue = await self.__runDelegateAsync(endpoint, endpoint.endpointDelegate, kwargs)
+        finally:
+            self.__releaseAsync(lock)
+
+        self.__validate(endpoint, validation, self.__checkActionRType, rvalue)
+        if endpoint.cache is not None:
+            endpoint.cache.store(key, rvalue)
         return rvalue
 
+    async def callActionAsync(self, address : str, **kwargs) -> Any:
+        return await self.__callActionEndpointAsync(self.__getAction(address), kwargs)
+
+    def resolve(self, address : str) -> 'busHandle':
+        endpoint = self.__getEnpointFromAddress(address)
+
+        match endpoint:
+            case busTrigger():
+                return TriggerHandle(address, endpoint, self.__fireTriggerEndpoint, self.__fireTriggerEndpointAsync)
+            case busEvent():
+                return EventHandle(address, endpoint, self.__callEventEndpoint, self.__callEventEndpointAsync)
+            case busField():
+                return FieldHandle(
+                    address, endpoint,
+                    self.__getFieldEndpoint, self.__setFieldEndpoint, self.__snapshotFieldEndpoint,
+                    self.__getFieldEndpointAsync, self.__setFieldEndpointAsync
+                )
+            case busAction():
+                return ActionHandle(address, endpoint, self.__callActionEndpoint, self.__callActionEndpointAsync, self.__callActionFutureEndpoint)
+            case busVector():
+                return VectorHandle(address, endpoint, self.__getVectorEndpoint, self.__setVectorEndpoint, self.__replaceVectorEndpoint)
+            case _:
+                raise InvalidEndpointType(f'Endpoint {address} can not be resolved to a handle')
+
 mbus = __mBusSingleton()
@@ -1,8 +1,35 @@
 #!/bin/env python3
 import unittest
-from mbus import BusException, GroupAlreadyExists, GroupNotFound, InvalidEnpointParameter, InvalidFieldValueType, InvalidGroupName, InvalidRailName, MissingArgumentException, MissingEndpointParameter, RailAlreadyBound, RailAlready, RailNotFound
-from mbus import mbus
+from mbus import ActionInvalidRType, BusException, EndpointNotFound, GroupAlreadyExists, GroupNotFound, InvalidEnpointParameter, InvalidFieldValueType, InvalidGroupName, InvalidLockingStrategy, InvalidRailName, MissingArgumentException, MissingEndpointParameter, RailAlreadyBound, RailAlready, RailNotFound, SettingFieldFailed, UnknownArgument, InvalidArgument, InvalidValidationMode, InvalidVector
+from mbus import EventDispatcherNotRunning, EventQueueFull, InvalidDispatcherSize, InvalidOverflowPolicy, InvalidPattern, SchemaError
+from mbus import BridgeClosed, BridgeNotRunning, BridgePathInUse, BridgeRunning, busBridgeClient, busBridgeConnection, busBridgeServer
+from mbus import BRIDGE_RESULT, packFrame, receiveFrame
+from mbus import InvalidFsyncPolicy, JournalEnabled, JournalNotEnabled
+from mbus import busNotification, busPatternTrie, busSubscription
+from mbus import mbus, busEventResult, checkArguments, compileArgumentsValidator, ActionHandle, EventHandle, FieldHandle, TriggerHandle, VectorHandle
+import asyncio
+import io
+import json
+import os
+import pickle
 import random
+import socket
+import stat
+import subprocess
+import sys
+import tempfile
+import types
+import threading
+import time
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import redirect_stderr, redirect_stdout
+from unittest.mock import patch
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 class mBusSingleton(unittest.TestCase):
     def test_getBus(self):
@@ -609,5 +636,2008 @@ class TestGenericEndpoints(unittest.TestCase):
 
         self.assertFalse(failed)
 
+class TestAddressIndex(unittest.TestCase):
+    def test_deepAddressResolution(self):
+        railName = "addressIndexDeep"
+        mbus.registerRail(railName)
+        cascade = list("abcdefgh")
+        for i in range(1, len(cascade) + 1):
+            mbus.createGroup(f"{railName}.{'.'.join(cascade[:i])}")
+
+        address = f"{railName}.{'.'.join(cascade)}"
+        mbus.createEndpoint(address, 'deepField', 'field', type=int, value=7)
+
+        self.assertTrue(mbus.addressExists(address))
+        self.assertTrue(mbus.addressExists(address + '.deepField'))
+        self.assertFalse(mbus.addressExists(address + '.missing'))
+        self.assertEqual(mbus.getFieldValue(address + '.deepField'), 7)
+
+    def test_missingAddressErrors(self):
+        railName = "addressIndexMissing"
+        mbus.registerRail(railName)
+        mbus.createGroup(f"{railName}.group")
+
+        with self.assertRaises(RailNotFound):
+            mbus.getFieldValue("addressIndexNoRail.group.field")
+        with self.assertRaises(GroupNotFound):
+            mbus.getFieldValue(f"{railName}.nogroup.field")
+        with self.assertRaises(EndpointNotFound):
+            mbus.getFieldValue(f"{railName}.group.field")
+
+class TestHandles(unittest.TestCase):
+    def test_resolveHandles(self):
+        railName = "resolveHandles"
+        address = f'{railName}.handles'
+        mbus.registerRail(railName)
+        mbus.createGroup(address)
+
+        calls = []
+        mbus.createEndpoint(address, 'trigger', 'trigger', responder=lambda x : calls.append(x) is None, arguments={"x" : int})
+        mbus.createEndpoint(address, 'event', 'event', responders=lambda **kwargs : calls.append(kwargs))
+        mbus.createEndpoint(address, 'field', 'field', type=int, value=0)
+        mbus.createEndpoint(address, 'action', 'action', responder=lambda x : x * 2, arguments={"x" : int}, rtype=int)
+
+        trigger = mbus.resolve(address + '.trigger')
+        event = mbus.resolve(address + '.event')
+        field = mbus.resolve(address + '.field')
+        action = mbus.resolve(address + '.action')
+
+        self.assertIsInstance(trigger, TriggerHandle)
+        self.assertIsInstance(event, EventHandle)
+        self.assertIsInstance(field, FieldHandle)
+        self.assertIsInstance(action, ActionHandle)
+
+        self.assertTrue(trigger.fire(x = 3))
+        event.call(y = 4)
+        self.assertEqual(calls, [3, {"y" : 4}])
+
+        field.set(5)
+        self.assertEqual(field.get(), 5)
+        self.assertEqual(mbus.getFieldValue(address + '.field'), 5)
+
+        self.assertEqual(action.call(x = 21), 42)
+
+    def test_handleKeepsValidation(self):
+        railName = "resolveHandlesValidation"
+        address = f'{railName}.handles'
+        mbus.registerRail(railName)
+        mbus.createGroup(address)
+        mbus.createEndpoint(address, 'field', 'field', type=int, value=0)
+        mbus.createEndpoint(address, 'action', 'action', responder=lambda x : x, arguments={"x" : int}, rtype=int)
+
+        with self.assertRaises(InvalidFieldValueType):
+            mbus.resolve(address + '.field').set("text")
+        with self.assertRaises(MissingArgumentException):
+            mbus.resolve(address + '.action').call()
+        with self.assertRaises(EndpointNotFound):
+            mbus.resolve(address + '.missing')
+
+class TestLockingStrategy(unittest.TestCase):
+    def tearDown(self):
+        mbus.setLockingStrategy('global')
+
+    def __blockingActionAndCall(self, strategy : str, railName : str) -> bool:
+        mbus.registerRail(railName)
+        mbus.registerRail(railName + "Other")
+        mbus.createGroup(f"{railName}.group")
+        mbus.createGroup(f"{railName}Other.group")
+
+        started = threading.Event()
+        release = threading.Event()
+        def slowResponder():
+            started.set()
+            release.wait(5)
+            return 0
+
+        mbus.createEndpoint(f"{railName}.group", 'slow', 'action', responder=slowResponder, arguments={}, rtype=int)
+        mbus.createEndpoint(f"{railName}Other.group", 'fast', 'action', responder=lambda : 1, arguments={}, rtype=int)
+
+        mbus.setLockingStrategy(strategy)
+        worker = threading.Thread(target=mbus.callAction, args=(f"{railName}.group.slow",))
+        worker.start()
+        started.wait(5)
+
+        reader = threading.Thread(target=mbus.callAction, args=(f"{railName}Other.group.fast",))
+        reader.start()
+        reader.join(0.2)
+        readFinished = not reader.is_alive()
+
+        release.set()
+        worker.join()
+        reader.join()
+        return readFinished
+
+    def test_globalStrategyBlocks(self):
+        self.assertFalse(self.__blockingActionAndCall('global', "lockingGlobal"))
+
+    def test_independentStrategies(self):
+        for strategy in ('rail', 'endpoint', 'none'):
+            self.assertTrue(self.__blockingActionAndCall(strategy, f"locking_{strategy}"), strategy)
+            self.assertEqual(mbus.getLockingStrategy(), strategy)
+
+    def test_invalidStrategy(self):
+        with self.assertRaises(InvalidLockingStrategy):
+            mbus.setLockingStrategy('invalid')
+        self.assertEqual(mbus.getLockingStrategy(), 'global')
+
+class TestFieldSnapshots(unittest.TestCase):
+    def test_snapshotVersion(self):
+        railName = "fieldSnapshotVersion"
+        address = f'{railName}.group'
+        mbus.registerRail(railName)
+        mbus.createGroup(address)
+        mbus.createEndpoint(address, 'field', 'field', type=int, value=0)
+
+        self.assertEqual(mbus.getFieldSnapshot(address + '.field'), (0, 0))
+        for i in range(1, 10):
+            mbus.setFieldValue(address + '.field', i * 10)
+            self.assertEqual(mbus.getFieldSnapshot(address + '.field'), (i * 10, i))
+
+        handle = mbus.resolve(address + '.field')
+        handle.set(5)
+        self.assertEqual(handle.snapshot(), (5, 10))
+
+    def test_readDoesNotWaitForLock(self):
+        railName = "fieldSnapshotNoWait"
+        address = f'{railName}.group'
+        mbus.registerRail(railName)
+        mbus.createGroup(address)
+        mbus.createEndpoint(address, 'field', 'field', type=int, value=3)
+
+        started = threading.Event()
+        release = threading.Event()
+        def slowResponder():
+            started.set()
+            release.wait(5)
+            return 0
+
+        mbus.createEndpoint(address, 'slow', 'action', responder=slowResponder, arguments={}, rtype=int)
+        worker = threading.Thread(target=mbus.callAction, args=(address + '.slow',))
+        worker.start()
+        started.wait(5)
+
+        values = []
+        reader = threading.Thread(target=lambda : values.append(mbus.getFieldSnapshot(address + '.field')))
+        reader.start()
+        reader.join(1)
+        self.assertFalse(reader.is_alive())
+        self.assertEqual(values, [(3, 0)])
+
+        release.set()
+        worker.join()
+
+class TestAsyncEndpoints(unittest.TestCase):
+    def test_asyncEndpoints(self):
+        railName = "asyncEndpoints"
+        address = f'{railName}.group'
+        mbus.registerRail(railName)
+        mbus.createGroup(address)
+
+        calls = []
+        async def asyncTrigger(x : int):
+            await asyncio.sleep(0)
+            calls.append(("trigger", x))
+            return True
+
+        def syncListener(**kwargs):
+            calls.append(("sync", kwargs))
+
+        async def asyncListener(**kwargs):
+            calls.append(("async", kwargs))
+
+        async def asyncAction(x : int):
+            await asyncio.sleep(0)
+            return x + 1
+
+        mbus.createEndpoint(address, 'trigger', 'trigger', responder=asyncTrigger, arguments={"x" : int})
+        mbus.createEndpoint(address, 'event', 'event', responders=[syncListener, asyncListener])
+        mbus.createEndpoint(address, 'field', 'field', type=int, value=0)
+        mbus.createEndpoint(address, 'action', 'action', responder=asyncAction, arguments={"x" : int}, rtype=int)
+        mbus.createEndpoint(address, 'syncAction', 'action', responder=lambda x : x * 3, arguments={"x" : int}, rtype=int)
+
+        async def scenario():
+            self.assertTrue(await mbus.fireTriggerAsync(address + '.trigger', x = 1))
+            await mbus.callEventAsync(address + '.event', y = 2)
+            await mbus.setFieldValueAsync(address + '.field', 3)
+            self.assertEqual(await mbus.getFieldValueAsync(address + '.field'), 3)
+            self.assertEqual(await mbus.callActionAsync(address + '.action', x = 4), 5)
+            self.assertEqual(await mbus.resolve(address + '.syncAction').callAsync(x = 2), 6)
+
+            with self.assertRaises(MissingArgumentException):
+                await mbus.callActionAsync(address + '.action')
+            with self.assertRaises(InvalidFieldValueType):
+                await mbus.setFieldValueAsync(address + '.field', "text")
+
+        asyncio.run(scenario())
+        self.assertEqual(calls, [("trigger", 1), ("sync", {"y" : 2}), ("async", {"y" : 2})])
+
+    def test_syncResponderDoesNotBlockLoop(self):
+        railName = "asyncSyncResponder"
+        address = f'{railName}.group'
+        mbus.registerRail(railName)
+        mbus.createGroup(address)
+
+        def slowResponder():
+            time.sleep(0.2)
+            return 1
+
+        mbus.createEndpoint(address, 'slow', 'action', responder=slowResponder, arguments={}, rtype=int)
+
+        async def scenario():
+            ticks = 0
+            task = asyncio.create_task(mbus.callActionAsync(address + '.slow'))
+            while not task.done():
+                ticks += 1
+                await asyncio.sleep(0.01)
+            self.assertEqual(task.result(), 1)
+            return ticks
+
+        self.assertGreater(asyncio.run(scenario()), 5)
+
+    def test_moreCallersThanExecutorWorkers(self):
+        railName = "asyncContended"
+        address = f'{railName}.group'
+        mbus.registerRail(railName)
+        mbus.createGroup(address)
+
+        def slowResponder(x : int):
+            time.sleep(0.005)
+            return x
+
+        mbus.createEndpoint(address, 'slow', 'action', responder=slowResponder, arguments={"x" : int}, rtype=int)
+
+        async def scenario():
+            asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=2))
+            calls = [mbus.callActionAsync(address + '.slow', x = x) for x in range(40)]
+            return await asyncio.wait_for(asyncio.gather(*calls), timeout=10)
+
+        self.assertEqual(asyncio.run(scenario()), list(range(40)))
+
+class TestParallelEvents(unittest.TestCase):
+    def test_parallelEventWaitAll(self):
+        railName = "parallelEventAll"
+        address = f'{railName}.group'
+        mbus.registerRail(railName)
+        mbus.createGroup(address)
+
+        barrier = threading.Barrier(3, timeout=5)
+        def listener(x : int):
+            barrier.wait()
+            return x
+
+        def failingListener(x : int):
+            barrier.wait()
+            raise ValueError(x)
+
+        mbus.createEndpoint(address, 'event', 'event', responders=[listener, listener, failingListener], dispatch='parallel')
+
+        result = mbus.callEvent(address + '.event', x = 7)
+        self.assertIsInstance(result, busEventResult)
+        self.assertTrue(result.done)
+        self.assertEqual(result.results, [7, 7])
+        self.assertEqual(len(result.exceptions), 1)
+        self.assertIsInstance(result.exceptions[0], ValueError)
+
+    def test_parallelEventWaitModes(self):
+        railName = "parallelEventModes"
+        address = f'{railName}.group'
+        mbus.registerRail(railName)
+        mbus.createGroup(address)
+
+        release = threading.Event()
+        def fastListener():
+            return "fast"
+
+        def slowListener():
+            release.wait(5)
+            return "slow"
+
+        mbus.createEndpoint(address, 'event', 'event', responders=[fastListener, slowListener])
+
+        result = mbus.callEventParallel(address + '.event', wait='first')
+        self.assertEqual(result.results, ["fast"])
+        self.assertFalse(result.done)
+
+        result = mbus.callEventParallel(address + '.event', wait='none')
+        release.set()
+        for future in result.futures:
+            future.result(5)
+        self.assertEqual(sorted(result.results), ["fast", "slow"])
+
+    def test_invalidDispatchParameters(self):
+        railName = "parallelEventInvalid"
+        address = f'{railName}.group'
+        mbus.registerRail(railName)
+        mbus.createGroup(address)
+
+        with self.assertRaises(InvalidEnpointParameter):
+            mbus.createEndpoint(address, 'event', 'event', responders=[], dispatch='invalid')
+        with self.assertRaises(InvalidEnpointParameter):
+            mbus.createEndpoint(address, 'event', 'event', responders=[], wait='invalid')
+
+class TestProcessActions(unittest.TestCase):
+    def test_processAction(self):
+        railName = "processAction"
+        address = f'{railName}.group'
+        mbus.registerRail(railName)
+        mbus.createGroup(address)
+        mbus.createEndpoint(address, 'pack', 'action', responder=dict, arguments={"a" : int, "b" : str}, rtype=dict, executor='process')
+        mbus.createEndpoint(address, 'wrongType', 'action', responder=dict, arguments={"a" : int}, rtype=list, executor='process')
+
+        self.assertEqual(mbus.callAction(address + '.pack', a = 1, b = "x"), {"a" : 1, "b" : "x"})
+
+        future = mbus.callActionFuture(address + '.pack', a = 2, b = "y")
+        self.assertEqual(future.result(10), {"a" : 2, "b" : "y"})
+
+        with self.assertRaises(ActionInvalidRType):
+            mbus.callAction(address + '.wrongType', a = 1)
+        with self.assertRaises(MissingArgumentException):
+            mbus.callActionFuture(address + '.pack', a = 1)
+
+        async def scenario():
+            return await mbus.callActionAsync(address + '.pack', a = 3, b = "z")
+
+        self.assertEqual(asyncio.run(scenario()), {"a" : 3, "b" : "z"})
+
+    def test_inlineActionFuture(self):
+        railName = "inlineActionFuture"
+        address = f'{railName}.group'
+        mbus.registerRail(railName)
+        mbus.createGroup(address)
+        mbus.createEndpoint(address, 'square', 'action', responder=lambda x : x * x, arguments={"x" : int}, rtype=int)
+
+        self.assertEqual(mbus.resolve(address + '.square').callFuture(x = 4).result(5), 16)
+
+    def test_unpicklableProcessResponder(self):
+        railName = "processActionInvalid"
+        address = f'{railName}.group'
+        mbus.registerRail(railName)
+        mbus.createGroup(address)
+
+        with self.assertRaises(InvalidEnpointParameter):
+            mbus.createEndpoint(address, 'lambda', 'action', responder=lambda : 1, arguments={}, rtype=int, executor='process')
+        with self.assertRaises(InvalidEnpointParameter):
+            mbus.createEndpoint(address, 'invalid', 'action', responder=dict, arguments={}, rtype=dict, executor='invalid')
+
+class TestArgumentsValidator(unittest.TestCase):
+    def test_validatorMatchesCheckArguments(self):
+        requiredArguments = {"x" : int, "y" : str, "z" : None}
+        validator = compileArgumentsValidator(requiredArguments)
+        cases = [
+            {"x" : 1, "y" : "a", "z" : object()},
+            {"x" : 1, "y" : "a"},
+            {"x" : 1, "y" : "a", "z" : 1, "w" : 1},
+            {"x" : 1, "y" : "a", "w" : 1},
+            {"x" : "1", "y" : "a", "z" : 1},
+            {"y" : 2, "x" : "1", "z" : 1},
+            {},
+        ]
+        for case in cases:
+            expected = None
+            try:
+                checkArguments(requiredArguments, case)
+            except BusException as exception:
+                expected = (type(exception), str(exception))
+
+            received = None
+            try:
+                validator(case)
+            except BusException as exception:
+                received = (type(exception), str(exception))
+
+            self.assertEqual(expected, received, case)
+
+    def test_noArgumentsValidator(self):
+        validator = compileArgumentsValidator({})
+        validator({})
+        with self.assertRaises(UnknownArgument):
+            validator({"x" : 1})
+
+class TestValidationModes(unittest.TestCase):
+    def __createEndpoints(self, railName : str) -> str:
+        address = f'{railName}.group'
+        mbus.registerRail(railName)
+        mbus.createGroup(address)
+        mbus.createEndpoint(address, 'field', 'field', type=int, value=0)
+        mbus.createEndpoint(address, 'action', 'action', responder=lambda x : x, arguments={"x" : int}, rtype=int)
+        return address
+
+    def test_strictByDefault(self):
+        railName = "validationStrict"
+        address = self.__createEndpoints(railName)
+
+        self.assertEqual(mbus.getValidationMode(railName), 'strict')
+        with self.assertRaises(InvalidFieldValueType):
+            mbus.setFieldValue(address + '.field', "text")
+        with self.assertRaises(InvalidArgument):
+            mbus.callAction(address + '.action', x = "text")
+
+    def test_validationOff(self):
+        railName = "validationOff"
+        address = self.__createEndpoints(railName)
+        mbus.setValidationMode(railName, 'off')
+
+        mbus.setFieldValue(address + '.field', "text")
+        self.assertEqual(mbus.getFieldValue(address + '.field'), "text")
+        self.assertEqual(mbus.callAction(address + '.action', x = "text"), "text")
+        self.assertEqual(mbus.getValidationViolations(railName), 0)
+
+        mbus.setValidationMode(railName, 'strict')
+        with self.assertRaises(InvalidArgument):
+            mbus.callAction(address + '.action', x = "text")
+
+    def test_validationSampled(self):
+        railName = "validationSampled"
+        address = self.__createEndpoints(railName)
+        mbus.setValidationMode(railName, 'sampled', sampleEvery = 4)
+
+        for i in range(8):
+            mbus.setFieldValue(address + '.field', "text")
+        self.assertEqual(mbus.getValidationViolations(railName), 2)
+
+        for i in range(4):
+            mbus.callAction(address + '.action', x = "text")
+        # Sampled call checks both arguments and returned value
+        self.assertEqual(mbus.getValidationViolations(railName), 4)
+
+    def test_invalidValidationMode(self):
+        railName = "validationInvalid"
+        self.__createEndpoints(railName)
+        with self.assertRaises(InvalidValidationMode):
+            mbus.setValidationMode(railName, 'invalid')
+        with self.assertRaises(InvalidValidationMode):
+            mbus.setValidationMode(railName, 'sampled', sampleEvery = 0)
+        with self.assertRaises(RailNotFound):
+            mbus.setValidationMode("validationNoRail", 'off')
+
+class TestBatchOperations(unittest.TestCase):
+    def __createFields(self, railName : str) -> str:
+        address = f'{railName}.group'
+        mbus.registerRail(railName)
+        mbus.createGroup(address)
+        for name in ('a', 'b', 'c'):
+            mbus.createEndpoint(address, name, 'field', type=int, value=0)
+        return address
+
+    def test_setGetFieldValues(self):
+        address = self.__createFields("batchFields")
+        values = {f'{address}.a' : 1, f'{address}.b' : 2, f'{address}.c' : 3}
+
+        self.assertEqual(mbus.setFieldValues(values), {})
+        self.assertEqual(mbus.getFieldValues(list(values)), values)
+
+    def test_atomicFieldValues(self):
+        address = self.__createFields("batchFieldsAtomic")
+
+        with self.assertRaises(InvalidFieldValueType):
+            mbus.setFieldValues({f'{address}.a' : 1, f'{address}.b' : "text"})
+        with self.assertRaises(EndpointNotFound):
+            mbus.setFieldValues({f'{address}.a' : 1, f'{address}.missing' : 1})
+        self.assertEqual(mbus.getFieldValue(f'{address}.a'), 0)
+
+        failures = mbus.setFieldValues({f'{address}.a' : 1, f'{address}.b' : "text"}, atomic=False)
+        self.assertEqual(list(failures), [f'{address}.b'])
+        self.assertIsInstance(failures[f'{address}.b'], InvalidFieldValueType)
+        self.assertEqual(mbus.getFieldValues([f'{address}.a', f'{address}.b']), {f'{address}.a' : 1, f'{address}.b' : 0})
+
+    def test_callActionMany(self):
+        railName = "batchActions"
+        address = f'{railName}.group'
+        mbus.registerRail(railName)
+        mbus.createGroup(address)
+
+        calls = []
+        def responder(x : int):
+            calls.append(x)
+            return x * 2
+
+        mbus.createEndpoint(address, 'double', 'action', responder=responder, arguments={"x" : int}, rtype=int)
+
+        self.assertEqual(mbus.callActionMany([(address + '.double', {"x" : 1}), (address + '.double', {"x" : 2})]), [2, 4])
+
+        with self.assertRaises(InvalidArgument):
+            mbus.callActionMany([(address + '.double', {"x" : 3}), (address + '.double', {"x" : "text"})])
+        self.assertEqual(calls, [1, 2])
+
+        results = mbus.callActionMany([(address + '.double', {"x" : 3}), (address + '.double', {"x" : "text"})], atomic=False)
+        self.assertEqual(results[0], 6)
+        self.assertIsInstance(results[1], InvalidArgument)
+
+class TestEventQueue(unittest.TestCase):
+    def __createEvent(self, railName : str, listener) -> str:
+        address = f'{railName}.group'
+        mbus.registerRail(railName)
+        mbus.createGroup(address)
+        mbus.createEndpoint(address, 'event', 'event', responders=listener)
+        return address + '.event'
+
+    def test_publishAndDrain(self):
+        received = []
+        address = self.__createEvent("eventQueueDrain", lambda x : received.append(x))
+
+        mbus.startEventDispatcher(threads=1, maxSize=16)
+        for i in range(10):
+            self.assertTrue(mbus.publishEvent(address, x = i))
+        mbus.stopEventDispatcher(drain=True)
+
+        self.assertEqual(received, list(range(10)))
+        with self.assertRaises(EventDispatcherNotRunning):
+            mbus.publishEvent(address, x = 0)
+
+    def __fillBlockedQueue(self, railName : str, overflow : str):
+        started = threading.Event()
+        release = threading.Event()
+        received = []
+        def listener(x : int):
+            started.set()
+            release.wait(5)
+            received.append(x)
+
+        address = self.__createEvent(railName, listener)
+        mbus.startEventDispatcher(threads=1, maxSize=2, overflow=overflow)
+        mbus.publishEvent(address, x = 0)
+        started.wait(5)
+        mbus.publishEvent(address, x = 1)
+        mbus.publishEvent(address, x = 2)
+        return address, release, received
+
+    def test_dropPolicies(self):
+        address, release, received = self.__fillBlockedQueue("eventQueueDropOldest", 'drop-oldest')
+        self.assertTrue(mbus.publishEvent(address, x = 3))
+        self.assertEqual(mbus.getEventQueueStats()["dropped"], 1)
+        self.assertEqual(mbus.getEventQueueStats()["depth"], 2)
+        release.set()
+        mbus.stopEventDispatcher()
+        self.assertEqual(received, [0, 2, 3])
+
+        address, release, received = self.__fillBlockedQueue("eventQueueDropNewest", 'drop-newest')
+        self.assertFalse(mbus.publishEvent(address, x = 3))
+        release.set()
+        mbus.stopEventDispatcher()
+        self.assertEqual(received, [0, 1, 2])
+
+    def test_raisePolicy(self):
+        address, release, received = self.__fillBlockedQueue("eventQueueRaise", 'raise')
+        with self.assertRaises(EventQueueFull):
+            mbus.publishEvent(address, x = 3)
+        release.set()
+        mbus.stopEventDispatcher()
+        self.assertEqual(received, [0, 1, 2])
+
+    def test_failingListenerCounted(self):
+        def listener():
+            raise ValueError()
+
+        address = self.__createEvent("eventQueueFailing", listener)
+        mbus.startEventDispatcher()
+        mbus.publishEvent(address)
+        mbus.publishEvent(address)
+        while mbus.getEventQueueStats()["dispatched"] < 2:
+            time.sleep(0.01)
+        self.assertEqual(mbus.getEventQueueStats()["failed"], 2)
+        mbus.stopEventDispatcher()
+
+    def test_invalidOverflowPolicy(self):
+        with self.assertRaises(InvalidOverflowPolicy):
+            mbus.startEventDispatcher(overflow='invalid')
+
+    def test_invalidDispatcherSize(self):
+        with self.assertRaises(InvalidDispatcherSize):
+            mbus.startEventDispatcher(threads=0)
+        with self.assertRaises(InvalidDispatcherSize):
+            mbus.startEventDispatcher(maxSize=0, overflow='block')
+        with self.assertRaises(EventDispatcherNotRunning):
+            mbus.publishEvent("eventQueueInvalid.group.event")
+
+class TestFieldWatchers(unittest.TestCase):
+    def __createField(self, railName : str) -> str:
+        address = f'{railName}.group'
+        mbus.registerRail(railName)
+        mbus.createGroup(address)
+        mbus.createEndpoint(address, 'field', 'field', type=int, value=0)
+        return address + '.field'
+
+    def test_watchEveryWrite(self):
+        address = self.__createField("fieldWatchAll")
+        changes = []
+        watcher = mbus.watchField(address, lambda old, new : changes.append((old, new)))
+
+        mbus.setFieldValue(address, 1)
+        mbus.setFieldValue(address, 1)
+        mbus.setFieldValues({address : 2})
+        self.assertEqual(changes, [(0, 1), (1, 1), (1, 2)])
+
+        mbus.unwatchField(watcher)
+        mbus.setFieldValue(address, 3)
+        self.assertEqual(len(changes), 3)
+
+    def test_watchOnlyChanges(self):
+        address = self.__createField("fieldWatchChanges")
+        changes = []
+        mbus.watchField(address, lambda old, new : changes.append((old, new)), onlyChanges=True)
+
+        for value in (1, 1, 2, 2, 2, 3):
+            mbus.setFieldValue(address, value)
+        self.assertEqual(changes, [(0, 1), (1, 2), (2, 3)])
+
+    def test_watchLatestOnly(self):
+        address = self.__createField("fieldWatchLatest")
+        started = threading.Event()
+        release = threading.Event()
+        changes = []
+        def callback(old, new):
+            changes.append((old, new))
+            started.set()
+            release.wait(5)
+
+        mbus.watchField(address, callback, latestOnly=True)
+        writer = threading.Thread(target=mbus.setFieldValue, args=(address, 1))
+        writer.start()
+        started.wait(5)
+
+        for value in range(2, 10):
+            mbus.setFieldValue(address, value)
+        release.set()
+        writer.join()
+
+        self.assertEqual(changes, [(0, 1), (1, 9)])
+
+    def test_watchMinInterval(self):
+        address = self.__createField("fieldWatchInterval")
+        delivered = threading.Event()
+        changes = []
+        def callback(old, new):
+            changes.append((old, new))
+            if new == 9:
+                delivered.set()
+
+        mbus.watchField(address, callback, minInterval=0.1)
+        for value in range(1, 10):
+            mbus.setFieldValue(address, value)
+
+        self.assertTrue(delivered.wait(5))
+        self.assertEqual(changes, [(0, 1), (1, 9)])
+
+    def test_watcherNotifiedOutsideLock(self):
+        address = self.__createField("fieldWatchOutsideLock")
+        values = []
+        mbus.watchField(address, lambda old, new : values.append(mbus.getFieldValues([address])[address]))
+
+        mbus.setFieldValue(address, 5)
+        self.assertEqual(values, [5])
+
+class TestPatternSubscriptions(unittest.TestCase):
+    def test_wildcardSubscriptions(self):
+        railName = "patternPlant"
+        mbus.registerRail(railName)
+        for line in ("line1", "line2"):
+            mbus.createGroup(f"{railName}.{line}")
+            mbus.createGroup(f"{railName}.{line}.sensors")
+            mbus.createEndpoint(f"{railName}.{line}.sensors", 'temp', 'field', type=float, value=0.0)
+            mbus.createEndpoint(f"{railName}.{line}", 'alarm', 'event', responders=[])
+
+        temperatures = []
+        everything = []
+        mbus.subscribe(f"{railName}.*.sensors.temp", lambda notification : temperatures.append((notification.address, notification.newValue)))
+        subscription = mbus.subscribe(f"{railName}.line2.**", lambda notification : everything.append((notification.address, notification.kind)))
+
+        mbus.setFieldValue(f"{railName}.line1.sensors.temp", 1.5)
+        mbus.setFieldValue(f"{railName}.line2.sensors.temp", 2.5)
+        mbus.callEvent(f"{railName}.line2.alarm", level = 3)
+        mbus.callEvent(f"{railName}.line1.alarm", level = 1)
+
+        self.assertEqual(temperatures, [(f"{railName}.line1.sensors.temp", 1.5), (f"{railName}.line2.sensors.temp", 2.5)])
+        self.assertEqual(everything, [(f"{railName}.line2.sensors.temp", 'field'), (f"{railName}.line2.alarm", 'event')])
+
+        # Endpoints created after subscribing match too
+        mbus.createGroup(f"{railName}.line3")
+        mbus.createGroup(f"{railName}.line3.sensors")
+        mbus.createEndpoint(f"{railName}.line3.sensors", 'temp', 'field', type=float, value=0.0)
+        mbus.setFieldValue(f"{railName}.line3.sensors.temp", 3.5)
+        self.assertEqual(temperatures[-1], (f"{railName}.line3.sensors.temp", 3.5))
+
+        mbus.unsubscribe(subscription)
+        mbus.callEvent(f"{railName}.line2.alarm")
+        self.assertEqual(len(everything), 2)
+
+    def test_eventNotificationArguments(self):
+        railName = "patternEventArguments"
+        mbus.registerRail(railName)
+        mbus.createGroup(f"{railName}.group")
+        mbus.createEndpoint(f"{railName}.group", 'event', 'event', responders=[])
+
+        notifications = []
+        mbus.subscribe("patternEventArguments.**", notifications.append)
+        mbus.callEvent(f"{railName}.group.event", x = 1)
+
+        self.assertEqual(notifications, [busNotification(f"{railName}.group.event", 'event', arguments={"x" : 1})])
+
+    def test_patternTrie(self):
+        trie = busPatternTrie()
+        patterns = ["a.b.c", "a.*.c", "a.**", "**.c", "a.b", "*.*.*.*"]
+        subscriptions = {pattern : busSubscription(pattern, print) for pattern in patterns}
+        for subscription in subscriptions.values():
+            trie.insert(subscription)
+
+        def matching(address : str) -> set[str]:
+            return set(subscription.pattern for subscription in trie.match(address.split('.')))
+
+        self.assertEqual(matching("a.b.c"), {"a.b.c", "a.*.c", "a.**", "**.c"})
+        self.assertEqual(matching("a.x.y.c"), {"a.**", "**.c", "*.*.*.*"})
+        self.assertEqual(matching("b.c"), {"**.c"})
+        self.assertEqual(matching("a.b"), {"a.**", "a.b"})
+
+        trie.remove(subscriptions["a.**"])
+        self.assertEqual(matching("a.b"), {"a.b"})
+
+    def test_invalidPattern(self):
+        for pattern in ("a..b", "a.b*", ""):
+            with self.assertRaises(InvalidPattern):
+                mbus.subscribe(pattern, print)
+
+class TestMetrics(unittest.TestCase):
+    def tearDown(self):
+        mbus.enableMetrics(False)
+
+    def test_metricsDisabledByDefault(self):
+        self.assertEqual(mbus.stats(), {})
+
+    def test_endpointMetrics(self):
+        railName = "metricsEndpoints"
+        address = f'{railName}.group'
+        mbus.registerRail(railName)
+        mbus.createGroup(address)
+
+        def responder(x : int):
+            if x < 0:
+                raise ValueError(x)
+            time.sleep(0.002)
+            return x
+
+        mbus.createEndpoint(address, 'action', 'action', responder=responder, arguments={"x" : int}, rtype=int)
+        mbus.createEndpoint(address, 'field', 'field', type=int, value=0)
+
+        mbus.enableMetrics()
+        for i in range(5):
+            mbus.callAction(address + '.action', x = i)
+        with self.assertRaises(ValueError):
+            mbus.callAction(address + '.action', x = -1)
+        with self.assertRaises(InvalidArgument):
+            mbus.resolve(address + '.action').call(x = "text")
+
+        mbus.setFieldValue(address + '.field', 1)
+        mbus.getFieldValue(address + '.field')
+
+        stats = mbus.stats()
+        action = stats[address + '.action']
+        self.assertEqual(action["calls"], 7)
+        self.assertEqual(action["errors"], {"ValueError" : 1, "InvalidArgument" : 1})
+        # Invalid arguments never reach the responder, so only six calls have latency
+        self.assertEqual(sum(action["latencyBuckets"].values()), 6)
+        self.assertEqual(action["lockAcquisitions"], 6)
+        self.assertGreaterEqual(action["lockHold"], 0.01)
+        self.assertGreaterEqual(action["latencyTotal"], 0.01)
+        self.assertLessEqual(action["latencyTotal"], action["lockHold"])
+
+        field = stats[address + '.field']
+        self.assertEqual(field["calls"], 2)
+        self.assertEqual(field["lockAcquisitions"], 1)
+
+    def test_latencyExcludesLockWait(self):
+        railName = "metricsLockWait"
+        address = f'{railName}.group'
+        mbus.registerRail(railName)
+        mbus.createGroup(address)
+
+        started = threading.Event()
+        def slowResponder():
+            started.set()
+            time.sleep(0.1)
+            return True
+
+        mbus.createEndpoint(address, 'slow', 'trigger', responder=slowResponder, arguments={})
+        mbus.createEndpoint(address, 'fast', 'trigger', responder=lambda : True, arguments={})
+
+        mbus.enableMetrics()
+        holder = threading.Thread(target=lambda : mbus.fireTrigger(address + '.slow'))
+        holder.start()
+        started.wait()
+        mbus.fireTrigger(address + '.fast')
+        holder.join()
+
+        fast = mbus.stats()[address + '.fast']
+        self.assertGreaterEqual(fast["lockWait"], 0.05)
+        self.assertLess(fast["latencyTotal"], 0.05)
+
+    def test_batchFutureAndParallelMetrics(self):
+        railName = "metricsBatch"
+        address = f'{railName}.group'
+        mbus.registerRail(railName)
+        mbus.createGroup(address)
+        mbus.createEndpoint(address, 'field', 'field', type=int, value=0)
+        mbus.createEndpoint(address, 'action', 'action', responder=lambda x : 1 // x, arguments={"x" : int}, rtype=int)
+        mbus.createEndpoint(address, 'event', 'event', responders=[lambda : None, lambda : 1 // 0])
+
+        mbus.enableMetrics()
+        mbus.setFieldValues({address + '.field' : 1})
+        mbus.getFieldValues([address + '.field'])
+        mbus.getFieldSnapshot(address + '.field')
+        mbus.callActionMany([(address + '.action', {"x" : 1}), (address + '.action', {"x" : 0})], atomic=False)
+        mbus.callActionFuture(address + '.action', x = 1).result()
+        with self.assertRaises(ZeroDivisionError):
+            mbus.resolve(address + '.action').callFuture(x = 0).result()
+        mbus.callEventParallel(address + '.event', wait='all')
+
+        stats = mbus.stats()
+        self.assertEqual(stats[address + '.field']["calls"], 3)
+        action = stats[address + '.action']
+        self.assertEqual(action["calls"], 4)
+        self.assertEqual(action["errors"], {"ZeroDivisionError" : 2})
+        self.assertEqual(sum(action["latencyBuckets"].values()), 4)
+        event = stats[address + '.event']
+        self.assertEqual(event["calls"], 1)
+        self.assertEqual(event["errors"], {"ZeroDivisionError" : 1})
+        self.assertEqual(sum(event["latencyBuckets"].values()), 2)
+
+    def test_metricsAcrossThreads(self):
+        railName = "metricsThreads"
+        address = f'{railName}.group'
+        mbus.registerRail(railName)
+        mbus.createGroup(address)
+        mbus.createEndpoint(address, 'trigger', 'trigger', responder=lambda : True, arguments={})
+
+        mbus.enableMetrics()
+        threads = [threading.Thread(target=lambda : [mbus.fireTrigger(address + '.trigger') for _ in range(100)]) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(mbus.stats()[address + '.trigger']["calls"], 400)
+
+        mbus.enableMetrics(False)
+        mbus.fireTrigger(address + '.trigger')
+        self.assertEqual(mbus.stats(), {})
+
+class TestInterceptors(unittest.TestCase):
+    def setUp(self):
+        self.installed = []
+
+    def tearDown(self):
+        for interceptor, scope in self.installed:
+            mbus.removeInterceptor(interceptor, scope)
+        mbus.enableMetrics(False)
+
+    def __install(self, interceptor, scope : str = ''):
+        mbus.addInterceptor(interceptor, scope)
+        self.installed.append((interceptor, scope))
+
+    def test_scopedOrder(self):
+        railName = "interceptorsOrder"
+        address = f'{railName}.group'
+        mbus.registerRail(railName)
+        mbus.createGroup(address)
+        mbus.createEndpoint(address, 'action', 'action', responder=lambda x : x * 2, arguments={"x" : int}, rtype=int)
+        mbus.createGroup(f'{railName}.other')
+        mbus.createEndpoint(f'{railName}.other', 'outside', 'field', type=int, value=0)
+
+        seen = []
+        def recording(name):
+            def interceptor(call, proceed):
+                seen.append((name, call.operation, call.address))
+                return proceed(call)
+            return interceptor
+
+        self.__install(recording("group"), address)
+        self.__install(recording("rail"), railName)
+        self.__install(recording("other"), "interceptorsOrderOther")
+
+        self.assertEqual(mbus.callAction(address + '.action', x = 2), 4)
+        self.assertEqual(seen, [("rail", "callAction", address + '.action'), ("group", "callAction", address + '.action')])
+
+        seen.clear()
+        mbus.setFieldValue(railName + '.other.outside', 3)
+        self.assertEqual(mbus.getFieldValue(railName + '.other.outside'), 3)
+        self.assertEqual(seen, [("rail", "setFieldValue", railName + '.other.outside'), ("rail", "getFieldValue", railName + '.other.outside')])
+
+    def test_endpointOutsideEveryScope(self):
+        railName = "interceptorsOutside"
+        address = f'{railName}.group'
+        mbus.registerRail(railName)
+        mbus.createGroup(address)
+        mbus.createEndpoint(address, 'trigger', 'trigger', responder=lambda : True, arguments={})
+        mbus.createEndpoint(address, 'event', 'event', responders=[lambda : None])
+        mbus.createEndpoint(address, 'field', 'field', type=int, value=0)
+        mbus.createEndpoint(address, 'action', 'action', responder=lambda x : x * 2, arguments={"x" : int}, rtype=int)
+
+        seen = []
+        def interceptor(call, proceed):
+            seen.append(call.address)
+            return proceed(call)
+        self.__install(interceptor, "interceptorsOutsideOther")
+
+        self.assertTrue(mbus.fireTrigger(address + '.trigger'))
+        mbus.callEvent(address + '.event')
+        mbus.setFieldValue(address + '.field', 5)
+        self.assertEqual(mbus.getFieldValue(address + '.field'), 5)
+        self.assertEqual(mbus.callAction(address + '.action', x = 3), 6)
+        self.assertEqual(asyncio.run(mbus.callActionAsync(address + '.action', x = 4)), 8)
+        self.assertEqual(seen, [])
+
+    def test_shortCircuitAndRewrite(self):
+        railName = "interceptorsRewrite"
+        address = f'{railName}.group'
+        mbus.registerRail(railName)
+        mbus.createGroup(address)
+        mbus.createEndpoint(address, 'action', 'action', responder=lambda x : x * 2, arguments={"x" : int}, rtype=int)
+        mbus.createEndpoint(address, 'field', 'field', type=int, value=0)
+
+        def denyNegative(call, proceed):
+            if call.operation == 'callAction' and call.args[0]["x"] < 0:
+                raise PermissionError(call.address)
+            return proceed(call)
+
+        def clampField(call, proceed):
+            if call.operation == 'setFieldValue':
+                call.args = (min(call.args[0], 10),)
+            return proceed(call)
+
+        self.__install(denyNegative, railName)
+        self.__install(clampField, address)
+
+        with self.assertRaises(PermissionError):
+            mbus.callAction(address + '.action', x = -1)
+        self.assertEqual(mbus.resolve(address + '.action').call(x = 1), 2)
+
+        mbus.setFieldValue(address + '.field', 100)
+        self.assertEqual(mbus.getFieldValue(address + '.field'), 10)
+
+    def test_batchFutureAndParallelCalls(self):
+        railName = "interceptorsBatch"
+        address = f'{railName}.group'
+        mbus.registerRail(railName)
+        mbus.createGroup(address)
+        mbus.createEndpoint(address, 'field', 'field', type=int, value=0)
+        mbus.createEndpoint(address, 'other', 'field', type=int, value=0)
+        mbus.createEndpoint(address, 'action', 'action', responder=lambda x : x * 2, arguments={"x" : int}, rtype=int)
+        mbus.createEndpoint(address, 'skipped', 'action', responder=lambda : 0, arguments={}, rtype=int)
+        mbus.createEndpoint(address, 'event', 'event', responders=[lambda : None])
+
+        def deny(call, proceed):
+            raise PermissionError(call.operation)
+        self.__install(deny, railName)
+
+        for operation in [
+            lambda : mbus.setFieldValues({address + '.field' : 1}),
+            lambda : mbus.getFieldValues([address + '.field']),
+            lambda : mbus.getFieldSnapshot(address + '.field'),
+            lambda : mbus.callActionMany([(address + '.action', {"x" : 1})]),
+            lambda : mbus.callActionFuture(address + '.action', x = 1),
+            lambda : mbus.resolve(address + '.action').callFuture(x = 1),
+            lambda : mbus.callEventParallel(address + '.event'),
+        ]:
+            with self.assertRaises(PermissionError):
+                operation()
+        mbus.removeInterceptor(deny, railName)
+
+        def rewrite(call, proceed):
+            if call.address.endswith(('.other', '.skipped')):
+                return -1
+            if call.operation == 'setFieldValues':
+                call.args = (call.args[0] + 1,)
+            if call.operation == 'callActionMany':
+                call.args = ({"x" : call.args[0]["x"] + 1},)
+            return proceed(call)
+        self.__install(rewrite, address)
+
+        self.assertEqual(mbus.setFieldValues({address + '.field' : 1, address + '.other' : 5}), {})
+        self.assertEqual(mbus.getFieldValues([address + '.field', address + '.other']), {address + '.field' : 2, address + '.other' : -1})
+        mbus.removeInterceptor(rewrite, address)
+        self.assertEqual(mbus.getFieldValue(address + '.other'), 0)
+        self.__install(rewrite, address)
+        self.assertEqual(mbus.callActionMany([(address + '.action', {"x" : 1}), (address + '.skipped', {})]), [4, -1])
+
+    def test_removalRestoresDirectDispatch(self):
+        railName = "interceptorsRemoval"
+        address = f'{railName}.group'
+        mbus.registerRail(railName)
+        mbus.createGroup(address)
+        mbus.createEndpoint(address, 'trigger', 'trigger', responder=lambda : True, arguments={})
+
+        calls = []
+        def counting(call, proceed):
+            calls.append(call.address)
+            return proceed(call)
+
+        mbus.addInterceptor(counting)
+        mbus.fireTrigger(address + '.trigger')
+        mbus.removeInterceptor(counting)
+        mbus.fireTrigger(address + '.trigger')
+        self.assertEqual(calls, [address + '.trigger'])
+
+    def test_asyncAndMetrics(self):
+        railName = "interceptorsAsync"
+        address = f'{railName}.group'
+        mbus.registerRail(railName)
+        mbus.createGroup(address)
+        mbus.createEndpoint(address, 'action', 'action', responder=lambda x : x + 1, arguments={"x" : int}, rtype=int)
+
+        operations = []
+        def recording(call, proceed):
+            operations.append(call.operation)
+            return proceed(call)
+
+        self.__install(recording, address)
+        mbus.enableMetrics()
+        self.assertEqual(asyncio.run(mbus.callActionAsync(address + '.action', x = 1)), 2)
+        self.assertEqual(mbus.callAction(address + '.action', x = 1), 2)
+        self.assertEqual(operations, ['callActionAsync', 'callAction'])
+        self.assertEqual(mbus.stats()[address + '.action']["calls"], 2)
+
+class TestCompactLayout(unittest.TestCase):
+    def tearDown(self):
+        mbus.setLockingStrategy('global')
+
+    def test_slottedEndpoints(self):
+        railName = "compactSlots"
+        address = f'{railName}.group'
+        mbus.registerRail(railName)
+        mbus.createGroup(address)
+        mbus.createGroup(address + '.empty')
+        mbus.createEndpoint(address, 'field', 'field', type=int, value=0)
+
+        endpoint = mbus.resolve(address + '.field').endpoint
+        self.assertFalse(hasattr(endpoint, '__dict__'))
+        self.assertIsNone(endpoint.mutex)
+
+        mbus.setLockingStrategy('endpoint')
+        mbus.setFieldValue(address + '.field', 1)
+        self.assertIsNotNone(endpoint.mutex)
+        self.assertIs(endpoint.getMutex(), endpoint.mutex)
+        self.assertEqual(mbus.getFieldValue(address + '.field'), 1)
+
+        with self.assertRaises(EndpointNotFound):
+            mbus.getFieldValue(address + '.empty.field')
+        mbus.createEndpoint(address + '.empty', 'field', 'field', type=int, value=2)
+        self.assertEqual(mbus.getFieldValue(address + '.empty.field'), 2)
+        self.assertIs(mbus.resolve(address + '.empty.field').endpoint.endpointName, endpoint.endpointName)
+
+class TestSchema(unittest.TestCase):
+    def test_loadNestedSchema(self):
+        calls = []
+        mbus.loadSchema({
+            "rails" : {
+                "schemaNested" : {
+                    "groups" : {
+                        "outer" : {
+                            "endpoints" : {
+                                "dump" : {"kind" : "action", "responder" : "json:dumps", "arguments" : {"obj" : "object"}, "rtype" : "str"},
+                                "count" : {"kind" : "field", "type" : "int", "value" : 1},
+                            },
+                            "groups" : {
+                                "inner" : {
+                                    "endpoints" : {
+                                        "trigger" : {"kind" : "trigger", "responder" : lambda x : calls.append(x), "arguments" : {"x" : int}},
+                                        "event" : {"kind" : "event", "responders" : [lambda value : calls.append(value)] * 2, "dispatch" : "sequential"},
+                                    }
+                                }
+                            }
+                        }
+                    }
+                }
+            }
+        })
+
+        self.assertIn("schemaNested", mbus.getRails())
+        self.assertEqual(mbus.callAction("schemaNested.outer.dump", obj = [1]), "[1]")
+        self.assertEqual(mbus.getFieldValue("schemaNested.outer.count"), 1)
+        mbus.fireTrigger("schemaNested.outer.inner.trigger", x = 2)
+        mbus.callEvent("schemaNested.outer.inner.event", value = 3)
+        self.assertEqual(calls, [2, 3, 3])
+
+        mbus.createGroup("schemaNested.outer.inner.later")
+        self.assertTrue(mbus.addressExists("schemaNested.outer.inner.later"))
+        with self.assertRaises(InvalidFieldValueType):
+            mbus.setFieldValue("schemaNested.outer.count", "text")
+
+    def test_allErrorsReportedAndNothingCreated(self):
+        mbus.registerRail("schemaErrors")
+        mbus.createGroup("schemaErrors.existing")
+        mbus.createEndpoint("schemaErrors.existing", "field", "field", type=int, value=0)
+
+        with self.assertRaises(SchemaError) as context:
+            mbus.loadSchema({
+                "rails" : {
+                    "schemaErrors" : {
+                        "groups" : {
+                            "existing" : {"endpoints" : {
+                                "field" : {"kind" : "field", "type" : "int", "value" : 0},
+                                "fine" : {"kind" : "field", "type" : "int", "value" : 0},
+                            }},
+                            "new" : {"endpoints" : {
+                                "badType" : {"kind" : "field", "type" : "int", "value" : "text"},
+                                "noKind" : {"type" : "int", "value" : 0},
+                                "badImport" : {"kind" : "trigger", "responder" : "json:missing", "arguments" : {}},
+                            }},
+                            "1invalid" : {},
+                        }
+                    },
+                    "schemaErrorsNew" : {"groups" : {"group" : {"unknown" : 1}}},
+                    "invalid-rail" : {},
+                }
+            })
+
+        self.assertEqual(len(context.exception.errors), 7)
+        self.assertFalse(mbus.addressExists("schemaErrors.existing.fine"))
+        self.assertFalse(mbus.addressExists("schemaErrors.new"))
+        self.assertNotIn("schemaErrorsNew", mbus.getRails())
+
+    def test_mergeIntoExistingFromFile(self):
+        mbus.registerRail("schemaMerge")
+        mbus.createGroup("schemaMerge.group")
+        mbus.createEndpoint("schemaMerge.group", "first", "field", type=int, value=1)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "schema.json")
+            with open(path, "w") as schemaFile:
+                json.dump({"rails" : {"schemaMerge" : {"groups" : {"group" : {
+                    "endpoints" : {"second" : {"kind" : "field", "type" : "int", "value" : 2}},
+                    "groups" : {"sub" : {"endpoints" : {"third" : {"kind" : "field", "type" : "str", "value" : "3"}}}},
+                }}}}}, schemaFile)
+            mbus.loadSchema(path)
+
+        self.assertEqual(mbus.getFieldValue("schemaMerge.group.first"), 1)
+        self.assertEqual(mbus.getFieldValue("schemaMerge.group.second"), 2)
+        self.assertEqual(mbus.getFieldValue("schemaMerge.group.sub.third"), "3")
+
+class TestRelativeAddresses(unittest.TestCase):
+    def test_boundModuleUsesRelativeAddresses(self):
+        caller = types.ModuleType("relativeAddressesCaller")
+        exec(
+            "from mbus import mbus\n"
+            "def setUp():\n"
+            "    mbus.registerRail('relativeRail', bindToModule = True)\n"
+            "    mbus.createGroup('group')\n"
+            "    mbus.createGroup('group.inner')\n"
+            "    mbus.createEndpoint('group.inner', 'field', 'field', type=int, value=1)\n"
+            "def read(address):\n"
+            "    return mbus.getFieldValue(address)\n",
+            caller.__dict__
+        )
+
+        caller.setUp()
+        self.assertEqual(caller.read('group.inner.field'), 1)
+        self.assertEqual(caller.read('relativeRail.group.inner.field'), 1)
+        mbus.setFieldValue('relativeRail.group.inner.field', 2)
+        self.assertEqual(caller.read('group.inner.field'), 2)
+
+        with self.assertRaises(RailNotFound):
+            caller.read('missing.group.field')
+        with self.assertRaises(RailNotFound):
+            mbus.getFieldValue('unboundRelative.inner.field')
+
+    def test_railViewSkipsCallerLookup(self):
+        view = mbus.registerRail('relativeView', bindToModule = True)
+        view.createGroup('group')
+        view.createEndpoint('group', 'field', 'field', type=int, value=1)
+        view.createEndpoint('group', 'action', 'action', responder=lambda x : x + 1, arguments={"x" : int}, rtype=int)
+
+        self.assertEqual(view.getFieldValue('group.field'), 1)
+        view.setFieldValue('relativeView.group.field', 2)
+        self.assertEqual(mbus.getFieldValue('relativeView.group.field'), 2)
+        self.assertEqual(asyncio.run(view.callActionAsync('group.action', x = 1)), 2)
+        self.assertEqual(view.resolve('group.action').call(x = 2), 3)
+        self.assertEqual(view.getLockingStrategy(), mbus.getLockingStrategy())
+
+        with patch('mbus.callerModuleName') as callerModuleName:
+            self.assertEqual(view.getFieldValue('group.field'), 2)
+            callerModuleName.assert_not_called()
+        with self.assertRaises(EndpointNotFound):
+            view.getFieldValue('group.missing')
+
+class TestActionCache(unittest.TestCase):
+    def test_cachedResultsAndStats(self):
+        railName = "actionCacheResults"
+        address = f'{railName}.group'
+        mbus.registerRail(railName)
+        mbus.createGroup(address)
+
+        calls = []
+        def responder(x : int):
+            calls.append(x)
+            return x * 2
+
+        mbus.createEndpoint(address, 'action', 'action', responder=responder, arguments={"x" : int}, rtype=int, cache={"maxEntries" : 2})
+
+        self.assertEqual(mbus.callAction(address + '.action', x = 1), 2)
+        self.assertEqual(mbus.callAction(address + '.action', x = 1), 2)
+        self.assertEqual(mbus.callActionFuture(address + '.action', x = 1).result(), 2)
+        self.assertEqual(asyncio.run(mbus.callActionAsync(address + '.action', x = 1)), 2)
+        self.assertEqual(calls, [1])
+
+        with self.assertRaises(InvalidArgument):
+            mbus.callAction(address + '.action', x = 1.0)
+
+        mbus.callAction(address + '.action', x = 2)
+        mbus.callAction(address + '.action', x = 3)
+        mbus.callAction(address + '.action', x = 1)
+        self.assertEqual(calls, [1, 2, 3, 1])
+
+        stats = mbus.getActionCacheStats(address)[address + '.action']
+        self.assertEqual(stats["hits"], 3)
+        self.assertEqual(stats["misses"], 4)
+        self.assertEqual(stats["evictions"], 2)
+        self.assertEqual(stats["size"], 2)
+
+    def test_ttlKeyAndInvalidation(self):
+        railName = "actionCacheInvalidation"
+        mbus.registerRail(railName)
+        mbus.createGroup(f'{railName}.first')
+        mbus.createGroup(f'{railName}.first.inner')
+        mbus.createGroup(f'{railName}.second')
+
+        calls = []
+        def responder(x : int, trace : str):
+            calls.append(x)
+            return x
+
+        cache = {"ttl" : 0.05, "key" : lambda x, trace : x}
+        for group in ('first', 'first.inner', 'second'):
+            mbus.createEndpoint(f'{railName}.{group}', 'action', 'action', responder=responder, arguments={"x" : int, "trace" : str}, rtype=int, cache=cache)
+
+        mbus.callAction(f'{railName}.first.action', x = 1, trace = "a")
+        mbus.callAction(f'{railName}.first.action', x = 1, trace = "b")
+        self.assertEqual(calls, [1])
+        time.sleep(0.06)
+        mbus.callAction(f'{railName}.first.action', x = 1, trace = "c")
+        self.assertEqual(calls, [1, 1])
+
+        for group in ('first.inner', 'second'):
+            mbus.callAction(f'{railName}.{group}.action', x = 1, trace = "")
+        self.assertEqual(mbus.invalidateActionCache(f'{railName}.first'), 2)
+        for group in ('first', 'first.inner', 'second'):
+            mbus.callAction(f'{railName}.{group}.action', x = 1, trace = "")
+        self.assertEqual(calls, [1, 1, 1, 1, 1, 1])
+        self.assertEqual(mbus.invalidateActionCache(f'{railName}.second.action'), 1)
+        self.assertEqual(len(mbus.getActionCacheStats(railName)), 3)
+
+    def test_invalidationDuringCall(self):
+        railName = "actionCacheInFlight"
+        address = f'{railName}.group'
+        mbus.registerRail(railName)
+        mbus.createGroup(address)
+
+        source = {"value" : 1}
+        def responder():
+            value = source["value"]
+            if value == 1:
+                # Source changes and cache is invalidated while this call is still running
+                source["value"] = 2
+                mbus.invalidateActionCache(address + '.action')
+            return value
+
+        mbus.createEndpoint(address, 'action', 'action', responder=responder, arguments={}, rtype=int, cache=True)
+        self.assertEqual(mbus.callAction(address + '.action'), 1)
+        self.assertEqual(mbus.callAction(address + '.action'), 2)
+        self.assertEqual(mbus.callAction(address + '.action'), 2)
+        self.assertEqual(mbus.getActionCacheStats(address + '.action')[address + '.action']["hits"], 1)
+
+    def test_invalidCacheOptions(self):
+        railName = "actionCacheOptions"
+        address = f'{railName}.group'
+        mbus.registerRail(railName)
+        mbus.createGroup(address)
+
+        for cache in ({"size" : 1}, {"maxEntries" : 0}, {"ttl" : -1}, {"key" : 1}, "yes"):
+            with self.assertRaises(InvalidEnpointParameter):
+                mbus.createEndpoint(address, 'action', 'action', responder=lambda : 1, arguments={}, rtype=int, cache=cache)
+
+        mbus.createEndpoint(address, 'unhashable', 'action', responder=lambda x : len(x), arguments={"x" : list}, rtype=int, cache=True)
+        self.assertEqual(mbus.callAction(address + '.unhashable', x = [1, 2]), 2)
+        self.assertEqual(mbus.getActionCacheStats(address + '.unhashable')[address + '.unhashable']["uncacheable"], 1)
+
+class TestSingleFlight(unittest.TestCase):
+    def __callConcurrently(self, address : str, endpoint, callers : int, release : threading.Event, **kwargs):
+        outcomes = [None] * callers
+
+        def call(position : int):
+            try:
+                outcomes[position] = mbus.callAction(address, **kwargs)
+            except Exception as exception:
+                outcomes[position] = exception
+
+        threads = [threading.Thread(target=call, args=(i,)) for i in range(callers)]
+        coalesced = endpoint.singleFlight.coalesced
+        for thread in threads:
+            thread.start()
+        deadline = time.monotonic() + 5
+        while endpoint.singleFlight.coalesced < coalesced + callers - 1 and time.monotonic() < deadline:
+            time.sleep(0.001)
+        release.set()
+        for thread in threads:
+            thread.join()
+        return outcomes
+
+    def test_concurrentCallsShareResult(self):
+        railName = "singleFlightShared"
+        address = f'{railName}.group'
+        mbus.registerRail(railName)
+        mbus.createGroup(address)
+
+        release = threading.Event()
+        calls = []
+        def responder(x : int):
+            calls.append(x)
+            release.wait(5)
+            if x < 0:
+                raise ValueError(x)
+            return x * 2
+
+        mbus.createEndpoint(address, 'action', 'action', responder=responder, arguments={"x" : int}, rtype=int, singleFlight=True)
+        endpoint = mbus.resolve(address + '.action').endpoint
+
+        self.assertEqual(self.__callConcurrently(address + '.action', endpoint, 8, release, x = 2), [4] * 8)
+        self.assertEqual(calls, [2])
+
+        release.clear()
+        outcomes = self.__callConcurrently(address + '.action', endpoint, 4, release, x = -1)
+        self.assertTrue(all(isinstance(outcome, ValueError) for outcome in outcomes))
+        self.assertEqual(calls, [2, -1])
+
+        self.assertEqual(mbus.callAction(address + '.action', x = 2), 4)
+        self.assertEqual(mbus.callActionFuture(address + '.action', x = 3).result(), 6)
+        self.assertEqual(asyncio.run(mbus.callActionAsync(address + '.action', x = 4)), 8)
+        self.assertEqual(calls, [2, -1, 2, 3, 4])
+
+    def test_timedOutAsyncFollowerKeepsLeaderResult(self):
+        railName = "singleFlightFollowerTimeout"
+        address = f'{railName}.group'
+        mbus.registerRail(railName)
+        mbus.createGroup(address)
+
+        started = threading.Event()
+        release = threading.Event()
+        def responder(x : int):
+            started.set()
+            release.wait(5)
+            return x * 2
+
+        mbus.createEndpoint(address, 'action', 'action', responder=responder, arguments={"x" : int}, rtype=int, singleFlight=True)
+
+        outcome = []
+        leader = threading.Thread(target=lambda : outcome.append(mbus.callAction(address + '.action', x = 1)))
+        leader.start()
+        started.wait(5)
+
+        async def follow():
+            with self.assertRaises(asyncio.TimeoutError):
+                await asyncio.wait_for(mbus.callActionAsync(address + '.action', x = 1), 0.05)
+            future = mbus.callActionFuture(address + '.action', x = 1)
+            future.cancel()
+
+        asyncio.run(follow())
+        release.set()
+        leader.join()
+        self.assertEqual(outcome, [2])
+
+    def test_cancelledAsyncLeaderHandsOff(self):
+        railName = "singleFlightLeaderCancel"
+        address = f'{railName}.group'
+        mbus.registerRail(railName)
+        mbus.createGroup(address)
+
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+        def responder(x : int):
+            calls.append(x)
+            started.set()
+            release.wait(5)
+            return x * 2
+
+        mbus.createEndpoint(address, 'action', 'action', responder=responder, arguments={"x" : int}, rtype=int, singleFlight=True)
+        singleFlight = mbus.resolve(address + '.action').endpoint.singleFlight
+
+        outcomes = []
+        def follow():
+            try:
+                outcomes.append(mbus.callAction(address + '.action', x = 3))
+            except BaseException as exception:
+                outcomes.append(exception)
+        followers = [threading.Thread(target=follow) for _ in range(3)]
+
+        async def lead():
+            task = asyncio.create_task(mbus.callActionAsync(address + '.action', x = 3))
+            while not started.is_set():
+                await asyncio.sleep(0.001)
+            for follower in followers:
+                follower.start()
+            while singleFlight.coalesced < 3:
+                await asyncio.sleep(0.001)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+            # One follower took over the call, the other two wait for it again
+            while singleFlight.coalesced < 5:
+                await asyncio.sleep(0.001)
+            release.set()
+
+        asyncio.run(lead())
+        for follower in followers:
+            follower.join()
+        self.assertEqual(outcomes, [6, 6, 6])
+        self.assertEqual(calls, [3, 3])
+
+    def test_unhashableArgumentsAndOptions(self):
+        railName = "singleFlightUnhashable"
+        address = f'{railName}.group'
+        mbus.registerRail(railName)
+        mbus.createGroup(address)
+
+        with self.assertRaises(InvalidEnpointParameter):
+            mbus.createEndpoint(address, 'invalid', 'action', responder=len, arguments={"obj" : list}, rtype=int, singleFlight="yes")
+
+        mbus.createEndpoint(address, 'action', 'action', responder=lambda x : len(x), arguments={"x" : list}, rtype=int, singleFlight=True)
+        self.assertEqual(mbus.callAction(address + '.action', x = [1, 2]), 2)
+        self.assertEqual(mbus.resolve(address + '.action').endpoint.singleFlight.coalesced, 0)
+
+class TestSharedFields(unittest.TestCase):
+    def setUp(self):
+        self.sharedName = f'mbusTest{os.getpid()}_{random.randrange(1 << 30)}'
+
+    def test_attachedFieldSeesWrites(self):
+        railName = "sharedFieldsAttached"
+        address = f'{railName}.group'
+        mbus.registerRail(railName)
+        mbus.createGroup(address)
+
+        mbus.createEndpoint(address, 'owner', 'field', type=tuple, value=(1.0, 2.0, 3.0), shared=self.sharedName, format='3d')
+        mbus.createEndpoint(address, 'reader', 'field', type=tuple, shared=self.sharedName, format='3d', attach=True)
+        try:
+            self.assertEqual(mbus.getFieldValue(address + '.reader'), (1.0, 2.0, 3.0))
+            mbus.setFieldValue(address + '.owner', (4.0, 5.0, 6.0))
+            self.assertEqual(mbus.getFieldValue(address + '.reader'), (4.0, 5.0, 6.0))
+            self.assertEqual(mbus.getFieldSnapshot(address + '.reader'), ((4.0, 5.0, 6.0), 2))
+            self.assertEqual(mbus.getFieldValues([address + '.reader']), {address + '.reader' : (4.0, 5.0, 6.0)})
+
+            with self.assertRaises(InvalidFieldValueType):
+                mbus.setFieldValue(address + '.owner', (1.0, 2.0))
+            with self.assertRaises(SettingFieldFailed):
+                mbus.setFieldValue(address + '.reader', (7.0, 8.0, 9.0))
+            with self.assertRaises(SettingFieldFailed):
+                mbus.setFieldValues({address + '.owner' : (7.0, 8.0, 9.0), address + '.reader' : (7.0, 8.0, 9.0)})
+            self.assertEqual(mbus.getFieldSnapshot(address + '.reader'), ((4.0, 5.0, 6.0), 2))
+        finally:
+            mbus.releaseSharedField(address + '.reader')
+            mbus.releaseSharedField(address + '.owner')
+
+        self.assertEqual(mbus.getFieldValue(address + '.owner'), (4.0, 5.0, 6.0))
+        mbus.setFieldValue(address + '.owner', (1.0, 2.0))
+
+    def test_attachFromOtherProcess(self):
+        railName = "sharedFieldsAttachProcess"
+        address = f'{railName}.group'
+        mbus.registerRail(railName)
+        mbus.createGroup(address)
+        mbus.createEndpoint(address, 'counter', 'field', type=int, value=1, shared=self.sharedName)
+
+        script = (
+            "import sys\n"
+            "from mbus import mbus, SettingFieldFailed\n"
+            "mbus.registerRail('worker')\n"
+            "mbus.createGroup('worker.group')\n"
+            f"mbus.createEndpoint('worker.group', 'counter', 'field', type=int, shared='{self.sharedName}', attach=True)\n"
+            "print(mbus.getFieldValue('worker.group.counter'), flush=True)\n"
+            "sys.stdin.readline()\n"
+            "print(mbus.getFieldSnapshot('worker.group.counter'), flush=True)\n"
+            "try:\n"
+            "    mbus.setFieldValue('worker.group.counter', 0)\n"
+            "except SettingFieldFailed:\n"
+            "    print('readOnly', flush=True)\n"
+            "mbus.releaseSharedField('worker.group.counter')\n"
+        )
+        worker = subprocess.Popen([sys.executable, "-c", script], stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                  text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+        try:
+            self.assertEqual(worker.stdout.readline().strip(), '1')
+            for value in range(2, 1001):
+                mbus.setFieldValue(address + '.counter', value)
+            worker.stdin.write('\n')
+            worker.stdin.flush()
+            self.assertEqual(worker.stdout.readline().strip(), '(1000, 1000)')
+            self.assertEqual(worker.stdout.readline().strip(), 'readOnly')
+            _, errors = worker.communicate(timeout=10)
+            self.assertEqual(worker.returncode, 0, errors)
+            self.assertEqual(mbus.getFieldSnapshot(address + '.counter'), (1000, 1000))
+        finally:
+            worker.kill()
+            worker.communicate()
+            mbus.releaseSharedField(address + '.counter')
+
+    def test_writesFromOtherProcess(self):
+        railName = "sharedFieldsProcess"
+        address = f'{railName}.group'
+        mbus.registerRail(railName)
+        mbus.createGroup(address)
+
+        script = (
+            "import sys\n"
+            "from mbus import mbus\n"
+            "mbus.registerRail('worker')\n"
+            "mbus.createGroup('worker.group')\n"
+            f"mbus.createEndpoint('worker.group', 'counter', 'field', type=int, value=0, shared='{self.sharedName}')\n"
+            "for value in range(1, 1001):\n"
+            "    mbus.setFieldValue('worker.group.counter', value)\n"
+            "print('written', flush=True)\n"
+            "sys.stdin.readline()\n"
+            "mbus.releaseSharedField('worker.group.counter')\n"
+        )
+        worker = subprocess.Popen([sys.executable, "-c", script], stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                  text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+        try:
+            self.assertEqual(worker.stdout.readline().strip(), 'written')
+            mbus.createEndpoint(address, 'counter', 'field', type=int, shared=self.sharedName, attach=True)
+            self.assertEqual(mbus.getFieldSnapshot(address + '.counter'), (1000, 1001))
+            with self.assertRaises(SettingFieldFailed):
+                mbus.setFieldValue(address + '.counter', 0)
+            mbus.releaseSharedField(address + '.counter')
+
+            worker.stdin.write('\n')
+            worker.stdin.flush()
+            _, errors = worker.communicate(timeout=10)
+            self.assertEqual(worker.returncode, 0, errors)
+            self.assertNotIn('KeyError', errors)
+        finally:
+            worker.kill()
+            worker.communicate()
+
+    def test_invalidSharedFields(self):
+        railName = "sharedFieldsInvalid"
+        address = f'{railName}.group'
+        mbus.registerRail(railName)
+        mbus.createGroup(address)
+
+        with self.assertRaises(InvalidEnpointParameter):
+            mbus.createEndpoint(address, 'noFormat', 'field', type=str, value="text", shared=self.sharedName)
+        with self.assertRaises(InvalidEnpointParameter):
+            mbus.createEndpoint(address, 'badFormat', 'field', type=int, value=1, shared=self.sharedName, format='Z')
+        with self.assertRaises(InvalidEnpointParameter):
+            mbus.createEndpoint(address, 'missing', 'field', type=int, shared=self.sharedName, attach=True)
+        with self.assertRaises(InvalidEnpointParameter):
+            mbus.createEndpoint(address, 'notShared', 'field', type=int, value=1, format='q')
+        with self.assertRaises(InvalidFieldValueType):
+            mbus.createEndpoint(address, 'tooBig', 'field', type=int, value=1 << 40, shared=self.sharedName, format='i')
+
+        with self.assertRaises(InvalidFieldValueType):
+            mbus.createEndpoint(address, 'shortBytes', 'field', type=bytes, value=b'ab', shared=self.sharedName, format='4s')
+
+        mbus.createEndpoint(address, 'bytes', 'field', type=bytes, value=b'abcd', shared=self.sharedName, format='4s')
+        try:
+            self.assertEqual(mbus.getFieldValue(address + '.bytes'), b'abcd')
+            with self.assertRaises(InvalidFieldValueType):
+                mbus.setFieldValue(address + '.bytes', b'toolongvalue')
+            with self.assertRaises(InvalidFieldValueType):
+                mbus.setFieldValues({address + '.bytes' : b'toolongvalue'})
+            self.assertEqual(mbus.getFieldValue(address + '.bytes'), b'abcd')
+        finally:
+            mbus.releaseSharedField(address + '.bytes')
+
+class TestBridge(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "bus.sock")
+        mbus.startBridge(self.path)
+
+    def tearDown(self):
+        try:
+            mbus.stopBridge()
+        except BridgeNotRunning:
+            pass
+        self.directory.cleanup()
+
+    def test_operationsOverBridge(self):
+        railName = "bridgeOperations"
+        address = f'{railName}.group'
+        mbus.registerRail(railName)
+        mbus.createGroup(address)
+
+        fired = []
+        mbus.createEndpoint(address, 'trigger', 'trigger', responder=lambda x : fired.append(x), arguments={"x" : int})
+        mbus.createEndpoint(address, 'event', 'event', responders=[lambda x : fired.append(-x)])
+        mbus.createEndpoint(address, 'field', 'field', type=int, value=1)
+        mbus.createEndpoint(address, 'action', 'action', responder=lambda x : x * 2, arguments={"x" : int}, rtype=int)
+
+        self.assertEqual(stat.S_IMODE(os.stat(self.path).st_mode), 0o600)
+        with self.assertRaises(BridgeRunning):
+            mbus.startBridge(self.path)
+
+        with busBridgeClient(self.path, connections=2) as client:
+            client.fireTrigger(address + '.trigger', x = 1)
+            client.callEvent(address + '.event', x = 2)
+            self.assertEqual(fired, [1, -2])
+            self.assertEqual(client.getFieldValue(address + '.field'), 1)
+            client.setFieldValue(address + '.field', 5)
+            self.assertEqual(mbus.getFieldValue(address + '.field'), 5)
+            self.assertEqual(client.callAction(address + '.action', x = 4), 8)
+
+            with self.assertRaises(InvalidFieldValueType):
+                client.setFieldValue(address + '.field', "text")
+            with self.assertRaises(EndpointNotFound):
+                client.callAction(address + '.missing', x = 1)
+
+    def test_pipelinedResponsesOutOfOrder(self):
+        railName = "bridgePipelining"
+        address = f'{railName}.group'
+        mbus.registerRail(railName)
+        mbus.createGroup(address)
+        mbus.setLockingStrategy('endpoint')
+
+        release = threading.Event()
+        mbus.createEndpoint(address, 'slow', 'action', responder=lambda : release.wait(5), arguments={}, rtype=bool)
+        mbus.createEndpoint(address, 'fast', 'action', responder=lambda x : x, arguments={"x" : int}, rtype=int)
+
+        try:
+            with busBridgeClient(self.path, connections=1) as client:
+                slow = client.submit('callAction', address + '.slow', {})
+                fast = [client.submit('callAction', address + '.fast', {"x" : i}) for i in range(50)]
+                self.assertEqual([future.result(5) for future in fast], list(range(50)))
+                self.assertFalse(slow.done())
+                release.set()
+                self.assertTrue(slow.result(5))
+        finally:
+            mbus.setLockingStrategy('global')
+
+    def test_stopFailsPendingRequests(self):
+        railName = "bridgeStop"
+        address = f'{railName}.group'
+        mbus.registerRail(railName)
+        mbus.createGroup(address)
+        mbus.createEndpoint(address, 'field', 'field', type=int, value=3)
+
+        client = busBridgeClient(self.path)
+        self.assertEqual(client.getFieldValue(address + '.field'), 3)
+        mbus.stopBridge()
+        self.assertFalse(os.path.exists(self.path))
+        with self.assertRaises(BridgeClosed):
+            client.getFieldValue(address + '.field')
+        client.close()
+
+    def test_connectFailure(self):
+        missing = os.path.join(self.directory.name, "missing.sock")
+        with self.assertRaises(BridgeClosed):
+            busBridgeConnection(missing)
+        with busBridgeClient(missing) as client:
+            with self.assertRaises(BridgeClosed):
+                client.getFieldValue('bridgeConnect.group.field')
+
+    def test_timedOutRequestsAreDropped(self):
+        railName = "bridgeTimeout"
+        address = f'{railName}.group'
+        mbus.registerRail(railName)
+        mbus.createGroup(address)
+        mbus.setLockingStrategy('endpoint')
+
+        release = threading.Event()
+        mbus.createEndpoint(address, 'slow', 'action', responder=lambda : release.wait(5), arguments={}, rtype=bool)
+        mbus.createEndpoint(address, 'fast', 'action', responder=lambda x : x, arguments={"x" : int}, rtype=int)
+
+        try:
+            with busBridgeClient(self.path, connections=1, timeout=0.1) as client:
+                for _ in range(3):
+                    with self.assertRaises(TimeoutError):
+                        client.callAction(address + '.slow')
+                connection = client._busBridgeClient__pool[0]
+                self.assertEqual(connection._busBridgeConnection__pending, {})
+
+                release.set()
+                self.assertEqual(client.callAction(address + '.fast', x = 3), 3)
+                self.assertFalse(connection.closed)
+        finally:
+            mbus.setLockingStrategy('global')
+
+    def test_unpicklableResponse(self):
+        path = os.path.join(self.directory.name, "fake.sock")
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        listener.bind(path)
+        listener.listen(1)
+
+        def serve():
+            server, _ = listener.accept()
+            with server:
+                first, _, _ = receiveFrame(server)
+                second, _, _ = receiveFrame(server)
+                server.sendall(packFrame(first, BRIDGE_RESULT, b'not a pickle'))
+                server.sendall(packFrame(second, BRIDGE_RESULT, pickle.dumps(2)))
+                receiveFrame(server)
+
+        thread = threading.Thread(target=serve)
+        thread.start()
+        connection = busBridgeConnection(path)
+        try:
+            broken = connection.submit('getFieldValue', 'fake.group.first', None)
+            working = connection.submit('getFieldValue', 'fake.group.second', None)
+            with self.assertRaises(BusException):
+                broken.result(5)
+            self.assertEqual(working.result(5), 2)
+            self.assertFalse(connection.closed)
+        finally:
+            connection.close()
+            thread.join(5)
+            listener.close()
+
+    def test_pathInUse(self):
+        with self.assertRaises(BridgePathInUse):
+            busBridgeServer(mbus, self.path, 1)
+        mbus.stopBridge()
+
+        regular = os.path.join(self.directory.name, "regular")
+        with open(regular, 'w') as file:
+            file.write("keep")
+        with self.assertRaises(BridgePathInUse):
+            mbus.startBridge(regular)
+        with open(regular) as file:
+            self.assertEqual(file.read(), "keep")
+
+        stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        stale.bind(self.path)
+        stale.close()
+        mbus.registerRail("bridgeStale")
+        mbus.createGroup("bridgeStale.group")
+        mbus.createEndpoint("bridgeStale.group", 'field', 'field', type=int, value=5)
+        mbus.startBridge(self.path)
+        with busBridgeClient(self.path) as client:
+            self.assertEqual(client.getFieldValue("bridgeStale.group.field"), 5)
+
+class TestVectors(unittest.TestCase):
+    def __createVector(self, railName : str, **parameters) -> str:
+        mbus.registerRail(railName)
+        mbus.createGroup(f'{railName}.group')
+        mbus.createEndpoint(f'{railName}.group', 'vector', 'vector', **parameters)
+        return f'{railName}.group.vector'
+
+    def test_sliceReadsAndWrites(self):
+        address = self.__createVector("vectorSlices", typecode='d', length=8)
+        self.assertEqual(mbus.getVector(address).tolist(), [0.0] * 8)
+
+        mbus.setVector(address, [1, 2, 3], start=2)
+        self.assertEqual(mbus.getVector(address, 1, 6).tolist(), [0.0, 1.0, 2.0, 3.0, 0.0])
+
+        copy = mbus.getVector(address)
+        mbus.setVector(address, [9])
+        self.assertEqual(copy[0], 0.0)
+
+        with self.assertRaises(InvalidFieldValueType):
+            mbus.setVector(address, [1, 2], start=7)
+        with self.assertRaises(InvalidFieldValueType):
+            mbus.setVector(address, ["text"])
+        self.assertEqual(len(mbus.getVector(address)), 8)
+
+    def test_replaceAndView(self):
+        address = self.__createVector("vectorFrames", typecode='i', value=range(4))
+        view = mbus.viewVector(address)
+        self.assertTrue(view.readonly)
+        self.assertEqual(view.tolist(), [0, 1, 2, 3])
+
+        mbus.replaceVector(address, array('i', [4, 5, 6, 7]))
+        self.assertEqual(view.tolist(), [4, 5, 6, 7])
+        with self.assertRaises(InvalidFieldValueType):
+            mbus.replaceVector(address, [1, 2, 3])
+        with self.assertRaises(InvalidFieldValueType):
+            mbus.replaceVector(address, [1.5, 2, 3, 4])
+        view.release()
+
+        handle = mbus.resolve(address)
+        self.assertIsInstance(handle, VectorHandle)
+        handle.set([1], start=3)
+        self.assertEqual(handle.get(2).tolist(), [6, 1])
+        handle.replace([0, 0, 0, 0])
+        self.assertEqual(handle.view().tolist(), [0, 0, 0, 0])
+
+    def test_invalidVectors(self):
+        mbus.registerRail("vectorInvalid")
+        mbus.createGroup("vectorInvalid.group")
+        mbus.createEndpoint("vectorInvalid.group", 'field', 'field', type=int, value=0)
+        with self.assertRaises(InvalidVector):
+            mbus.getVector("vectorInvalid.group.field")
+        with self.assertRaises(InvalidEnpointParameter):
+            mbus.createEndpoint("vectorInvalid.group", 'both', 'vector', typecode='d', value=[1], length=1)
+        with self.assertRaises(InvalidEnpointParameter):
+            mbus.createEndpoint("vectorInvalid.group", 'typecode', 'vector', typecode='u', length=1)
+        with self.assertRaises(InvalidEnpointParameter):
+            mbus.createEndpoint("vectorInvalid.group", 'backend', 'vector', typecode='d', length=1, backend='list')
+
+    @unittest.skipIf(numpy is None, "numpy is not installed")
+    def test_numpyBackendRejectsLossyCasts(self):
+        address = self.__createVector("vectorNumpy", typecode='f', length=2, backend='numpy')
+        mbus.setVector(address, numpy.array([1.5, 2.5], dtype=numpy.float32))
+        mbus.setVector(address, [3, 4])
+        self.assertEqual(mbus.getVector(address).tolist(), [3.0, 4.0])
+        with self.assertRaises(InvalidFieldValueType):
+            mbus.replaceVector(address, numpy.array([1.0, 2.0], dtype=numpy.float64))
+
+        address = self.__createVector("vectorNumpyInt", typecode='b', length=1, backend='numpy')
+        with self.assertRaises(InvalidFieldValueType):
+            mbus.setVector(address, numpy.array([300], dtype=numpy.int64))
+        with self.assertRaises(InvalidFieldValueType):
+            mbus.setVector(address, [300])
+        self.assertEqual(mbus.getVector(address).tolist(), [0])
+
+    def test_replaceIsNeverTorn(self):
+        address = self.__createVector("vectorTorn", typecode='q', length=1024)
+        stop = threading.Event()
+
+        def writer():
+            frame = 0
+            while not stop.is_set():
+                frame += 1
+                mbus.replaceVector(address, array('q', [frame]) * 1024)
+
+        thread = threading.Thread(target=writer)
+        thread.start()
+        try:
+            for _ in range(500):
+                values = mbus.getVector(address)
+                self.assertEqual(min(values), max(values))
+        finally:
+            stop.set()
+            thread.join()
+
+class TestJournal(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        try:
+            mbus.disableJournal()
+        except JournalNotEnabled:
+            pass
+        self.directory.cleanup()
+
+    def __createFields(self, railName : str) -> str:
+        address = f'{railName}.group'
+        mbus.registerRail(railName)
+        mbus.createGroup(address)
+        mbus.createEndpoint(address, 'count', 'field', type=int, value=0)
+        mbus.createEndpoint(address, 'name', 'field', type=str, value="")
+        mbus.createEndpoint(address, 'untouched', 'field', type=int, value=7)
+        return address
+
+    def test_replayRestoresValues(self):
+        address = self.__createFields("journalReplay")
+        self.assertEqual(mbus.enableJournal(self.directory.name, fsync='always'), {"replayed" : 0, "missing" : 0, "invalid" : 0})
+        with self.assertRaises(JournalEnabled):
+            mbus.enableJournal(self.directory.name)
+
+        for value in range(100):
+            mbus.setFieldValue(address + '.count', value)
+        mbus.setFieldValues({address + '.name' : "batch"})
+        asyncio.run(mbus.setFieldValueAsync(address + '.name', "async"))
+        self.assertEqual(mbus.getJournalStats()["records"], 102)
+        mbus.disableJournal()
+
+        mbus.setFieldValue(address + '.count', -1)
+        mbus.setFieldValue(address + '.name', "lost")
+        self.assertEqual(mbus.enableJournal(self.directory.name)["replayed"], 2)
+        self.assertEqual(mbus.getFieldValue(address + '.count'), 99)
+        self.assertEqual(mbus.getFieldValue(address + '.name'), "async")
+        self.assertEqual(mbus.getFieldValue(address + '.untouched'), 7)
+
+    def test_compactionAndTornTail(self):
+        address = self.__createFields("journalCompaction")
+        mbus.enableJournal(self.directory.name, fsync='interval', interval=0.01, compactAt=512)
+        written = 0
+        for value in range(200):
+            mbus.setFieldValue(address + '.count', value)
+            written += 8 + len(pickle.dumps((address + '.count', value), protocol=pickle.HIGHEST_PROTOCOL))
+        deadline = time.monotonic() + 5
+        while mbus.getJournalStats()["compactions"] == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        stats = mbus.getJournalStats()
+        self.assertGreater(stats["compactions"], 0)
+        self.assertLess(stats["logBytes"], written)
+        mbus.disableJournal()
+        logBytes = stats["logBytes"]
+        self.assertFalse(os.path.exists(os.path.join(self.directory.name, "journal.sealed")))
+
+        with open(os.path.join(self.directory.name, "journal.log"), "r+b") as log:
+            log.seek(logBytes)
+            log.write(b'\x00\x00\x00\x10\x00\x00\x00\x01torn')
+
+        mbus.setFieldValue(address + '.count', -1)
+        self.assertEqual(mbus.enableJournal(self.directory.name, fsync='batch', batchSize=4)["replayed"], 1)
+        self.assertEqual(mbus.getFieldValue(address + '.count'), 199)
+
+        mbus.setFieldValue(address + '.count', 200)
+        mbus.compactJournal()
+        self.assertEqual(mbus.getJournalStats()["logBytes"], 0)
+        mbus.disableJournal()
+        mbus.setFieldValue(address + '.count', -1)
+        mbus.enableJournal(self.directory.name)
+        self.assertEqual(mbus.getFieldValue(address + '.count'), 200)
+
+    def test_compactionOutsideWriter(self):
+        address = self.__createFields("journalBackground")
+        mbus.enableJournal(self.directory.name, fsync='interval', interval=60, compactAt=256)
+
+        fsyncs = []
+        fsync = os.fsync
+        def slowFsync(descriptor):
+            fsyncs.append(threading.current_thread().name)
+            time.sleep(0.5)
+            fsync(descriptor)
+
+        with patch('os.fsync', slowFsync):
+            start = time.monotonic()
+            for value in range(20):
+                mbus.setFieldValue(address + '.count', value)
+            self.assertLess(time.monotonic() - start, 0.4)
+            self.assertEqual(mbus.getFieldValue(address + '.name'), "")
+            mbus.disableJournal()
+
+        self.assertEqual(fsyncs, ['mbus-journal-compact'])
+        mbus.setFieldValue(address + '.count', -1)
+        mbus.enableJournal(self.directory.name)
+        self.assertEqual(mbus.getFieldValue(address + '.count'), 19)
+
+    def test_unfinishedCompaction(self):
+        address = self.__createFields("journalSealed")
+        mbus.enableJournal(self.directory.name, fsync='always')
+        mbus.setFieldValue(address + '.count', 1)
+        mbus.setFieldValue(address + '.name', "sealed")
+        mbus.disableJournal()
+
+        # Log sealed by compaction that stopped before writing snapshot, fresh log has later writes
+        os.replace(os.path.join(self.directory.name, "journal.log"), os.path.join(self.directory.name, "journal.sealed"))
+        mbus.enableJournal(self.directory.name, fsync='always')
+        mbus.setFieldValue(address + '.count', 2)
+        mbus.disableJournal()
+        self.assertFalse(os.path.exists(os.path.join(self.directory.name, "journal.sealed")))
+
+        mbus.setFieldValue(address + '.count', -1)
+        mbus.setFieldValue(address + '.name', "lost")
+        mbus.enableJournal(self.directory.name)
+        self.assertEqual(mbus.getFieldValue(address + '.count'), 2)
+        self.assertEqual(mbus.getFieldValue(address + '.name'), "sealed")
+
+    def test_invalidUse(self):
+        with self.assertRaises(InvalidFsyncPolicy):
+            mbus.enableJournal(self.directory.name, fsync='never')
+        with self.assertRaises(JournalNotEnabled):
+            mbus.disableJournal()
+        with self.assertRaises(JournalNotEnabled):
+            mbus.getJournalStats()
+
+class TestBenchCompare(unittest.TestCase):
+    def test_compareResults(self):
+        import bench
+
+        baseline = [
+            {"name" : "trigger.handle", "params" : {"depth" : 1}, "nsPerOp" : 100.0},
+            {"name" : "trigger.handle", "params" : {"depth" : 4}, "nsPerOp" : 100.0},
+            {"name" : "memory", "params" : {"size" : 10, "depth" : 1}, "bytesPerEndpoint" : 200.0},
+        ]
+        results = [
+            {"name" : "trigger.handle", "params" : {"depth" : 1}, "nsPerOp" : 105.0},
+            {"name" : "trigger.handle", "params" : {"depth" : 4}, "nsPerOp" : 150.0},
+            {"name" : "memory", "params" : {"depth" : 1, "size" : 10}, "bytesPerEndpoint" : 100.0},
+            {"name" : "action.handle", "params" : {"depth" : 1}, "nsPerOp" : 100.0},
+        ]
+        self.assertEqual(bench.metricOf(baseline[2]), 200.0)
+        with redirect_stdout(io.StringIO()):
+            self.assertEqual(bench.compareResults(results, baseline, 0.1), ["trigger.handle[depth=4]"])
+            self.assertEqual(bench.compareResults(results, baseline, 0.6), [])
+
+    def test_compareModeExitStatus(self):
+        import bench
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "baseline.json")
+            arguments = ["bench.py", "--only", "memory", "--sizes", "10", "--depths", "1", "--repeat", "1", "--compare", path]
+            for bytesPerEndpoint, status in ((1e9, 0), (1e-9, 1)):
+                with open(path, 'w') as file:
+                    json.dump({"results" : [{"name" : "memory", "params" : {"size" : 10, "depth" : 1}, "bytesPerEndpoint" : bytesPerEndpoint}]}, file)
+                with patch.object(sys, 'argv', arguments), redirect_stdout(io.StringIO()), redirect_stderr(io.StringIO()):
+                    self.assertEqual(bench.main(), status)
+
 if __name__ == "__main__":
     unittest.main()